@@ -0,0 +1,274 @@
+"""In-memory autocomplete index over addresses we already have on file.
+
+Participant, employer and provider addresses are loaded once per worker, in a
+background thread started by its first request (so CLI commands and the
+gunicorn master never scan them), and kept current by mapper events: inserts,
+updates (the old address out, the new one in) and deletes are queued on the
+session and applied when it commits, so a rolled-back write never shows up.
+Core statements skip those events; merge.py queues its changes by hand, and
+bulk loads rebuild. Other workers' writes reach this one's index when it is
+rebuilt, every ADDRESS_INDEX_REFRESH_S seconds.
+
+Participants' home addresses and organizations' addresses are kept apart,
+``people`` and ``orgs``, so anonymous callers only get the latter. ``search``
+answers from a sorted prefix list first and falls back to trigram similarity,
+so /api/addresses only needs the remote geocoder for addresses nobody has
+entered before.
+"""
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from sqlalchemy import event
+
+try:
+    from .models import db, Participant, Employer, Provider
+    from .geocoder import normalize
+except ImportError:
+    from models import db, Participant, Employer, Provider
+    from geocoder import normalize
+
+MIN_SIMILARITY = 0.4
+PENDING = "address_index"  # session.info key for changes waiting on the commit
+
+_warm_pid = None  # the process whose build/refresh thread is running
+_warm_lock = threading.Lock()
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AddressIndex:
+    """Distinct addresses with how many rows carry each; an address leaves when its count hits 0."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []          # sorted normalized addresses still in use, for prefix scans
+        self._labels = []        # id -> address as first entered
+        self._ids = {}           # normalized -> id (kept after the count drops to 0)
+        self._refs = array("I")  # id -> rows with that address
+        self._grams = {}         # trigram -> array of ids
+        self._replay = None      # changes made while build() runs, to apply to its result
+        self._build_lock = threading.Lock()
+        self.ready = False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _add(self, key, label, n):
+        i = self._ids[key] = len(self._labels)
+        self._labels.append(label)
+        self._refs.append(n)
+        for g in _trigrams(key):
+            postings = self._grams.get(g)
+            if postings is None:
+                postings = self._grams[g] = array("I")
+            postings.append(i)
+
+    def _adjust(self, address, delta):
+        key = normalize(address)
+        if not key:
+            return
+        i = self._ids.get(key)
+        if i is None:
+            if delta > 0:
+                self._add(key, address.strip(), delta)
+                insort(self._keys, key)
+            return
+        before = self._refs[i]
+        self._refs[i] = after = max(0, before + delta)
+        if before and not after:
+            del self._keys[bisect_left(self._keys, key)]
+        elif after and not before:
+            insort(self._keys, key)
+
+    def add(self, address):
+        self.adjust(address, 1)
+
+    def remove(self, address):
+        self.adjust(address, -1)
+
+    def adjust(self, address, delta):
+        with self._lock:
+            self._adjust(address, delta)
+            if self._replay is not None:
+                self._replay.append((address, delta))
+
+    def build(self, counts):
+        """Replace the contents with *counts*: ``(address, rows)`` pairs, or plain addresses (1 row each).
+
+        The new index is filled outside the lock, so changes that come in meanwhile
+        are recorded and replayed onto it before the swap. One committed just before
+        *counts* is read is counted twice; the next rebuild evens that out.
+        """
+        with self._build_lock:
+            with self._lock:
+                self._replay = []
+            try:
+                fresh = AddressIndex()
+                for item in counts:
+                    address, n = item if isinstance(item, tuple) else (item, 1)
+                    key = normalize(address)
+                    if not key or not n:
+                        continue
+                    i = fresh._ids.get(key)
+                    if i is None:
+                        fresh._add(key, address.strip(), n)
+                    else:
+                        fresh._refs[i] += n
+                fresh._keys = sorted(fresh._ids)
+            except BaseException:
+                with self._lock:
+                    self._replay = None
+                raise
+            with self._lock:
+                for address, delta in self._replay:
+                    fresh._adjust(address, delta)
+                self._replay = None
+                self._keys, self._labels, self._refs = fresh._keys, fresh._labels, fresh._refs
+                self._ids, self._grams = fresh._ids, fresh._grams
+                self.ready = True
+
+    def search(self, q, limit=5):
+        key = normalize(q)
+        if not key:
+            return []
+        with self._lock:
+            out = []
+            i = bisect_left(self._keys, key)
+            while i < len(self._keys) and len(out) < limit and self._keys[i].startswith(key):
+                out.append(self._labels[self._ids[self._keys[i]]])
+                i += 1
+            if out or len(key) < 3:
+                return out
+            # fuzzy: score candidates from the three rarest trigrams of the query
+            grams = _trigrams(key)
+            postings = sorted((self._grams.get(g, ()) for g in grams), key=len)[:3]
+            seen = set()
+            scores = Counter()
+            for p in postings:
+                scores.update(p)
+            for i, _ in scores.most_common(limit * 4):
+                label = self._labels[i]
+                if label in seen or not self._refs[i]:
+                    continue
+                shared = len(grams & _trigrams(normalize(label)))
+                if shared / len(grams) >= MIN_SIMILARITY:
+                    out.append(label)
+                    seen.add(label)
+                    if len(out) >= limit:
+                        break
+            return out
+
+
+people = AddressIndex()  # participants' home addresses: staff only
+orgs = AddressIndex()    # employer and provider addresses
+INDEXES = {Participant: people, Employer: orgs, Provider: orgs}
+
+
+def ready():
+    return people.ready and orgs.ready
+
+
+def search(q, limit=5, include_people=False):
+    """Stored addresses matching *q*; participants' only with *include_people*."""
+    out = orgs.search(q, limit) if orgs.ready else []
+    if include_people and people.ready and len(out) < limit:
+        out += [a for a in people.search(q, limit) if a not in out][:limit - len(out)]
+    return out
+
+
+def _stored_counts(model):
+    q = (db.session.query(model.address, db.func.count()).filter(model.address.isnot(None))
+         .group_by(model.address).yield_per(5000))
+    return ((address, n) for address, n in q)
+
+
+def rebuild():
+    people.build(_stored_counts(Participant))
+    orgs.build(pair for model in (Employer, Provider) for pair in _stored_counts(model))
+    return len(people) + len(orgs)
+
+
+# ---- keeping it current ----------------------------------------------------------
+def queue(session, index, address, delta):
+    """Apply ``index.adjust(address, delta)`` once *session* commits; dropped on rollback."""
+    if address:
+        session.info.setdefault(PENDING, []).append((index, address, delta))
+
+
+def _on_insert(mapper, connection, target):
+    queue(db.inspect(target).session, INDEXES[type(target)], target.address, 1)
+
+
+def _before_update(mapper, connection, target):
+    # before the UPDATE runs, so an unloaded old address can still be read back
+    state = db.inspect(target)
+    hist = state.attrs.address.load_history()
+    if hist.has_changes():
+        index = INDEXES[type(target)]
+        for old in hist.deleted:
+            queue(state.session, index, old, -1)
+        queue(state.session, index, target.address, 1)
+
+
+def _on_delete(mapper, connection, target):
+    queue(db.inspect(target).session, INDEXES[type(target)], target.address, -1)
+
+
+def _after_commit(session):
+    if session.in_nested_transaction():
+        return  # a savepoint; wait for the real commit
+    for index, address, delta in session.info.pop(PENDING, ()):
+        index.adjust(address, delta)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(PENDING, None)
+
+
+def init_app(app):
+    for model in INDEXES:
+        if not event.contains(model, "after_insert", _on_insert):
+            event.listen(model, "after_insert", _on_insert)
+            event.listen(model, "before_update", _before_update)
+            event.listen(model, "after_delete", _on_delete)
+    if not event.contains(db.session, "after_commit", _after_commit):
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_soft_rollback", _after_soft_rollback)
+
+    # started by the first request, so CLI commands and the gunicorn master never run it
+    app.before_request(lambda: _start_warm(app))
+
+
+def _start_warm(app):
+    """Start this process's build/refresh thread, once per (possibly forked) worker."""
+    global _warm_pid
+    if _warm_pid == os.getpid():
+        return
+    with _warm_lock:
+        if _warm_pid == os.getpid():
+            return
+        _warm_pid = os.getpid()
+        threading.Thread(target=_warm, args=(app,), name="address-index", daemon=True).start()
+
+
+def _warm(app):
+    refresh = app.config["ADDRESS_INDEX_REFRESH_S"]
+    while True:
+        with app.app_context():
+            try:
+                rebuild()
+            except Exception:
+                app.logger.exception("address index build failed")
+            finally:
+                db.session.remove()
+        if not refresh:
+            return
+        time.sleep(refresh)
@@ -4,6 +4,21 @@ import os, sys
 if __package__ in (None, ""):
     sys.path.append(os.path.dirname(__file__))
     from extensions import db, migrate
+    import rollups
+    import address_index
+    import fulltext
+    import duplicates
+    import merge
+    import importer
+    import groupcommit
+    import etags
+    import compression
+    import jsonprovider
+    import metrics
+    import slowlog
+    import budgets
+    import seed
+    import pagination
     from routes.participants import bp as participants_bp
     # optional blueprints
     try: from routes.more import bp_more
@@ -14,6 +29,12 @@ if __package__ in (None, ""):
     except Exception: bp_auth = None
     try: from routes.reports import bp_reports
     except Exception: bp_reports = None
+    try: from routes.search import bp_search
+    except Exception: bp_search = None
+    try: from routes.imports import bp_import
+    except Exception: bp_import = None
+    try: from routes.batch import bp_batch
+    except Exception: bp_batch = None
     # SPA helper
     try: from spa_static import register_spa
     except Exception:
@@ -21,6 +42,7 @@ if __package__ in (None, ""):
             pass
 else:
     from .extensions import db, migrate
+    from . import rollups, address_index, fulltext, duplicates, merge, importer, groupcommit, etags, compression, jsonprovider, metrics, slowlog, budgets, seed, pagination
     from .routes.participants import bp as participants_bp
     try: from .routes.more import bp_more
     except Exception: bp_more = None
@@ -30,6 +52,12 @@ else:
     except Exception: bp_auth = None
     try: from .routes.reports import bp_reports
     except Exception: bp_reports = None
+    try: from .routes.search import bp_search
+    except Exception: bp_search = None
+    try: from .routes.imports import bp_import
+    except Exception: bp_import = None
+    try: from .routes.batch import bp_batch
+    except Exception: bp_batch = None
     try: from .spa_static import register_spa
     except Exception:
         def register_spa(app):
@@ -53,14 +81,49 @@ def create_app():
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///local.db")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "please-change-me")
+    app.config["GEOCODER_URL"] = os.getenv("GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+    # batch concurrent note/service inserts into one transaction (see groupcommit.py)
+    app.config["GROUP_COMMIT"] = os.getenv("GROUP_COMMIT", "0") == "1"
+    app.config["GROUP_COMMIT_MS"] = float(os.getenv("GROUP_COMMIT_MS", "5"))
+    app.config["GROUP_COMMIT_MAX"] = int(os.getenv("GROUP_COMMIT_MAX", "100"))
+    app.config["GROUP_COMMIT_TIMEOUT_S"] = float(os.getenv("GROUP_COMMIT_TIMEOUT_S", "10"))
+    # report rollups: catch-up period per worker, and how old a max id must be to fold up to it
+    # (see rollups.py; the settle time defaults to 0 on SQLite and 30 s elsewhere)
+    app.config["ROLLUP_INTERVAL_S"] = float(os.getenv("ROLLUP_INTERVAL_S", "15"))
+    app.config["ROLLUP_SETTLE_S"] = float(os.environ["ROLLUP_SETTLE_S"]) if os.getenv("ROLLUP_SETTLE_S") else None
+    # how often each worker rebuilds its address index to pick up other workers' writes; 0 never
+    app.config["ADDRESS_INDEX_REFRESH_S"] = float(os.getenv("ADDRESS_INDEX_REFRESH_S", "300"))
+    app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    # built frontend; rescanned when index.html changes (see spa_static.py)
+    app.config["SPA_DIST_DIR"] = os.getenv("SPA_DIST_DIR")
+    app.config["SPA_RELOAD_INTERVAL"] = float(os.getenv("SPA_RELOAD_INTERVAL", "2"))
+    # orjson-backed responses when installed (see jsonprovider.py)
+    app.config["FAST_JSON"] = os.getenv("FAST_JSON", "1") == "1"
+    # per-worker metric snapshots, merged by /api/metrics (see metrics.py)
+    app.config["METRICS_DIR"] = os.getenv("METRICS_DIR")
+    # log, count and EXPLAIN statements slower than this; 0 turns it off (see slowlog.py)
+    app.config["SLOWLOG_MS"] = float(os.getenv("SLOWLOG_MS", "250"))
+    app.config["SLOWLOG_EXPLAIN_SAMPLE"] = float(os.getenv("SLOWLOG_EXPLAIN_SAMPLE", "0.2"))
 
     # Init extensions
+    jsonprovider.init_app(app)
     db.init_app(app)
     migrate.init_app(app, db)
     JWTManager(app)
+    rollups.init_app(app)
+    duplicates.init_app(app)
+    merge.init_app(app)
+    importer.init_app(app)
+    groupcommit.init_app(app)
+    etags.init_app(app)
+    slowlog.init_app(app)
+    seed.init_app(app)
+    metrics.init_app(app)  # before compression: its after_request then runs last and times it
+    compression.init_app(app)
 
     # Healthcheck
     @app.get("/healthz")
+    @budgets.query_budget(0)
     def healthz():
         return {"ok": True}
 
@@ -74,14 +137,32 @@ def create_app():
         app.register_blueprint(bp_auth, url_prefix="/api")
     if bp_reports:
         app.register_blueprint(bp_reports, url_prefix="/api")
+    if bp_search:
+        app.register_blueprint(bp_search, url_prefix="/api")
+    if bp_import:
+        app.register_blueprint(bp_import, url_prefix="/api")
+    if bp_batch:
+        app.register_blueprint(bp_batch, url_prefix="/api")
 
     # Create tables on first run (safe if already present)
     with app.app_context():
         try:
             db.create_all()
+            # create_all skips existing tables, so add any newly declared indexes to them
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(db.engine, checkfirst=True)
+            pagination.backfill_keys(db, [models.Participant.created_at, models.CaseNote.created_at,
+                                          models.Service.provided_at, models.Referral.referred_at])
         except Exception:
             pass
 
+    # Full-text search index (FTS5 / tsvector) and `flask search reindex`
+    fulltext.init_app(app)
+
+    # Local address autocomplete index (built in the background)
+    address_index.init_app(app)
+
     # Serve React SPA at /
     register_spa(app)
 
@@ -0,0 +1,58 @@
+"""Benchmarks. Run from backend/, e.g. ``python -m bench.pagination --rows 500000``.
+
+Each script builds the app with ``create_app()`` against a throwaway SQLite file
+(or ``--db``) and prints one JSON object per measurement on stdout.
+"""
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+def make_app(db_path=None):
+    path = db_path or os.path.join(tempfile.mkdtemp(prefix="mis-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("ROLLUP_INTERVAL_S", "0")  # benches fold rollups in when they need them
+    from app import create_app
+    return create_app()
+
+
+def percentile(samples, pct):
+    s = sorted(samples)
+    if not s:
+        return 0.0
+    k = min(len(s) - 1, max(0, int(round(pct / 100.0 * (len(s) - 1)))))
+    return s[k]
+
+
+def timed(fn, repeat=50):
+    """Call *fn* *repeat* times; return latency stats in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return {"n": repeat, "p50_ms": round(percentile(samples, 50), 3),
+            "p95_ms": round(percentile(samples, 95), 3), "max_ms": round(max(samples), 3)}
+
+
+def report(name, **fields):
+    print(json.dumps({"bench": name, **fields}), flush=True)
+
+
+@contextmanager
+def count_queries(engine):
+    """Collect every SQL statement *engine* executes inside the block."""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
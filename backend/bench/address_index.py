@@ -0,0 +1,59 @@
+"""Local address index: build time, memory and query latency.
+
+    python -m bench.address_index --rows 100000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from . import percentile, report
+
+STREETS = ["Main St", "Pacific Ave", "El Dorado St", "Weber Ave", "California St",
+           "March Ln", "Hammer Ln", "Airport Way", "Wilson Way", "Center St",
+           "Harding Way", "Fremont St", "Charter Way", "Benjamin Holt Dr", "Pershing Ave"]
+CITIES = ["Stockton, CA", "Lodi, CA", "Manteca, CA", "Tracy, CA", "Lathrop, CA"]
+
+
+def addresses(n, seed=7):
+    rnd = random.Random(seed)
+    for i in range(n):
+        yield f"{rnd.randint(1, 9999)} {rnd.choice('NSEW') + ' ' if i % 3 == 0 else ''}" \
+              f"{rnd.choice(STREETS)} #{i % 400}, {rnd.choice(CITIES)}"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--queries", type=int, default=2000)
+    args = ap.parse_args()
+
+    from address_index import AddressIndex
+    data = list(addresses(args.rows))
+    idx = AddressIndex()
+    t0 = time.perf_counter()
+    idx.build(data)
+    build_s = time.perf_counter() - t0
+    tracemalloc.start()
+    traced = AddressIndex()
+    traced.build(data)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rnd = random.Random(11)
+    prefix, fuzzy = [], []
+    for _ in range(args.queries):
+        a = rnd.choice(data)
+        q = a[:rnd.randint(4, len(a))]
+        t0 = time.perf_counter(); idx.search(q); prefix.append((time.perf_counter() - t0) * 1000)
+        typo = a[:3] + a[4:]
+        t0 = time.perf_counter(); idx.search(typo); fuzzy.append((time.perf_counter() - t0) * 1000)
+
+    report("address_index", rows=args.rows, distinct=len(idx), build_s=round(build_s, 3),
+           mb=round(size / 2**20, 1), mb_per_100k=round(size / 2**20 * 100000 / max(len(idx), 1), 1),
+           prefix_p50_ms=round(percentile(prefix, 50), 4), prefix_p95_ms=round(percentile(prefix, 95), 4),
+           fuzzy_p50_ms=round(percentile(fuzzy, 50), 4), fuzzy_p95_ms=round(percentile(fuzzy, 95), 4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Every route against its SQL statement budget (see budgets.py).
+
+    python -m bench.budgets [--participants 400] [--rows 60]
+
+Builds a small fixture (5 participants with 3 notes, services and referrals
+each) and a large one (*participants* with *rows* of each), and on both calls
+every route ``create_app`` registers once, counting the statements it runs.
+The v1 participant routes (routes/nested.py, not registered by ``create_app``)
+are mounted too and checked where they declare a budget.
+
+Prints one JSON line per route and size, and exits non-zero when a route has
+no budget, goes over it, runs more statements on the large fixture than on
+the small one, or does not answer with a success status.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from . import count_queries, make_app, report
+from .stubgeo import StubGeocoder
+
+SMALL = (5, 3)
+SKIP_ENDPOINTS = {"static"}  # Flask's own
+WRITE_ORDER = {"GET": 0, "POST": 1, "PUT": 1, "PATCH": 1, "DELETE": 2}
+
+IMPORT_PARTICIPANTS = "first_name,last_name,dob,phone\nAda,Lovelace,1985-12-10,5550100\nAlan,Turing,1982-06-23,5550101\n"
+
+# routes that need more than their path parameters filled in; fx is the fixture
+REQUESTS = {
+    "GET /<path:path>": lambda fx: {"path": f"/participants/{fx.pid}"},
+    "GET /assets/<path:path>": lambda fx: {"path": "/assets/index-3f9a2c1d.js"},
+    "GET /api/search": lambda fx: {"query_string": {"q": "first1"}},
+    # not in the address index, so it goes through both geocoder cache tiers to the stub
+    "GET /api/addresses": lambda fx: {"query_string": {"q": f"{fx.size} harbor blvd"}},
+    "POST /api/login": lambda fx: {"json": {"email": "staff@example.org", "password": "x"}},
+    "POST /api/batch": lambda fx: {"json": {"requests": [{"path": f"/api/participants/{fx.pid}"},
+                                                         {"path": f"/api/participants/{fx.pid}/notes"}]}},
+    "POST /api/import": lambda fx: {"data": {
+        "participants": (io.BytesIO(IMPORT_PARTICIPANTS.encode()), "participants.csv"),
+        "services": (io.BytesIO(f"participant_id,service_type\n{fx.pid},resume\n{fx.pid},orientation\n".encode()),
+                     "services.csv")}},
+    "POST /api/participants": lambda fx: {"json": {"first_name": "First1", "last_name": "Last1", "phone": "555-0001"}},
+    "PUT /api/participants/<int:pid>": lambda fx: {"json": {"phone": "555-0199"}},
+    "POST /api/participants/<int:pid>/notes": lambda fx: {"json": {"content": "called about the interview"}},
+    "POST /api/participants/<int:pid>/services": lambda fx: {"json": {"service_type": "resume"}},
+    "POST /api/participants/<int:pid>/referrals": lambda fx: {"json": {"employer_id": 1}},
+    "POST /api/services/batch": lambda fx: {"json": {"service_type": "orientation", "participant_ids": fx.pids[:2]}},
+    "POST /api/employers": lambda fx: {"json": {"name": "Harbor Freight"}},
+    "POST /api/providers": lambda fx: {"json": {"name": "Valley Adult School"}},
+    "POST /api/participants/<int:pid>/merge": lambda fx: {"json": {"merge_ids": [fx.spares[1]]}},
+    "POST /api/participants/bulk-delete": lambda fx: {"json": {"ids": fx.spares[2:]}},
+    "DELETE /api/participants/<int:pid>": lambda fx: {"path": f"/api/participants/{fx.spares[0]}"},
+}
+
+
+def seed(participants, rows):
+    """*participants* participants with *rows* notes, services and referrals each."""
+    from models import (db, Participant, CaseNote, Service, Referral, Employer, Provider,
+                        Assessment, Employment, Education, Milestone)
+    import address_index, duplicates, fulltext, rollups
+
+    now = datetime.utcnow()
+    for model, kind in ((Employer, "Market"), (Provider, "College")):
+        db.session.execute(model.__table__.insert(), [
+            {"name": f"{model.__name__} {i}", "address": f"{i} {kind} St"} for i in range(1, 11)])
+    db.session.execute(Participant.__table__.insert(), [
+        {"first_name": f"First{i}", "last_name": f"Last{i % 50}", "dob": date(1960, 1, 1) + timedelta(days=97 * i),
+         "address": f"{i} Main St", "email": f"p{i}@example.org", "phone": f"555{i:07d}",
+         "created_at": now - timedelta(minutes=i)} for i in range(participants)])
+    pids = db.session.scalars(db.select(Participant.id).order_by(Participant.id)).all()
+
+    def each(make, n=rows):
+        return [make(pid, j) for pid in pids for j in range(n)]
+
+    db.session.execute(CaseNote.__table__.insert(), each(lambda pid, j: {
+        "participant_id": pid, "content": f"note {j}", "staff_id": j % 7, "created_at": now - timedelta(hours=j)}))
+    db.session.execute(Service.__table__.insert(), each(lambda pid, j: {
+        "participant_id": pid, "service_type": f"type {j % 6}", "provided_at": now - timedelta(hours=j)}))
+    db.session.execute(Referral.__table__.insert(), each(lambda pid, j: {
+        "participant_id": pid, "employer_id": j % 10 + 1 if j % 2 else None,
+        "provider_id": None if j % 2 else j % 10 + 1, "referred_at": now - timedelta(hours=j)}))
+    few = max(1, rows // 10)
+    for model, make in ((Assessment, lambda pid, j: {"participant_id": pid, "kind": "intake", "score": j}),
+                        (Employment, lambda pid, j: {"participant_id": pid, "employer": "Employer 1", "position": "clerk"}),
+                        (Education, lambda pid, j: {"participant_id": pid, "school": "College 1", "program": "GED"}),
+                        (Milestone, lambda pid, j: {"participant_id": pid, "name": "hired"})):
+        db.session.execute(model.__table__.insert(), each(make, few))
+    db.session.commit()
+    # what the ORM events would have kept up to date for rows added one by one
+    rollups.rebuild()
+    duplicates.refresh_keys()
+    fulltext.reindex()
+    address_index.rebuild()
+
+    rid = db.session.scalar(db.select(Referral.id).where(Referral.participant_id == pids[0]))
+    return SimpleNamespace(pid=pids[0], rid=rid, pids=pids, spares=pids[-3:])
+
+
+def spa_dist():
+    dist = tempfile.mkdtemp(prefix="mis-budgets-dist-")
+    os.makedirs(os.path.join(dist, "assets"))
+    for rel, body in (("index.html", "<!doctype html><div id=root></div>"), ("assets/index-3f9a2c1d.js", "0")):
+        with open(os.path.join(dist, rel), "w") as fh:
+            fh.write(body)
+    return dist
+
+
+def routes(app):
+    """``(method, rule, budget)`` for each route to call, reads first and deletes last."""
+    from budgets import UNDECLARED, budget_of
+    out = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint in SKIP_ENDPOINTS:
+            continue
+        budget = budget_of(app.view_functions[rule.endpoint])
+        if rule.endpoint.startswith("nested.") and budget is UNDECLARED:
+            continue
+        for method in rule.methods - {"HEAD", "OPTIONS"}:
+            out.append((method, rule, budget))
+    return sorted(out, key=lambda r: (WRITE_ORDER[r[0]], r[1].rule, r[0]))
+
+
+def measure(size, participants, rows):
+    app = make_app()
+    from flask_jwt_extended import create_access_token
+    from models import db
+    from routes.nested import bp_nested
+    app.register_blueprint(bp_nested)
+    with app.app_context():
+        fx = seed(participants, rows)
+        fx.size = size
+        token = create_access_token(identity="bench")
+        engine = db.engine
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    # the first request starts the address index's build thread; let it finish before counting
+    client.get("/healthz")
+    for t in threading.enumerate():
+        if t.name == "address-index":
+            t.join()
+    out = {}
+    for method, rule, budget in routes(app):
+        key = f"{method} {rule.rule}"
+        kwargs = REQUESTS[key](fx) if key in REQUESTS else {}
+        path = kwargs.pop("path", None) or rule.build({"pid": fx.pid, "rid": fx.rid}, append_unknown=False)[1]
+        with count_queries(engine) as stmts:
+            resp = client.open(path, method=method, headers=headers, **kwargs)
+            resp.get_data()  # streamed exports query while they are read
+        out[key] = (budget, resp.status_code, len(stmts))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--participants", type=int, default=400)
+    ap.add_argument("--rows", type=int, default=60, help="notes, services and referrals per participant")
+    args = ap.parse_args()
+    os.environ["SLOWLOG_MS"] = "0"  # its writer thread would show up in the counts
+    os.environ["ADDRESS_INDEX_REFRESH_S"] = "0"  # build once, then stop
+    os.environ["SPA_DIST_DIR"] = spa_dist()
+    os.environ["GEOCODER_URL"] = StubGeocoder(delay=0).url
+
+    from budgets import UNDECLARED
+    results = {"small": measure("small", *SMALL), "large": measure("large", args.participants, args.rows)}
+    failures = []
+    for key, (budget, _, _) in results["small"].items():
+        counts = {size: results[size][key][2] for size in results}
+        for size in results:
+            _, status, n = results[size][key]
+            report("budgets", route=key, size=size, status=status, queries=n,
+                   budget=None if budget is UNDECLARED else budget)
+            if status >= 400:
+                failures.append(f"{key}: {status} on the {size} fixture")
+        if budget is UNDECLARED:
+            failures.append(f"{key}: no @query_budget")
+        elif budget is not None and max(counts.values()) > budget:
+            failures.append(f"{key}: {max(counts.values())} statements, budget {budget}")
+        if budget is not None and counts["large"] > counts["small"]:
+            failures.append(f"{key}: {counts['small']} statements small, {counts['large']} large")
+    for f in failures:
+        print(f, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Duplicate detection at scale: run time, candidate pairs, recall on planted duplicates.
+
+    python -m bench.duplicates --rows 100000 --rows 1000000
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from . import report
+
+FIRST = ("Maria Jose Ana Luis James Mary Tyrone Keisha Bao Linh Daniel Jessica Robert "
+         "Ashley Michael Brittany David Jasmine Carlos Sofia Anthony Destiny").split()
+LAST = ("Gonzalez Smith Johnson Lopez Tran Williams Garcia Brown Lee Patel Nguyen Martinez "
+        "Hernandez Davis Rodriguez Wilson Anderson Thomas Taylor Moore Jackson Martin").split()
+
+SYLLABLES = ["", "a", "ez", "son", "ton", "berg", "ski", "o", "ian", "ell", "man", "ley", "ford", "wick"]
+
+
+def _typo(rnd, s):
+    if len(s) < 4:
+        return s
+    i = rnd.randrange(1, len(s) - 1)
+    return rnd.choice([s[:i] + s[i + 1:], s[:i] + s[i + 1] + s[i] + s[i + 2:], s[:i] + "e" + s[i + 1:]])
+
+
+def records(n, dup_rate=0.05, seed=5):
+    rnd = random.Random(seed)
+    planted = []
+    base = date(1960, 1, 1)
+    out = []
+    for i in range(1, n + 1):
+        if out and rnd.random() < dup_rate:
+            src = rnd.choice(out)
+            r = dict(src, id=i, first_name=_typo(rnd, src["first_name"]),
+                     phone=src["phone"] if rnd.random() < 0.5 else None)
+            planted.append((src["id"], i))
+        else:
+            r = {"id": i, "first_name": rnd.choice(FIRST),
+                 "last_name": rnd.choice(LAST) + rnd.choice(["", "", "-" + rnd.choice(LAST)]) +
+                              rnd.choice(SYLLABLES) + rnd.choice(SYLLABLES),
+                 "dob": base + timedelta(days=rnd.randrange(15000)),
+                 "phone": f"209{rnd.randrange(10**7):07d}" if rnd.random() < 0.7 else None,
+                 "email": f"u{i}@example.org" if rnd.random() < 0.4 else None}
+        out.append(r)
+    return out, planted
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, action="append")
+    args = ap.parse_args()
+
+    from duplicates import scan
+    for n in args.rows or [100000]:
+        data, planted = records(n)
+        t0 = time.perf_counter()
+        pairs = scan(data)
+        elapsed = time.perf_counter() - t0
+        found = {(p["a"], p["b"]) for p in pairs}
+        hit = sum(1 for a, b in planted if (min(a, b), max(a, b)) in found)
+        report("duplicates", rows=n, seconds=round(elapsed, 2), pairs=len(pairs),
+               planted=len(planted), recall=round(hit / max(len(planted), 1), 3),
+               us_per_row=round(elapsed / n * 1e6, 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Conditional GETs: a cache hit must not touch the data tables.
+
+    python -m bench.etags
+
+Checks that a matching If-None-Match gets a 304 after a single version lookup,
+that every kind of write changes the tag, that pages of a list have their
+own tags, and that bumping a new counter twice upserts it. Exits non-zero on
+any failure.
+"""
+import sys
+from urllib.parse import quote
+
+from . import count_queries, make_app, report, timed
+
+
+def main():
+    app = make_app()
+    from models import db
+    with app.app_context():
+        engine = db.engine
+    client = app.test_client()
+    for i in range(200):
+        client.post("/api/employers", json={"name": f"Employer {i}"})
+    pid = client.post("/api/participants", json={"first_name": "Ann", "last_name": "Lee"}).get_json()["id"]
+    other = client.post("/api/participants", json={"first_name": "Anne", "last_name": "Lee",
+                                                   "phone": "555-0100"}).get_json()["id"]
+    failures = []
+
+    def check(name, ok):
+        if not ok:
+            failures.append(name)
+
+    for url in (f"/api/participants/{pid}", "/api/employers", "/api/providers"):
+        first = client.get(url)
+        tag = first.headers.get("ETag")
+        with count_queries(engine) as stmts:
+            hit = client.get(url, headers={"If-None-Match": tag})
+        check(f"{url} 304", hit.status_code == 304 and not hit.data)
+        check(f"{url} only the version lookup",
+              len(stmts) == 1 and "entity_versions" in stmts[0] and "FROM employers" not in stmts[0])
+        report("etags", url=url, full_bytes=len(first.data), hit_status=hit.status_code,
+               hit_queries=len(stmts), miss=timed(lambda: client.get(url), 30),
+               hit=timed(lambda: client.get(url, headers={"If-None-Match": tag}), 30))
+
+    def changes(url, write):
+        tag = client.get(url).headers["ETag"]
+        write()
+        resp = client.get(url, headers={"If-None-Match": tag})
+        return resp.status_code == 200 and resp.headers["ETag"] != tag
+
+    check("PUT participant", changes(f"/api/participants/{pid}",
+                                     lambda: client.put(f"/api/participants/{pid}", json={"race": "x"})))
+    check("POST employer", changes("/api/employers", lambda: client.post("/api/employers", json={"name": "New"})))
+    check("POST provider", changes("/api/providers", lambda: client.post("/api/providers", json={"name": "New"})))
+    check("merge", changes(f"/api/participants/{pid}",
+                           lambda: client.post(f"/api/participants/{pid}/merge", json={"merge_ids": [other]})))
+
+    # pages of one list share its counter, not their tag; the order of the query doesn't matter
+    first = client.get("/api/employers", query_string={"limit": 20})
+    after = first.get_json()["next_cursor"]
+    second = client.get("/api/employers", query_string={"limit": 20, "after": after},
+                        headers={"If-None-Match": first.headers["ETag"]})
+    check("next page not validated by the first's tag",
+          second.status_code == 200 and second.headers["ETag"] != first.headers["ETag"])
+    again = client.get(f"/api/employers?after={quote(after)}&limit=20", headers={"If-None-Match": second.headers["ETag"]})
+    check("same page, parameters reordered", again.status_code == 304)
+
+    import etags
+    with app.app_context():
+        conn = db.session.connection()
+        etags.bump(conn, "bench:new")
+        etags.bump(conn, "bench:new", "bench:other")
+        db.session.commit()
+        check("bump upserts new counters", etags.versions("bench:new", "bench:other") == [2, 1])
+    report("etags_check", failures=failures)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Time-to-first-byte, total time, bytes on the wire and peak Python memory for
+report exports, uncompressed and with each Accept-Encoding.
+
+    python -m bench.exports --rows 200000
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from . import make_app, report
+
+
+def seed(db, Participant, Service, rows, batch=20000):
+    t0 = datetime.utcnow() - timedelta(days=60)
+    step = timedelta(days=59) / max(rows, 1)
+    db.session.execute(Participant.__table__.insert(), [
+        {"id": i, "first_name": f"First{i}", "last_name": f"Last{i}",
+         "address": f"{i} Main St, Stockton, CA", "created_at": t0}
+        for i in range(1, 1001)
+    ])
+    for start in range(0, rows, batch):
+        db.session.execute(Service.__table__.insert(), [
+            {"participant_id": 1 + i % 1000, "service_type": "group",
+             "note": "attended workshop", "provided_at": t0 + step * i}
+            for i in range(start, min(rows, start + batch))
+        ])
+    db.session.commit()
+
+
+def measure(client, url, encoding=None):
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    resp = client.get(url, buffered=False, headers=headers)
+    ttfb = None
+    size = 0
+    for chunk in resp.response:
+        if ttfb is None:
+            ttfb = time.perf_counter() - t0
+        size += len(chunk)
+    total = time.perf_counter() - t0
+    sent = resp.headers.get("Content-Encoding")  # what came back, e.g. no "br" without the brotli package
+    resp.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"content_encoding": sent, "ttfb_ms": round(ttfb * 1000, 2), "total_ms": round(total * 1000, 2),
+            "bytes": size, "peak_kb": peak // 1024}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200000)
+    ap.add_argument("--db")
+    args = ap.parse_args()
+
+    app = make_app(args.db)
+    from models import db, Participant, Service
+    with app.app_context():
+        if not db.session.query(Service.id).first():
+            seed(db, Participant, Service, args.rows)
+    client = app.test_client()
+
+    for url in ("/api/reports/services.csv", "/api/reports/services",
+                "/api/reports/services?format=ndjson"):
+        for encoding in (None, "gzip", "br"):
+            report("export", url=url, rows=args.rows, encoding=encoding,
+                   **measure(client, url, encoding))
+
+
+if __name__ == "__main__":
+    main()
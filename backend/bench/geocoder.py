@@ -0,0 +1,131 @@
+"""Address autocomplete against a stub geocoder: hit rate and latency.
+
+Several simulated users type the same handful of addresses keystroke by
+keystroke, so the cache and request coalescing both get exercised.
+
+    python -m bench.geocoder --users 8 --delay 0.05
+
+With ``--slow`` the stub answers slower than the upstream timeout, and the
+script checks that autocomplete degrades quickly (breaker opens) while
+participant reads running alongside keep their latency.
+
+    python -m bench.geocoder --slow
+
+With ``--breaker`` it checks that an open breaker whose cooldown has passed
+still gets its trial call when the first request after the cooldown is
+turned away for a full backlog. Exits non-zero on failure.
+
+    python -m bench.geocoder --breaker
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import make_app, percentile, report
+from .stubgeo import StubGeocoder
+
+ADDRESSES = [
+    "1120 N Stockton Blvd, Stockton, CA", "222 E Weber Ave, Stockton, CA",
+    "4545 Pacific Ave, Stockton, CA", "31 S El Dorado St, Stockton, CA",
+    "1800 N California St, Stockton, CA",
+]
+
+
+def slow(args):
+    stub = StubGeocoder(delay=3.0)
+    os.environ["GEOCODER_URL"] = stub.url
+    app = make_app()
+    import geocoder
+    geocoder.TIMEOUT, geocoder.WAIT_SECONDS = 1.0, 0.25
+
+    def lookups(n):
+        client, samples = app.test_client(), []
+        for i in range(20):
+            t0 = time.perf_counter()
+            client.get("/api/addresses", query_string={"q": f"{n} slow street {i}"})
+            samples.append((time.perf_counter() - t0) * 1000)
+        return samples
+
+    def reads(_):
+        client, samples = app.test_client(), []
+        for _ in range(50):
+            t0 = time.perf_counter()
+            client.get("/api/participants")
+            samples.append((time.perf_counter() - t0) * 1000)
+        return samples
+
+    with ThreadPoolExecutor(args.users * 2) as pool:
+        geo = pool.map(lookups, range(args.users))
+        other = pool.map(reads, range(args.users))
+        geo = [s for chunk in geo for s in chunk]
+        other = [s for chunk in other for s in chunk]
+    report("geocoder_slow", lookups=len(geo), geo_p95_ms=round(percentile(geo, 95), 2),
+           participants_p95_ms=round(percentile(other, 95), 2), upstream_calls=stub.calls,
+           **geocoder.stats())
+    stub.close()
+
+
+def breaker(args):
+    stub = StubGeocoder(delay=0)
+    os.environ["GEOCODER_URL"] = stub.url
+    app = make_app()
+    import geocoder
+    client = app.test_client()
+    b = geocoder._breaker
+    b.state, b._opened = "open", time.monotonic() - b.reset  # cooldown just elapsed
+    geocoder._pending = geocoder.MAX_QUEUE
+    full = client.get("/api/addresses", query_string={"q": "1 backlog full st"})
+    after_full = b.state
+    geocoder._pending = 0
+    trial = client.get("/api/addresses", query_string={"q": "2 trial call st"})
+    fallback = full.headers.get("X-Geocoder-Fallback")
+    ok = fallback == "geocoder backlog full" and after_full == "open" and stub.calls == 1 and b.state == "closed"
+    report("geocoder_breaker", fallback=fallback, state_after_reject=after_full,
+           upstream_calls=stub.calls, state_after_trial=b.state, ok=bool(ok))
+    stub.close()
+    sys.exit(0 if ok else 1)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=8)
+    ap.add_argument("--delay", type=float, default=0.05, help="stub upstream latency (s)")
+    ap.add_argument("--slow", action="store_true", help="upstream slower than its timeout")
+    ap.add_argument("--breaker", action="store_true", help="check the half-open trial survives a full backlog")
+    args = ap.parse_args()
+    if args.slow:
+        return slow(args)
+    if args.breaker:
+        return breaker(args)
+
+    stub = StubGeocoder(delay=args.delay)
+    os.environ["GEOCODER_URL"] = stub.url
+    app = make_app()
+    import geocoder
+
+    def user(n):
+        client = app.test_client()
+        samples = []
+        for addr in ADDRESSES[n % len(ADDRESSES):] + ADDRESSES[:n % len(ADDRESSES)]:
+            for i in range(3, len(addr) + 1):
+                t0 = time.perf_counter()
+                client.get("/api/addresses", query_string={"q": addr[:i]})
+                samples.append((time.perf_counter() - t0) * 1000)
+        return samples
+
+    with ThreadPoolExecutor(args.users) as pool:
+        samples = [s for chunk in pool.map(user, range(args.users)) for s in chunk]
+
+    st = geocoder.stats()
+    hits = st["memory_hits"] + st["db_hits"] + st["coalesced"]
+    report("geocoder", calls=len(samples), upstream_calls=stub.calls,
+           hit_rate=round(hits / len(samples), 3),
+           p50_ms=round(percentile(samples, 50), 2), p95_ms=round(percentile(samples, 95), 2),
+           **st)
+    stub.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Concurrent note/service inserts with and without group commit.
+
+    python -m bench.groupcommit [--procs 8] [--threads 16] [--requests 10]
+
+Each mode gets a fresh SQLite file and ``--procs`` worker processes (like
+gunicorn workers), each running ``--threads`` threads that POST notes and
+services. Reports throughput and how many requests failed, which on SQLite
+means "database is locked".
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import threading
+import time
+
+from . import make_app, report
+
+
+def _setup(db_path):
+    app = make_app(db_path)
+    from models import db, Participant
+    with app.app_context():
+        db.session.add_all(Participant(first_name=f"P{i}", last_name="Bench") for i in range(50))
+        db.session.commit()
+
+
+def _worker(db_path, group_commit, threads, per_thread, start, out):
+    os.environ["GROUP_COMMIT"] = "1" if group_commit else "0"
+    app = make_app(db_path)
+    client_errors = []
+    ok = [0]
+    lock = threading.Lock()
+
+    def run(t):
+        client = app.test_client()
+        for i in range(per_thread):
+            pid = 1 + (t * per_thread + i) % 50
+            if i % 2:
+                resp = client.post(f"/api/participants/{pid}/services", json={"service_type": "drop-in"})
+            else:
+                resp = client.post(f"/api/participants/{pid}/notes", json={"content": f"sign-in {i}"})
+            with lock:
+                if resp.status_code == 201:
+                    ok[0] += 1
+                else:
+                    client_errors.append(resp.status_code)
+
+    ts = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    start.wait()  # every worker is up; the clock starts now
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    out.put((ok[0], len(client_errors)))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--procs", type=int, default=8)
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=10, help="per thread")
+    args = ap.parse_args()
+
+    ctx = mp.get_context("spawn")
+    for group_commit in (False, True):
+        db_path = os.path.join(tempfile.mkdtemp(prefix="mis-bench-"), "bench.db")
+        p = ctx.Process(target=_setup, args=(db_path,))
+        p.start(); p.join()
+        out, start = ctx.Queue(), ctx.Barrier(args.procs + 1)
+        procs = [ctx.Process(target=_worker,
+                             args=(db_path, group_commit, args.threads, args.requests, start, out))
+                 for _ in range(args.procs)]
+        for p in procs:
+            p.start()
+        start.wait()
+        t0 = time.perf_counter()
+        results = [out.get() for _ in procs]
+        seconds = time.perf_counter() - t0
+        for p in procs:
+            p.join()
+        ok = sum(r[0] for r in results)
+        errors = sum(r[1] for r in results)
+        report("groupcommit", group_commit=group_commit, ok=ok, errors=errors,
+               seconds=round(seconds, 2), inserts_per_s=round(ok / seconds))
+
+
+if __name__ == "__main__":
+    main()
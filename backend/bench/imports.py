@@ -0,0 +1,68 @@
+"""Bulk import throughput.
+
+    python -m bench.imports [--rows 100000]
+
+Writes a participants CSV (with a few bad rows), a services CSV and a case-notes
+JSONL keyed to it, imports them in one run and reports rows per second.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+import time
+
+from . import make_app, report
+
+
+def write_files(n, folder, seed=7):
+    rnd = random.Random(seed)
+    paths = {k: os.path.join(folder, f"{k}.{ext}") for k, ext in
+             (("participants", "csv"), ("services", "csv"), ("case_notes", "jsonl"))}
+    with open(paths["participants"], "w", newline="") as fh:
+        w = csv.writer(fh)
+        w.writerow(["key", "first_name", "last_name", "dob", "phone", "email", "address", "created_at"])
+        for i in range(n):
+            first = "" if i % 1000 == 999 else f"First{rnd.randrange(5000)}"  # ~0.1% rejects
+            w.writerow([f"old-{i}", first, f"Last{rnd.randrange(20000)}",
+                        f"{rnd.randrange(1940, 2005)}-{rnd.randrange(1, 13):02d}-{rnd.randrange(1, 29):02d}",
+                        f"555{rnd.randrange(10**7):07d}", f"p{i}@example.org",
+                        f"{rnd.randrange(1, 9999)} Main St", f"2023-{rnd.randrange(1, 13):02d}-01T09:00:00"])
+    with open(paths["services"], "w", newline="") as fh:
+        w = csv.writer(fh)
+        w.writerow(["participant_key", "service_type", "provided_at"])
+        for i in range(n):
+            w.writerow([f"old-{rnd.randrange(n)}", f"type {i % 7}", "2024-03-01T10:00:00"])
+    with open(paths["case_notes"], "w") as fh:
+        for i in range(n):
+            fh.write(json.dumps({"participant_key": f"old-{rnd.randrange(n)}",
+                                 "content": f"followed up on item {i}", "created_at": "2024-03-02"}) + "\n")
+    return paths
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--db")
+    args = ap.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="mis-import-")
+    paths = write_files(args.rows, folder)
+    app = make_app(args.db)
+    import importer
+
+    with app.app_context():
+        handles = {k: open(p, newline="", encoding="utf-8") for k, p in paths.items()}
+        files = {k: (p, handles[k], importer.guess_format(p)) for k, p in paths.items()}
+        t0 = time.perf_counter()
+        counts = importer.run(files)
+        seconds = time.perf_counter() - t0
+        for fh in handles.values():
+            fh.close()
+    total = counts["participants"] + counts["services"] + counts["case_notes"]
+    report("import", **counts, seconds=round(seconds, 2), rows_per_s=round(total / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Merge and cascade-delete cost for a participant with many child rows.
+
+    python -m bench.merge [--children 10000]
+
+Checks afterwards that nothing is orphaned and the rollups still match raw counts.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from . import count_queries, make_app, report
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--children", type=int, default=10000)
+    ap.add_argument("--db")
+    args = ap.parse_args()
+
+    app = make_app(args.db)
+    import merge, rollups
+    from models import (db, Participant, CaseNote, Service, Referral, Assessment,
+                        Employment, Education, Milestone)
+
+    with app.app_context():
+        a = Participant(first_name="Dana", last_name="Whitaker", phone="555-0100")
+        b = Participant(first_name="Dana", last_name="Whittaker", email="dana@example.org")
+        db.session.add_all([a, b]); db.session.flush()
+        start = datetime(2024, 1, 1)
+        per = args.children // 7
+        rows = {CaseNote: lambda i: {"content": f"note {i}", "created_at": start + timedelta(hours=i)},
+                Service: lambda i: {"service_type": f"type {i % 5}", "provided_at": start + timedelta(hours=i)},
+                Referral: lambda i: {"status": "referred", "referred_at": start + timedelta(hours=i)},
+                Assessment: lambda i: {"kind": "intake", "score": i % 10},
+                Employment: lambda i: {"employer": "Acme"},
+                Education: lambda i: {"school": "Central"},
+                Milestone: lambda i: {"name": f"m{i}"}}
+        for model, make in rows.items():
+            db.session.execute(model.__table__.insert(),
+                               [{"participant_id": b.id, **make(i)} for i in range(per)])
+        db.session.commit()
+        rollups.catch_up()
+        survivor, loser = a.id, b.id
+
+        with count_queries(db.engine) as stmts:
+            t0 = time.perf_counter()
+            moved = merge.merge(survivor, [loser])
+            ms = (time.perf_counter() - t0) * 1000.0
+        report("merge", children=sum(moved.values()), ms=round(ms, 3), queries=len(stmts))
+
+        with count_queries(db.engine) as stmts:
+            t0 = time.perf_counter()
+            deleted = merge.delete([survivor])
+            ms = (time.perf_counter() - t0) * 1000.0
+        report("cascade_delete", rows=sum(deleted.values()), ms=round(ms, 3), queries=len(stmts))
+
+        left = sum(db.session.query(m).count() for m in rows)
+        bad = rollups.check()
+        report("merge_check", orphans=left, rollup_mismatches=len(bad))
+    sys.exit(0 if not left and not bad else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Per-request metrics: streamed exports must count the statements their body runs.
+
+    python -m bench.metrics [--rows 2000]
+
+Reads each report export to the end and checks that /api/metrics recorded at
+least one SQL statement for it, and that it sent no Server-Timing header
+(which would have gone out before the queries ran). A plain JSON route is
+checked alongside for the header. Exits non-zero on any failure.
+"""
+import argparse
+import re
+import sys
+
+from . import make_app, report
+from .exports import seed
+
+EXPORTS = ("/api/reports/services.csv", "/api/reports/services", "/api/reports/participants.csv",
+           "/api/reports/participants")
+
+
+def statements(text, endpoint):
+    """``(requests, statements)`` recorded for GET *endpoint* in /api/metrics *text*."""
+    labels = re.escape(f'endpoint="{endpoint}",method="GET"')
+    count = re.search(rf"^mis_db_statements_count{{{labels}}} (\S+)$", text, re.M)
+    total = re.search(rf"^mis_db_statements_sum{{{labels}}} (\S+)$", text, re.M)
+    return (int(count.group(1)) if count else 0), (float(total.group(1)) if total else 0.0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2000)
+    args = ap.parse_args()
+
+    app = make_app()
+    from models import db, Participant, Service
+    with app.app_context():
+        seed(db, Participant, Service, args.rows)
+    client = app.test_client()
+    failures = []
+
+    for url in EXPORTS:
+        resp = client.get(url, buffered=False)
+        size = sum(len(chunk) for chunk in resp.response)
+        timing = resp.headers.get("Server-Timing")
+        resp.close()
+        n, total = statements(client.get("/api/metrics").get_data(as_text=True), url)
+        report("metrics", url=url, bytes=size, requests=n, statements=total, server_timing=timing)
+        if n != 1 or total < 1:
+            failures.append(f"{url}: {n} requests, {total} statements recorded")
+        if timing is not None:
+            failures.append(f"{url}: streamed response sent Server-Timing")
+
+    timing = client.get("/api/employers").headers.get("Server-Timing")
+    if not timing or "queries" not in timing:
+        failures.append(f"/api/employers: Server-Timing {timing!r}")
+    for f in failures:
+        print(f, file=sys.stderr)
+    report("metrics_check", failures=failures)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Keyset vs OFFSET paging over a large participants table.
+
+    python -m bench.pagination --rows 500000
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from . import make_app, report, timed
+
+
+def seed(db, Participant, rows, batch=20000):
+    t0 = datetime(2015, 1, 1)
+    table = Participant.__table__
+    for start in range(0, rows, batch):
+        db.session.execute(table.insert(), [
+            {"first_name": f"F{i}", "last_name": f"L{i}",
+             "created_at": t0 + timedelta(minutes=i)}
+            for i in range(start, min(rows, start + batch))
+        ])
+    db.session.commit()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=500000)
+    ap.add_argument("--limit", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=30)
+    ap.add_argument("--db")
+    args = ap.parse_args()
+
+    app = make_app(args.db)
+    from models import db, Participant
+    with app.app_context():
+        if not db.session.query(Participant.id).first():
+            seed(db, Participant, args.rows)
+    client = app.test_client()
+
+    # walk to a handful of depths once, remembering the cursor for each
+    depths = [0, args.rows // 100, args.rows // 10, args.rows // 2, args.rows - args.limit]
+    cursors, after, seen = {}, None, 0
+    big = 1000
+    while seen < depths[-1]:
+        for d in depths:
+            if seen <= d < seen + big and d not in cursors:
+                cursors[d] = (after, seen)
+        qs = f"?limit={big}" + (f"&after={after}" if after else "")
+        after = client.get("/api/participants" + qs).get_json()["next_cursor"]
+        seen += big
+        if after is None:
+            break
+
+    for d in depths:
+        cur, d = cursors.get(d, (None, 0))
+        url = f"/api/participants?limit={args.limit}" + (f"&after={cur}" if cur else "")
+        report("keyset_page", depth=d, **timed(lambda: client.get(url), args.repeat))
+
+        def offset_page():
+            with app.app_context():
+                (Participant.query.order_by(Participant.created_at.desc(), Participant.id.desc())
+                 .offset(d).limit(args.limit).all())
+        report("offset_page", depth=d, **timed(offset_page, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Participant detail page: six-request fan-out vs. GET /participants/<pid>/profile.
+
+    python -m bench.profile [--notes 300] [--orgs 500]
+
+Reports SQL statements, response bytes and latency for each way of loading the page.
+"""
+import argparse
+
+from . import count_queries, make_app, report, timed
+
+FAN_OUT = ("/api/participants/{pid}", "/api/participants/{pid}/notes", "/api/participants/{pid}/services",
+           "/api/participants/{pid}/referrals", "/api/employers", "/api/providers")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--notes", type=int, default=300)
+    ap.add_argument("--orgs", type=int, default=500)
+    args = ap.parse_args()
+
+    app = make_app()
+    from models import db, Participant, CaseNote, Service, Referral, Employer, Provider
+    with app.app_context():
+        db.session.execute(Employer.__table__.insert(),
+                           [{"name": f"Employer {i}", "address": f"{i} Main St"} for i in range(args.orgs)])
+        db.session.execute(Provider.__table__.insert(),
+                           [{"name": f"Provider {i}", "address": f"{i} Side St"} for i in range(args.orgs)])
+        p = Participant(first_name="Dana", last_name="Whitaker")
+        db.session.add(p); db.session.flush()
+        db.session.execute(CaseNote.__table__.insert(),
+                           [{"participant_id": p.id, "content": f"note {i} " * 10} for i in range(args.notes)])
+        db.session.execute(Service.__table__.insert(),
+                           [{"participant_id": p.id, "service_type": "group"} for i in range(args.notes // 3)])
+        db.session.execute(Referral.__table__.insert(),
+                           [{"participant_id": p.id, "employer_id": 1 + i % 5 if i % 2 else None,
+                             "provider_id": None if i % 2 else 1 + i % 5} for i in range(args.notes // 6)])
+        db.session.commit()
+        pid, engine = p.id, db.engine
+
+    client = app.test_client()
+    urls = [u.format(pid=pid) for u in FAN_OUT]
+
+    def fan_out():
+        return [client.get(u) for u in urls]
+
+    def profile():
+        return [client.get(f"/api/participants/{pid}/profile")]
+
+    for name, load in (("fan_out", fan_out), ("profile", profile)):
+        with count_queries(engine) as stmts:
+            responses = load()
+        report("profile", mode=name, requests=len(responses), queries=len(stmts),
+               bytes=sum(len(r.data) for r in responses), **timed(load, 30))
+
+
+if __name__ == "__main__":
+    main()
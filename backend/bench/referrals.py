@@ -0,0 +1,53 @@
+"""Referral lists must cost the same number of queries at any size.
+
+    python -m bench.referrals
+
+Exits non-zero if the statement count grows with the number of referrals.
+"""
+import sys
+
+from flask_jwt_extended import create_access_token
+
+from . import count_queries, make_app, report, timed
+
+
+def main():
+    app = make_app()
+    from models import db, Participant, Referral, Employer, Provider
+    from routes.nested import bp_nested
+    app.register_blueprint(bp_nested)
+
+    with app.app_context():
+        orgs = [Employer(name=f"Employer {i}") for i in range(20)] + \
+               [Provider(name=f"Provider {i}") for i in range(20)]
+        small, large = Participant(first_name="S", last_name="Mall"), Participant(first_name="L", last_name="Arge")
+        db.session.add_all(orgs + [small, large]); db.session.flush()
+        for p, n in ((small, 5), (large, 300)):
+            db.session.add_all(Referral(participant_id=p.id,
+                                        employer_id=orgs[i % 20].id if i % 2 else None,
+                                        provider_id=orgs[20 + i % 20].id if not i % 2 else None)
+                               for i in range(n))
+        db.session.commit()
+        pids = {"small": small.id, "large": large.id}
+        token = create_access_token(identity="bench")
+        engine = db.engine
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    ok = True
+    for path in ("/api/participants/{}/referrals?limit=1000", "/api/v1/participants/{}/referrals?limit=1000"):
+        counts = {}
+        for size, pid in pids.items():
+            url = path.format(pid)
+            with count_queries(engine) as stmts:
+                resp = client.get(url, headers=headers)
+            counts[size] = len(stmts)
+            report("referrals", path=path, size=size, status=resp.status_code,
+                   rows=len(resp.get_json()["items"]), queries=len(stmts),
+                   **timed(lambda: client.get(url, headers=headers), 20))
+        ok = ok and counts["small"] == counts["large"]
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Full-text search latency over a large case-notes table.
+
+    python -m bench.search --notes 1000000
+"""
+import argparse
+import random
+import time
+
+from . import make_app, report, timed
+
+WORDS = ("resume workshop housing referral interview transit voucher counseling intake "
+         "employment training forklift certificate childcare shelter benefits calfresh "
+         "medi-cal probation mentor volunteer warehouse kitchen barista security "
+         "construction welding driver license birth certificate id card bus pass").split()
+FIRST = ["Maria", "Jose", "Ana", "Luis", "James", "Mary", "Tyrone", "Keisha", "Nguyen", "Bao"]
+LAST = ["Gonzalez", "Smith", "Johnson", "Lopez", "Tran", "Williams", "Garcia", "Brown", "Lee", "Patel"]
+
+
+def seed(db, Participant, CaseNote, notes, batch=20000):
+    rnd = random.Random(3)
+    people = max(1, notes // 20)
+    db.session.execute(Participant.__table__.insert(), [
+        {"id": i, "first_name": rnd.choice(FIRST), "last_name": f"{rnd.choice(LAST)}{i % 97}",
+         "phone": f"209-555-{i % 10000:04d}", "email": f"p{i}@example.org"}
+        for i in range(1, people + 1)])
+    for start in range(0, notes, batch):
+        db.session.execute(CaseNote.__table__.insert(), [
+            {"participant_id": 1 + i % people,
+             "content": " ".join(rnd.choices(WORDS, k=6) + [f"w{rnd.randint(0, 60000)}" for _ in range(20)])}
+            for i in range(start, min(notes, start + batch))])
+    db.session.commit()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--notes", type=int, default=200000)
+    ap.add_argument("--db")
+    args = ap.parse_args()
+
+    app = make_app(args.db)
+    from models import db, Participant, CaseNote
+    with app.app_context():
+        if not db.session.query(CaseNote.id).first():
+            t0 = time.perf_counter()
+            seed(db, Participant, CaseNote, args.notes)
+            report("search_seed", notes=args.notes, seconds=round(time.perf_counter() - t0, 1))
+    client = app.test_client()
+    for q in ("forklift certificate", "gonzalez1", "maria", "wel", "209-555-0042", "zzzz"):
+        report("search", q=q, notes=args.notes,
+               **timed(lambda: client.get("/api/search", query_string={"q": q}), 20))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""JSON serialization of report payloads: Flask's default provider vs. jsonprovider.
+
+    python -m bench.serialize [--rows 10000]
+
+Times one jsonify-style response and the per-row dumps used by the streaming
+exports, for the old shape (dates isoformatted in the route) and the new one
+(datetimes passed through). Also checks that every provider produces the same
+bytes, including on edge cases; exits non-zero on a mismatch.
+"""
+import argparse
+import decimal
+import sys
+import uuid
+from datetime import date, datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from jsonprovider import IsoJSONProvider, OrjsonProvider, orjson
+
+from . import report, timed
+
+COMPACT = (",", ":")
+
+EDGE_CASES = [
+    {"name": "José Ñúñez", "emoji": "😀", "ctl": "\x00\x1f\x7f ", "q": "\"\\/"},
+    {"floats": [0.0, -0.0, 0.1, 1e-4, 1e-5, 123456.789, 1e15, 1e16, 1e22, 2.5e-7]},
+    {1: "int key", "b": None}, {"big": 2 ** 70}, [decimal.Decimal("1.10"), uuid.UUID(int=7)],
+    {"nested": {"z": [1, {"b": 2, "a": 1}], "a": True}}, [], {}, "plain", 12, None,
+]
+
+
+def services_rows(n, iso):
+    t0 = datetime(2024, 1, 1, 8, 30)
+    rows = []
+    for i in range(n):
+        provided = t0 + timedelta(minutes=7 * i, microseconds=i % 3 * 1500)
+        rows.append({
+            "id": i + 1, "participant_id": i % 997 + 1, "service_type": ("job_search", "resume", "interview")[i % 3],
+            "note": f"Met with participant about next steps, session {i}", "staff_id": i % 12 or None,
+            "provided_at": provided.isoformat() if iso else provided,
+            "participant_name": ("Ann Lee", "José García", "Dana Whitaker")[i % 3],
+            "dob": date(1980 + i % 30, 1 + i % 12, 1 + i % 28).isoformat() if iso else date(1980 + i % 30, 1 + i % 12, 1 + i % 28),
+        })
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10000)
+    args = ap.parse_args()
+
+    app = Flask(__name__)
+    providers = [("flask_default", DefaultJSONProvider(app), True), ("stdlib_iso", IsoJSONProvider(app), False)]
+    if orjson is not None:
+        providers.append(("orjson", OrjsonProvider(app), False))
+    iso_rows, native_rows = services_rows(args.rows, True), services_rows(args.rows, False)
+
+    failures = []
+    expected = providers[0][1].response(iso_rows).get_data()
+    for name, provider, iso in providers[1:]:
+        if provider.response(native_rows).get_data() != expected:
+            failures.append(f"{name}: report payload")
+        if [provider.dumps(r, separators=COMPACT) for r in native_rows[:100]] != \
+                [providers[0][1].dumps(r, separators=COMPACT) for r in iso_rows[:100]]:
+            failures.append(f"{name}: streamed rows")
+        for i, case in enumerate(EDGE_CASES):
+            try:
+                want = providers[0][1].response(case).get_data()
+            except TypeError:
+                want = TypeError
+            try:
+                got = provider.response(case).get_data()
+            except TypeError:
+                got = TypeError
+            if got != want:
+                failures.append(f"{name}: edge case {i}")
+
+    for name, provider, iso in providers:
+        rows = iso_rows if iso else native_rows
+        report("serialize", provider=name, rows=args.rows, bytes=len(expected),
+               response=timed(lambda: provider.response(rows), 20),
+               per_row=timed(lambda: [provider.dumps(r, separators=COMPACT) for r in rows], 20))
+    report("serialize_check", orjson=orjson is not None, failures=failures)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""List read paths: ORM instances + hand-written dicts vs. schema columns + compiled serializers.
+
+    python -m bench.serializers [--rows 10000]
+
+For participants, case notes and services, loads *rows* rows newest-first and
+turns them into dicts both ways, and reports rows per second. The "orm" mode is
+what the list endpoints did before schemas.py.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from . import make_app, report
+
+
+def orm_participant(p):
+    return {"id": p.id, "first_name": p.first_name, "last_name": p.last_name, "dob": p.dob, "race": p.race,
+            "address": p.address, "email": p.email, "phone": p.phone, "created_at": p.created_at}
+
+
+def orm_note(n):
+    return {"id": n.id, "participant_id": n.participant_id, "content": n.content,
+            "staff_id": n.staff_id, "created_at": n.created_at}
+
+
+def orm_service(s):
+    return {"id": s.id, "participant_id": s.participant_id, "service_type": s.service_type,
+            "note": s.note, "staff_id": s.staff_id, "provided_at": s.provided_at}
+
+
+def rate(fn, rows, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+        assert len(out) == rows
+    return round(rows / best)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10000)
+    args = ap.parse_args()
+    n = args.rows
+
+    app = make_app()
+    from models import db, Participant, CaseNote, Service
+    from schemas import PARTICIPANT, CASE_NOTE, SERVICE
+    t0 = datetime(2024, 1, 1)
+    with app.app_context():
+        db.session.execute(Participant.__table__.insert(), [
+            {"first_name": f"First{i}", "last_name": f"Last{i}", "dob": t0.date() - timedelta(days=i),
+             "email": f"p{i}@example.org", "phone": f"555-{i:07d}", "created_at": t0 + timedelta(minutes=i)}
+            for i in range(n)])
+        db.session.execute(CaseNote.__table__.insert(), [
+            {"participant_id": 1, "content": f"note {i} " * 8, "staff_id": i % 9, "created_at": t0 + timedelta(minutes=i)}
+            for i in range(n)])
+        db.session.execute(Service.__table__.insert(), [
+            {"participant_id": 1, "service_type": "resume", "note": f"s{i}", "provided_at": t0 + timedelta(minutes=i)}
+            for i in range(n)])
+        db.session.commit()
+
+        cases = (
+            ("participants", Participant, Participant.query, orm_participant, PARTICIPANT, (Participant.created_at, Participant.id)),
+            ("case_notes", CaseNote, CaseNote.query.filter_by(participant_id=1), orm_note, CASE_NOTE, (CaseNote.created_at, CaseNote.id)),
+            ("services", Service, Service.query.filter_by(participant_id=1), orm_service, SERVICE, (Service.provided_at, Service.id)),
+        )
+        for name, model, orm_query, orm_row, schema, order in cases:
+            def orm():
+                db.session.expunge_all()  # each request starts with an empty identity map
+                return [orm_row(o) for o in orm_query.order_by(*[c.desc() for c in order]).limit(n).all()]
+
+            def compiled():
+                q = schema.query()
+                if model is not Participant:
+                    q = q.filter(model.participant_id == 1)
+                return schema.to_dicts(q.order_by(*[c.desc() for c in order]).limit(n).all())
+
+            if orm() != compiled():
+                raise SystemExit(f"{name}: outputs differ")
+            report("serializers", list=name, rows=n, orm_rows_per_s=rate(orm, n), compiled_rows_per_s=rate(compiled, n))
+
+
+if __name__ == "__main__":
+    main()
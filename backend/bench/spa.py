@@ -0,0 +1,145 @@
+"""SPA deep links: per-request isfile + send_from_directory vs. the startup manifest.
+
+    python -m bench.spa [--requests 5000]
+
+Builds a fake dist/ (index.html, hashed assets, .br/.gz siblings), then reports
+requests per second for client-side routes, index.html and a hashed asset, plus
+the headers each way sends. The "disk" mode is the handler spa_static used to
+have; both run on a bare Flask app so only the handlers differ.
+
+Also checks the manifest's cache policy: only Vite's hashed files under
+assets/ are ``immutable``; everything else is ``no-cache`` with an ETag.
+Exits non-zero when a file gets the wrong one.
+"""
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+from flask import Flask, send_from_directory, request
+
+from spa_static import register_spa
+
+from . import report
+
+DEEP_LINKS = ("/participants/123", "/participants/123/notes", "/reports", "/search?q=lee")
+# path -> whether it may be cached as immutable
+CACHE_POLICY = {
+    "/assets/index-Bx3kQ9aZ.js": True,
+    "/assets/vendor-D_2Jw-xX.js": True,  # - and _ are hash characters too
+    "/assets/index-C8dPq1Lm.css": True,
+    "/assets/logo-dark.svg": False,
+    "/favicon.ico": False,
+    "/apple-touch-icon.png": False,
+    "/android-chrome-192x192.png": False,
+    "/report-summary.html": False,
+}
+
+
+def build_dist():
+    dist = tempfile.mkdtemp(prefix="mis-dist-")
+    os.makedirs(os.path.join(dist, "assets"))
+    files = {
+        "index.html": '<!doctype html><html><head><meta charset="utf-8"><title>MIS</title>'
+                      '<script type="module" src="/assets/index-Bx3kQ9aZ.js"></script>'
+                      '<link rel="stylesheet" href="/assets/index-C8dPq1Lm.css"></head>'
+                      '<body><div id="root"></div></body></html>\n' * 4,
+        "assets/index-Bx3kQ9aZ.js": "export const a = 1;\n" * 20000,
+        "assets/index-C8dPq1Lm.css": ".a{color:red}\n" * 5000,
+        "assets/vendor-D_2Jw-xX.js": "export const b = 2;\n",
+        "assets/logo-dark.svg": "<svg/>",
+        "favicon.ico": "\0" * 300,
+        "apple-touch-icon.png": "\0" * 300,
+        "android-chrome-192x192.png": "\0" * 300,
+        "report-summary.html": "<!doctype html><p>summary</p>",
+    }
+    for rel, text in files.items():
+        path = os.path.join(dist, rel)
+        with open(path, "wb") as fh:
+            fh.write(text.encode())
+        if len(text) >= 1024:
+            with open(path + ".gz", "wb") as fh:
+                fh.write(gzip.compress(text.encode(), 9))
+    return dist
+
+
+def disk_app(dist):
+    """The pre-manifest handlers: stat and reopen files on every request."""
+    app = Flask(__name__)
+
+    def send_static(directory, path):
+        if request.accept_encodings["gzip"] and os.path.isfile(os.path.join(directory, path + ".gz")):
+            resp = send_from_directory(directory, path + ".gz")
+            resp.headers["Content-Encoding"] = "gzip"
+        else:
+            resp = send_from_directory(directory, path)
+        resp.vary.add("Accept-Encoding")
+        return resp
+
+    @app.get("/assets/<path:path>")
+    def spa_assets(path):
+        return send_static(os.path.join(dist, "assets"), path)
+
+    @app.route("/", defaults={"path": ""})
+    @app.route("/<path:path>")
+    def spa_catchall(path):
+        if os.path.isfile(os.path.join(dist, path)):
+            return send_static(dist, path)
+        return send_static(dist, "index.html")
+
+    return app
+
+
+def manifest_app(dist):
+    app = Flask(__name__)
+    app.config["SPA_DIST_DIR"] = dist
+    register_spa(app)
+    return app
+
+
+def rps(client, urls, n, headers):
+    t0 = time.perf_counter()
+    for i in range(n):
+        client.get(urls[i % len(urls)], headers=headers).close()
+    return round(n / (time.perf_counter() - t0))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=5000)
+    args = ap.parse_args()
+
+    dist = build_dist()
+    headers = {"Accept-Encoding": "gzip, br"}
+    for mode, app in (("disk", disk_app(dist)), ("manifest", manifest_app(dist))):
+        client = app.test_client()
+        asset = client.get("/assets/index-Bx3kQ9aZ.js", headers=headers)
+        index = client.get("/participants/123", headers=headers)
+        revalidate = client.get("/participants/123", headers={**headers, "If-None-Match": index.headers.get("ETag", "")})
+        report("spa", mode=mode,
+               deep_link_rps=rps(client, DEEP_LINKS, args.requests, headers),
+               index_rps=rps(client, ["/"], args.requests, headers),
+               asset_rps=rps(client, ["/assets/index-Bx3kQ9aZ.js"], args.requests // 5, headers),
+               index_cache_control=index.headers.get("Cache-Control"),
+               index_revalidate_status=revalidate.status_code,
+               asset_cache_control=asset.headers.get("Cache-Control"),
+               asset_encoding=asset.headers.get("Content-Encoding"))
+
+    client = manifest_app(dist).test_client()
+    failures = []
+    for path, immutable in CACHE_POLICY.items():
+        resp = client.get(path)
+        cc = resp.cache_control
+        ok = (resp.status_code == 200 and cc.immutable == immutable and (cc.max_age == 31536000) == immutable
+              and bool(cc.no_cache) != immutable and resp.get_etag()[0] is not None)
+        report("spa_cache", path=path, cache_control=resp.headers.get("Cache-Control"),
+               etag=resp.headers.get("ETag") is not None, ok=ok)
+        if not ok:
+            failures.append(path)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""A local stand-in for Nominatim's /search, for benchmarks.
+
+Answers every query with a single result echoing it back, after *delay* seconds.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubGeocoder:
+    def __init__(self, delay=0.02, fail=False):
+        self.delay, self.fail, self.calls = delay, fail, 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.calls += 1
+                threading.Event().wait(stub.delay)
+                if stub.fail:
+                    self.send_response(503); self.end_headers(); return
+                q = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+                body = json.dumps([{"display_name": q.title(), "lat": "37.95", "lon": "-121.29"}]).encode()
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up waiting
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/search"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
@@ -0,0 +1,282 @@
+"""End-to-end load test: the whole app under gunicorn, driven over HTTP by mixed workloads.
+
+    python -m bench.suite [--participants 5000] [--scale 1] [--users 1] [--out head.json]
+    python -m bench.suite --compare base.json head.json [--threshold 0.2]
+
+Seeds a SQLite database with ``flask seed`` (kept in ``--cache`` between runs,
+keyed by the seed options and the seed and model code) and serves a fresh
+copy of it the way production does: ``gunicorn -k gthread app:app``, i.e.
+``create_app()``, with geocoding sent to a local stub. Then each workload in
+workloads.py runs on its own, and finally all of them at once ("mixed"). Every
+simulated user starts at the same moment, so the sign-in workload is a burst.
+
+Prints one JSON line per phase and endpoint: requests, errors, requests per
+second, latency percentiles, and the SQL statements and time per request that
+the app reports in its Server-Timing header (none for the streamed exports;
+/api/metrics has theirs). ``--out`` writes them all, with
+the commit and options, to one file. ``--compare`` lines up two such files
+and exits non-zero when an endpoint's p95 latency or throughput got more than
+``--threshold`` worse, or it now runs more statements.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import requests
+from sqlalchemy import create_engine, text
+
+from .. import percentile, report
+from ..stubgeo import StubGeocoder
+from .workloads import USERS, WORKLOADS
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+UNTIL = "2025-06-30"  # fixed, so report date ranges cover the same rows every run
+JWT_SECRET = "bench-suite-secret-key-0123456789abcdef"
+_SERVER_TIMING = re.compile(r'db;desc="(\d+) queries";dur=([0-9.]+)')
+
+
+# ---- database and server -------------------------------------------------------------
+def seeded_db(args):
+    """Path of a SQLite file seeded for *args*, generating it on first use."""
+    h = hashlib.sha1(f"{args.participants}-{args.seed}-{UNTIL}".encode())
+    for name in ("seed.py", "models.py"):
+        with open(os.path.join(BACKEND, name), "rb") as fh:
+            h.update(fh.read())
+    os.makedirs(args.cache, exist_ok=True)
+    path = os.path.join(args.cache, f"seed-{args.participants}-{h.hexdigest()[:10]}.db")
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        print(f"seeding {args.participants} participants into {path}", file=sys.stderr)
+        subprocess.run([sys.executable, "-m", "flask", "--app", "app", "seed", "--participants", str(args.participants),
+                        "--seed", str(args.seed), "--until", UNTIL],
+                       cwd=BACKEND, env={**os.environ, "DATABASE_URL": f"sqlite:///{tmp}", "SLOWLOG_MS": "0"},
+                       check=True, stdout=subprocess.DEVNULL)
+        os.replace(tmp, path)
+    return path
+
+
+def fixture(url):
+    """What the workloads pick from: participant ids, names and stored addresses."""
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        lo, hi = conn.execute(text("SELECT min(id), max(id) FROM participants")).one()
+        names = [tuple(r) for r in conn.execute(text(
+            "SELECT first_name, last_name FROM participants ORDER BY id LIMIT 500"))]
+        addresses = [r[0] for r in conn.execute(text(
+            "SELECT address FROM participants WHERE address IS NOT NULL ORDER BY id LIMIT 500"))]
+    engine.dispose()
+    return SimpleNamespace(lo=lo, hi=hi, names=names, addresses=addresses,
+                           until=date.fromisoformat(UNTIL), pick=lambda rnd: rnd.randint(lo, hi))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_url, args, env):
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "-k", "gthread", "--threads", str(args.threads),
+         "-b", f"127.0.0.1:{port}", "--log-level", "warning", "app:app"],
+        cwd=BACKEND, env={**os.environ, **env, "DATABASE_URL": db_url})
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    try:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise SystemExit(f"gunicorn exited with {proc.returncode}")
+            try:
+                if requests.get(base + "/healthz", timeout=5).ok:
+                    return proc, base
+            except requests.RequestException:  # still booting workers
+                time.sleep(0.2)
+        raise SystemExit("gunicorn did not come up in 60 s")
+    except BaseException:
+        proc.terminate()
+        proc.wait(30)
+        raise
+
+
+# ---- driving ---------------------------------------------------------------------------
+class User:
+    def __init__(self, base, fx, scale, seed):
+        self.base, self.fx, self.scale = base, fx, scale
+        self.rnd = random.Random(seed)
+        self.http = requests.Session()
+        self.samples = {}  # label -> [(ms, ok, queries, db_ms)]
+
+    def call(self, label, method, path, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            resp = self.http.request(method, self.base + path, timeout=60, **kwargs)
+            resp.content  # exports stream; the request is not done until the body is
+        except requests.RequestException:
+            self.samples.setdefault(label, []).append(((time.perf_counter() - t0) * 1000, False, None, None))
+            return None
+        ms = (time.perf_counter() - t0) * 1000
+        m = _SERVER_TIMING.search(resp.headers.get("Server-Timing", ""))
+        self.samples.setdefault(label, []).append(
+            (ms, resp.status_code < 400, int(m.group(1)) if m else None, float(m.group(2)) if m else None))
+        return resp
+
+
+def run_phase(base, fx, names, args):
+    users = [(name, i) for name in names for i in range(USERS[name] * args.users)]
+    start = threading.Barrier(len(users) + 1)
+    done = []
+
+    def run(name, i):
+        user = User(base, fx, args.scale, f"{args.seed}-{name}-{i}")
+        start.wait()
+        try:
+            WORKLOADS[name](user)
+        finally:
+            done.append(user)
+
+    threads = [threading.Thread(target=run, args=u, daemon=True) for u in users]
+    for t in threads:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    seconds = time.perf_counter() - t0
+
+    merged = {}
+    for user in done:
+        for label, samples in user.samples.items():
+            merged.setdefault(label, []).extend(samples)
+    return seconds, merged
+
+
+def summarize(phase, seconds, merged):
+    rows = []
+    for label in sorted(merged):
+        samples = merged[label]
+        ms = [s[0] for s in samples]
+        queries = [s[2] for s in samples if s[2] is not None]
+        db_ms = [s[3] for s in samples if s[3] is not None]
+        rows.append({"phase": phase, "endpoint": label, "requests": len(samples),
+                     "errors": sum(1 for s in samples if not s[1]),
+                     "rps": round(len(samples) / seconds, 1),
+                     "p50_ms": round(percentile(ms, 50), 2), "p95_ms": round(percentile(ms, 95), 2),
+                     "p99_ms": round(percentile(ms, 99), 2), "max_ms": round(max(ms), 2),
+                     "queries": round(sum(queries) / len(queries), 2) if queries else None,
+                     "db_p50_ms": round(percentile(db_ms, 50), 2) if db_ms else None})
+    total = sum(r["requests"] for r in rows)
+    rows.append({"phase": phase, "endpoint": "*", "requests": total, "errors": sum(r["errors"] for r in rows),
+                 "rps": round(total / seconds, 1), "seconds": round(seconds, 2),
+                 "p50_ms": round(percentile([s[0] for v in merged.values() for s in v], 50), 2),
+                 "p95_ms": round(percentile([s[0] for v in merged.values() for s in v], 95), 2),
+                 "p99_ms": round(percentile([s[0] for v in merged.values() for s in v], 99), 2)})
+    return rows
+
+
+def _commit():
+    try:
+        out = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=BACKEND,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    names = [n for n in args.workloads.split(",") if n]
+    unknown = set(names) - set(WORKLOADS)
+    if unknown:
+        raise SystemExit(f"unknown workloads: {', '.join(sorted(unknown))} (have {', '.join(WORKLOADS)})")
+    workdir = tempfile.mkdtemp(prefix="mis-suite-")
+    db_path = os.path.join(workdir, "suite.db")
+    shutil.copy(seeded_db(args), db_path)
+    url = f"sqlite:///{db_path}"
+    fx = fixture(url)
+    stub = StubGeocoder(delay=args.geocoder_delay)
+    proc, base = start_server(url, args, {
+        "GEOCODER_URL": stub.url, "JWT_SECRET_KEY": JWT_SECRET,
+        "METRICS_DIR": os.path.join(workdir, "metrics"), "SPA_DIST_DIR": os.path.join(workdir, "dist")})
+    results = []
+    try:
+        phases = [(n, [n]) for n in names] + ([("mixed", names)] if len(names) > 1 else [])
+        for phase, members in phases:
+            seconds, merged = run_phase(base, fx, members, args)
+            for row in summarize(phase, seconds, merged):
+                report("suite", **row)
+                results.append(row)
+    finally:
+        proc.terminate()
+        proc.wait(30)
+        stub.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    if args.out:
+        meta = {"commit": _commit(), "started": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(), "cpus": os.cpu_count(),
+                "options": {k: v for k, v in vars(args).items() if k not in ("out", "compare")}}
+        with open(args.out, "w") as fh:
+            json.dump({"meta": meta, "results": results}, fh, indent=1)
+
+
+# ---- comparing -----------------------------------------------------------------------------
+def compare(old_path, new_path, threshold):
+    """Report each endpoint's change; return how many got worse by more than *threshold*."""
+    with open(old_path) as fh:
+        old = {(r["phase"], r["endpoint"]): r for r in json.load(fh)["results"]}
+    with open(new_path) as fh:
+        new = json.load(fh)["results"]
+    worse = 0
+    for r in new:
+        o = old.get((r["phase"], r["endpoint"]))
+        if o is None:
+            continue
+        why = []
+        # a few milliseconds either way is noise at any percentage
+        if r["p95_ms"] > o["p95_ms"] * (1 + threshold) and r["p95_ms"] - o["p95_ms"] > 2:
+            why.append("p95")
+        if r["rps"] < o["rps"] * (1 - threshold):
+            why.append("rps")
+        if (r.get("queries") or 0) > (o.get("queries") or 0) + 0.5:
+            why.append("queries")
+        if r["errors"] > o["errors"]:
+            why.append("errors")
+        worse += bool(why)
+        report("suite_compare", phase=r["phase"], endpoint=r["endpoint"],
+               p95_ms=[o["p95_ms"], r["p95_ms"]], rps=[o["rps"], r["rps"]],
+               queries=[o.get("queries"), r.get("queries")], regressed=why)
+    return worse
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--participants", type=int, default=5000)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--workloads", default=",".join(WORKLOADS), help="comma-separated, from workloads.py")
+    ap.add_argument("--scale", type=int, default=1, help="multiplies the requests each user makes")
+    ap.add_argument("--users", type=int, default=1, help="multiplies each workload's concurrent users")
+    ap.add_argument("--workers", type=int, default=3, help="gunicorn workers")
+    ap.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    ap.add_argument("--geocoder-delay", type=float, default=0.05, help="stub upstream latency (s)")
+    ap.add_argument("--cache", default=os.path.join(tempfile.gettempdir(), "mis-bench-seed"))
+    ap.add_argument("--out", help="write the results here as JSON")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two --out files instead")
+    ap.add_argument("--threshold", type=float, default=0.2)
+    args = ap.parse_args()
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    run(args)
@@ -0,0 +1,133 @@
+"""What each simulated user of the suite does.
+
+A workload is a function of one ``User``: it makes its requests with
+``user.call(label, method, path, **requests_kwargs)``, which times and records
+them under *label* and returns the response (None if the request failed).
+``user.rnd`` is seeded per workload and user, so a run repeats the same
+requests in the same order. ``user.scale`` multiplies how many it makes.
+
+USERS gives each workload's default number of concurrent users.
+"""
+from datetime import timedelta
+
+from seed import EMPLOYER_KINDS, PROGRAMS, SERVICE_TYPES, STREETS
+
+USERS = {"signin": 8, "detail": 6, "reports": 2, "autocomplete": 4, "search": 3, "intake": 2}
+
+_SERVICE_TYPES = [t for t, _ in SERVICE_TYPES]
+_NEW_STREETS = ("Harbor Blvd", "Delta Ridge Ct", "Quail Lakes Dr", "Swain Rd", "Thornton Rd", "Ben Holt Dr")
+
+
+def signin(user):
+    """Morning rush at the front desk: back-to-back service and note POSTs, and a group session now and then."""
+    rnd, fx = user.rnd, user.fx
+    for i in range(20 * user.scale):
+        pid = fx.pick(rnd)
+        user.call("POST /api/participants/<pid>/services", "POST", f"/api/participants/{pid}/services",
+                  json={"service_type": rnd.choice(_SERVICE_TYPES), "staff_id": rnd.randrange(1, 26)})
+        if rnd.random() < 0.6:
+            user.call("POST /api/participants/<pid>/notes", "POST", f"/api/participants/{pid}/notes",
+                      json={"content": "Signed in at the front desk.", "staff_id": rnd.randrange(1, 26)})
+        if i % 10 == 9:
+            user.call("POST /api/services/batch", "POST", "/api/services/batch",
+                      json={"service_type": "group", "participant_ids": [fx.pick(rnd) for _ in range(rnd.randrange(8, 16))]})
+
+
+def detail(user):
+    """Case managers opening participants the way ParticipantDetail.jsx does.
+
+    One /profile request per page, older rows for a tab now and then, and the
+    organization lists (with a browser's ETag cache) when a referral is started.
+    """
+    rnd, fx, etags = user.rnd, user.fx, {}
+
+    def cached_get(label, path):
+        headers = {"If-None-Match": etags[path]} if path in etags else {}
+        resp = user.call(label, "GET", path, headers=headers)
+        if resp is not None and resp.headers.get("ETag"):
+            etags[path] = resp.headers["ETag"]
+
+    for _ in range(10 * user.scale):
+        pid = fx.pick(rnd)
+        resp = user.call("GET /api/participants/<pid>/profile", "GET", f"/api/participants/{pid}/profile")
+        page = resp.json() if resp is not None and resp.ok else None
+        if page and rnd.random() < 0.3:  # "show older" on one tab
+            tab = rnd.choice(("notes", "services", "referrals"))
+            if page[tab]["next_cursor"]:
+                user.call(f"GET /api/participants/<pid>/{tab}", "GET", f"/api/participants/{pid}/{tab}",
+                          params={"after": page[tab]["next_cursor"], "limit": 50})
+        if rnd.random() < 0.25:
+            user.call("GET /api/participants/<pid>/duplicates", "GET", f"/api/participants/{pid}/duplicates")
+        if rnd.random() < 0.3:
+            cached_get("GET /api/employers", "/api/employers")
+            cached_get("GET /api/providers", "/api/providers")
+
+
+def reports(user):
+    """The monthly report: summary over the last quarter, then the JSON and CSV exports."""
+    fx = user.fx
+    quarter = {"from": (fx.until - timedelta(days=90)).isoformat(), "to": fx.until.isoformat()}
+    month = {"from": (fx.until - timedelta(days=30)).isoformat(), "to": fx.until.isoformat()}
+    for _ in range(2 * user.scale):
+        user.call("GET /api/reports/summary", "GET", "/api/reports/summary", params=quarter)
+        user.call("GET /api/reports/services", "GET", "/api/reports/services", params=month)
+        user.call("GET /api/reports/participants.csv", "GET", "/api/reports/participants.csv", params=quarter)
+        user.call("GET /api/reports/services.csv", "GET", "/api/reports/services.csv", params=month)
+
+
+def autocomplete(user):
+    """Typing addresses: mostly ones already on file, some the stub geocoder has to answer."""
+    rnd, fx = user.rnd, user.fx
+    for _ in range(3 * user.scale):
+        if rnd.random() < 0.7:
+            address = rnd.choice(fx.addresses)
+        else:
+            address = f"{rnd.randrange(100, 9999)} {rnd.choice(_NEW_STREETS)}, Stockton, CA"
+        for end in range(4, len(address) + 1, 2):  # a keystroke or two per debounced request
+            user.call("GET /api/addresses", "GET", "/api/addresses", params={"q": address[:end]})
+
+
+def search(user):
+    """Looking people up by name, and paging the participant list."""
+    rnd, fx = user.rnd, user.fx
+    for _ in range(10 * user.scale):
+        first, last = rnd.choice(fx.names)
+        q = last if rnd.random() < 0.5 else f"{first} {last[:3]}"
+        user.call("GET /api/search", "GET", "/api/search", params={"q": q})
+    for _ in range(user.scale):
+        cursor = None
+        for _ in range(3):
+            resp = user.call("GET /api/participants", "GET", "/api/participants",
+                             params={"limit": 100, **({"after": cursor} if cursor else {})})
+            cursor = resp is not None and resp.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+
+def intake(user):
+    """Sign in, enroll and correct participants, add organizations, import a roster, scrape metrics."""
+    rnd, fx = user.rnd, user.fx
+    user.call("POST /api/login", "POST", "/api/login", json={"email": "intake@example.org", "password": "bench"})
+    for i in range(5 * user.scale):
+        first, last = rnd.choice(fx.names)  # some intakes look like someone already on file
+        resp = user.call("POST /api/participants", "POST", "/api/participants", json={
+            "first_name": first, "last_name": last, "phone": f"209{rnd.randrange(10**7):07d}",
+            "address": f"{rnd.randrange(100, 9999)} {rnd.choice(STREETS)}, Stockton, CA"})
+        if resp is not None and resp.status_code == 201:
+            pid = resp.json()["id"]
+            user.call("PUT /api/participants/<pid>", "PUT", f"/api/participants/{pid}",
+                      json={"email": f"{first}.{last}.{pid}@example.org".lower()})
+        if i % 5 == 0:
+            user.call("POST /api/employers", "POST", "/api/employers",
+                      json={"name": f"Bench {rnd.choice(EMPLOYER_KINDS)} {rnd.randrange(10**6)}"})
+            user.call("POST /api/providers", "POST", "/api/providers",
+                      json={"name": f"Bench {rnd.choice(PROGRAMS)[0]} Center {rnd.randrange(10**6)}"})
+            roster = "first_name,last_name,phone\n" + "".join(
+                f"{f},{l},209{rnd.randrange(10**7):07d}\n" for f, l in (rnd.choice(fx.names) for _ in range(25)))
+            user.call("POST /api/import", "POST", "/api/import",
+                      files={"participants": ("roster.csv", roster, "text/csv")})
+            user.call("GET /api/metrics", "GET", "/api/metrics")
+
+
+WORKLOADS = {"signin": signin, "detail": detail, "reports": reports,
+             "autocomplete": autocomplete, "search": search, "intake": intake}
@@ -0,0 +1,34 @@
+"""SQL statement budgets, declared next to each route.
+
+    @bp_more.get("/participants/<int:pid>/notes")
+    @query_budget(2)  # the participant exists, then one page
+    @jwt_required(optional=True)
+    def list_notes(pid):
+
+says one request to the endpoint runs at most two statements, however much
+data the participant has. Nothing is checked while serving; ``python -m
+bench.budgets`` calls every route against a small and a large fixture and
+fails when one goes over its budget, runs more statements on the large
+fixture than on the small one (an N+1), or declares no budget at all.
+
+``query_budget(None)`` is for routes whose cost follows their input rather
+than the data, such as ``/api/batch``; it is still reported, never failed.
+A budget can also be a function returning one, for routes whose cost follows
+the schema, such as the cascading delete in merge.py; it is called when the
+budget is checked. Say next to each budget what its statements are.
+"""
+ATTR = "query_budget"
+UNDECLARED = object()
+
+
+def query_budget(n):
+    def decorate(view):
+        setattr(view, ATTR, n)
+        return view
+    return decorate
+
+
+def budget_of(view):
+    """The view's budget, ``None`` if unbounded, ``UNDECLARED`` if it has none."""
+    n = getattr(view, ATTR, UNDECLARED)
+    return n() if callable(n) else n
@@ -0,0 +1,89 @@
+"""Negotiated gzip / brotli compression for API responses.
+
+Responses under ``/api/`` that are at least ``COMPRESS_MIN_SIZE`` bytes and of
+a text-like type are compressed with the best encoding the client accepts:
+brotli (the ``brotli`` package, in requirements.txt), else gzip. Without the
+package, as in an install that skipped it, only gzip is offered.
+Streamed responses (the CSV / JSON exports) are compressed chunk by chunk with
+a sync flush per chunk, so they stay streaming and memory stays flat.
+
+Static SPA assets are not handled here: they are precompressed at build time
+and served as-is (see spa_static.py).
+"""
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # per-request cost matters more than the last few percent
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/")
+
+
+def choose_encoding():
+    """"br", "gzip" or None for the current request's Accept-Encoding."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compressor(encoding):
+    if encoding == "br":
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        return c.process, c.flush, c.finish
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip header and trailer
+    return c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+
+def _stream(chunks, encoding):
+    compress, flush, finish = _compressor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if chunk:
+                yield compress(chunk) + flush()
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def compress_response(resp, min_size=MIN_SIZE):
+    if (resp.status_code != 200 or request.method == "HEAD"
+            or "Content-Encoding" in resp.headers or resp.direct_passthrough
+            or not (resp.mimetype or "").startswith(COMPRESSIBLE)):
+        return resp
+    resp.vary.add("Accept-Encoding")
+    encoding = choose_encoding()
+    if encoding is None:
+        return resp
+    if resp.is_streamed:
+        resp.response = _stream(resp.response, encoding)
+        resp.headers.pop("Content-Length", None)
+    else:
+        data = resp.get_data()
+        if len(data) < min_size:
+            return resp
+        compress, _, finish = _compressor(encoding)
+        resp.set_data(compress(data) + finish())
+    resp.headers["Content-Encoding"] = encoding
+    return resp
+
+
+def init_app(app):
+    min_size = int(app.config.get("COMPRESS_MIN_SIZE", MIN_SIZE))
+
+    @app.after_request
+    def _compress(resp):
+        if request.path.startswith("/api/"):
+            return compress_response(resp, min_size)
+        return resp
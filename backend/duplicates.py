@@ -0,0 +1,262 @@
+"""Duplicate-participant detection with blocking keys.
+
+Every participant gets a few cheap blocking keys (phonetic last name + DOB
+year, phonetic full name, normalized phone, normalized email). Only records
+that share a key are compared, and those pairs are scored with Jaro-Winkler
+name similarity plus exact DOB / phone / email agreement, so the work grows
+with the number of records rather than with its square.
+
+The keys live in ``participant_keys`` so a single new record can be checked
+with one indexed lookup (``candidates_for``); ``scan`` does the whole table.
+
+    flask duplicates scan [--min-score 0.85] [--out pairs.csv]
+"""
+import csv
+import re
+import sys
+from collections import defaultdict
+from functools import lru_cache
+from itertools import combinations
+
+import click
+from sqlalchemy import event
+
+try:
+    from .models import db, Participant, ParticipantKey
+except ImportError:
+    from models import db, Participant, ParticipantKey
+
+MIN_SCORE = 0.85
+MAX_BLOCK = 16  # blocks bigger than this (very common name + year) are windowed, not fully paired
+WINDOW = 4      # neighbours compared in an oversized block, after sorting by first name
+WEIGHTS = {"first_name": 0.25, "last_name": 0.3, "dob": 0.25, "phone": 0.1, "email": 0.1}
+
+# ---- normalization ---------------------------------------------------------------
+_SOUNDEX = str.maketrans("bfpvcgjkqsxzdtlmnr", "111122222222334556")
+
+def soundex(name, length=6):
+    """Soundex code, kept to *length* characters (6 rather than the classic 4 so
+    long surnames that share a stem do not all land in one block)."""
+    s = "".join(ch for ch in (name or "").lower() if "a" <= ch <= "z")
+    if not s:
+        return ""
+    codes = s.translate(_SOUNDEX)
+    out, prev = [], codes[0]
+    for ch, c in zip(s[1:], codes[1:]):
+        if c.isdigit():
+            if c != prev:
+                out.append(c)
+            prev = c
+        elif ch not in "hw":
+            prev = ""
+    return (s[0].upper() + "".join(out) + "0" * length)[:length]
+
+def norm_phone(phone):
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] if len(digits) >= 7 else ""
+
+def norm_email(email):
+    email = (email or "").strip().lower()
+    if "@" not in email:
+        return ""
+    local, domain = email.rsplit("@", 1)
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+def _year(dob):
+    if not dob:
+        return None
+    return dob.year if hasattr(dob, "year") else str(dob)[:4]
+
+def blocking_keys(first_name, last_name, dob, phone, email):
+    keys = set()
+    last, first = soundex(last_name), soundex(first_name)
+    if last and _year(dob):
+        keys.add(f"n:{last}:{_year(dob)}")
+    if last and first:
+        keys.add(f"nf:{last}:{first}")
+    if norm_phone(phone):
+        keys.add(f"p:{norm_phone(phone)}")
+    if norm_email(email):
+        keys.add(f"e:{norm_email(email)}")
+    return keys
+
+# ---- scoring ---------------------------------------------------------------------
+@lru_cache(maxsize=65536)  # names repeat a lot, so most pairs are cache hits
+def jaro_winkler(a, b):
+    a, b = (a or "").strip().lower(), (b or "").strip().lower()
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    window = max(0, max(len(a), len(b)) // 2 - 1)
+    b_hit = [False] * len(b)
+    a_matched = []
+    for i, ch in enumerate(a):
+        hi = min(len(b), i + window + 1)
+        j = b.find(ch, max(0, i - window), hi)
+        while j != -1 and b_hit[j]:
+            j = b.find(ch, j + 1, hi)
+        if j != -1:
+            b_hit[j] = True
+            a_matched.append(ch)
+    matches = len(a_matched)
+    if not matches:
+        return 0.0
+    b_matched = [c for c, hit in zip(b, b_hit) if hit]
+    transpositions = sum(x != y for x, y in zip(a_matched, b_matched)) / 2
+    jaro = (matches / len(a) + matches / len(b) + (matches - transpositions) / matches) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+def _prepare(r):
+    """Normalize a record once so pair scoring does no parsing."""
+    return (r["id"], (r["first_name"] or "").strip().lower(), (r["last_name"] or "").strip().lower(),
+            str(r["dob"]) if r["dob"] else "", norm_phone(r["phone"]), norm_email(r["email"]))
+
+def _score(a, b):
+    total = weight = 0.0
+    reasons = []
+    for field, i in (("first_name", 1), ("last_name", 2)):
+        sim = jaro_winkler(a[i], b[i])
+        total += WEIGHTS[field] * sim
+        weight += WEIGHTS[field]
+        if sim == 1.0:
+            reasons.append(field)
+    for field, i in (("dob", 3), ("phone", 4), ("email", 5)):
+        if a[i] and b[i]:
+            weight += WEIGHTS[field]
+            if a[i] == b[i]:
+                total += WEIGHTS[field]
+                reasons.append(field)
+    return total / weight, reasons
+
+def score(a, b):
+    """Similarity in [0, 1] of two records (dicts), and the fields that agree exactly."""
+    return _score(_prepare(a), _prepare(b))
+
+# ---- batch job -------------------------------------------------------------------
+FIELDS = ("id", "first_name", "last_name", "dob", "phone", "email")
+
+def scan(records, min_score=MIN_SCORE):
+    """Rank likely duplicate pairs among *records* (iterable of dicts with FIELDS)."""
+    by_id, blocks = {}, defaultdict(list)
+    for r in records:
+        by_id[r["id"]] = _prepare(r)
+        for k in blocking_keys(r["first_name"], r["last_name"], r["dob"], r["phone"], r["email"]):
+            blocks[k].append(r["id"])
+    pairs = set()
+    for ids in blocks.values():
+        if len(ids) < 2:
+            continue
+        if len(ids) <= MAX_BLOCK:
+            pairs.update(combinations(sorted(ids), 2))
+            continue
+        # sorted neighbourhood: similar first names end up next to each other
+        ids.sort(key=lambda i: by_id[i][1])
+        for n, a in enumerate(ids):
+            for b in ids[n + 1:n + 1 + WINDOW]:
+                pairs.add((a, b) if a < b else (b, a))
+    out = []
+    for a, b in pairs:
+        s, reasons = _score(by_id[a], by_id[b])
+        if s >= min_score:
+            out.append({"a": a, "b": b, "score": round(s, 4), "matched": reasons})
+    out.sort(key=lambda p: (-p["score"], p["a"], p["b"]))
+    return out
+
+def _stored_records():
+    cols = [getattr(Participant, f) for f in FIELDS]
+    for row in db.session.query(*cols).yield_per(5000):
+        yield dict(zip(FIELDS, row))
+
+def refresh_keys():
+    """Recompute participant_keys for every participant (covers bulk-imported rows)."""
+    table = ParticipantKey.__table__
+    db.session.execute(table.delete())
+    batch = []
+    for r in _stored_records():
+        batch += [{"key": k, "participant_id": r["id"]}
+                  for k in blocking_keys(r["first_name"], r["last_name"], r["dob"], r["phone"], r["email"])]
+        if len(batch) >= 10000:
+            db.session.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+    db.session.commit()
+
+def scan_db(min_score=MIN_SCORE):
+    return scan(_stored_records(), min_score)
+
+# ---- single-record check ---------------------------------------------------------
+def candidates_for(p, min_score=MIN_SCORE, limit=10):
+    """Likely duplicates of participant *p*, best first, via the key table."""
+    keys = blocking_keys(p.first_name, p.last_name, p.dob, p.phone, p.email)
+    if not keys:
+        return []
+    me = _prepare({f: getattr(p, f) for f in FIELDS})
+    # as in scan: small blocks whole; oversized ones only the WINDOW names either side of
+    # this first name, so which candidates are scored never depends on the backend
+    first = db.func.lower(db.func.coalesce(Participant.first_name, ""))
+    after = first >= me[1]
+    block = (db.select(ParticipantKey.participant_id,
+                       db.func.count().over(partition_by=ParticipantKey.key).label("size"),
+                       db.func.row_number().over(
+                           partition_by=(ParticipantKey.key, after),
+                           order_by=(db.case((after, first)).asc(), db.case((after, db.null()), else_=first).desc(),
+                                     Participant.id)).label("near"))
+             .join(Participant, Participant.id == ParticipantKey.participant_id)
+             .where(ParticipantKey.key.in_(keys), ParticipantKey.participant_id != p.id)
+             .subquery())
+    ids = db.select(block.c.participant_id).where((block.c.size <= MAX_BLOCK) | (block.c.near <= WINDOW))
+    out = []
+    for row in db.session.query(*[getattr(Participant, f) for f in FIELDS]).filter(Participant.id.in_(ids)):
+        other = dict(zip(FIELDS, row))
+        s, reasons = _score(me, _prepare(other))
+        if s >= min_score:
+            out.append({"id": other["id"], "first_name": other["first_name"],
+                        "last_name": other["last_name"], "score": round(s, 4), "matched": reasons})
+    out.sort(key=lambda c: (-c["score"], c["id"]))
+    return out[:limit]
+
+def _sync_keys(mapper, connection, target):
+    table = ParticipantKey.__table__
+    connection.execute(table.delete().where(table.c.participant_id == target.id))
+    keys = blocking_keys(target.first_name, target.last_name, target.dob, target.phone, target.email)
+    if keys:
+        connection.execute(table.insert(), [{"key": k, "participant_id": target.id} for k in keys])
+
+def _drop_keys(mapper, connection, target):
+    table = ParticipantKey.__table__
+    connection.execute(table.delete().where(table.c.participant_id == target.id))
+
+# ---- wiring ----------------------------------------------------------------------
+def init_app(app):
+    if not event.contains(Participant, "after_insert", _sync_keys):
+        event.listen(Participant, "after_insert", _sync_keys)
+        event.listen(Participant, "after_update", _sync_keys)
+        event.listen(Participant, "before_delete", _drop_keys)
+
+    @app.cli.group("duplicates")
+    def duplicates_cli():
+        """Duplicate-participant detection."""
+
+    @duplicates_cli.command("scan")
+    @click.option("--min-score", default=MIN_SCORE, show_default=True)
+    @click.option("--out", type=click.Path(), help="write pairs as CSV here instead of stdout")
+    def scan_cmd(min_score, out):
+        refresh_keys()
+        pairs = scan_db(min_score)
+        fh = open(out, "w", newline="") if out else sys.stdout
+        try:
+            w = csv.writer(fh)
+            w.writerow(["a", "b", "score", "matched"])
+            for p in pairs:
+                w.writerow([p["a"], p["b"], p["score"], " ".join(p["matched"])])
+        finally:
+            if out:
+                fh.close()
+        click.echo(f"{len(pairs)} candidate pairs", err=True)
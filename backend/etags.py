@@ -0,0 +1,107 @@
+"""Weak ETags from change counters, for conditional GETs.
+
+Every write to a tracked entity bumps a counter in ``entity_versions`` inside
+the same transaction: one counter per participant ("participants:17") and
+one per reference table ("employers", "providers"). ``conditional`` reads the
+counter (a single primary-key lookup), and when it matches ``If-None-Match``
+it answers 304 before the view runs, so nothing is queried or serialized.
+The query string is part of the tag, so each page of a list has its own.
+
+ORM writes are caught by mapper events. Code that writes with Core statements
+calls ``bump`` itself (see merge.py).
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import request, make_response
+from sqlalchemy import event
+
+try:
+    from .models import db, Participant, Employer, Provider, EntityVersion
+except ImportError:
+    from models import db, Participant, Employer, Provider, EntityVersion
+
+# model -> counter key for one of its rows
+TRACKED = {
+    Participant: lambda row: f"participants:{row.id}",
+    Employer: lambda row: "employers",
+    Provider: lambda row: "providers",
+}
+
+
+def bump(conn, *keys):
+    """Advance the counters for *keys* on *conn* (inside the writer's transaction).
+
+    One upsert, so two writers creating the same counter at once both succeed.
+    """
+    t = EntityVersion.__table__
+    values = [{"key": key, "version": 1} for key in dict.fromkeys(keys)]
+    if not values:
+        return
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(t)
+        conn.execute(stmt.on_conflict_do_update(index_elements=[t.c.key], set_={"version": t.c.version + 1}),
+                     values)
+        return
+    for v in values:
+        if not conn.execute(t.update().where(t.c.key == v["key"]).values(version=t.c.version + 1)).rowcount:
+            conn.execute(t.insert().values(v))
+
+
+def versions(*keys):
+    t = EntityVersion.__table__
+    found = dict(db.session.execute(db.select(t.c.key, t.c.version).where(t.c.key.in_(keys))).all())
+    return [found.get(k, 0) for k in keys]
+
+
+def etag(*keys):
+    return ".".join(f"{k}-{v}" for k, v in zip(keys, versions(*keys)))
+
+
+def _query_tag():
+    """The request's query string, order-independent, shortened to fit in the tag."""
+    if not request.args:
+        return ""
+    query = urlencode(sorted(request.args.items(multi=True)))
+    return "." + hashlib.sha1(query.encode()).hexdigest()[:12]
+
+
+def conditional(*keys):
+    """Serve 304 for a matching ``If-None-Match``; tag 200 responses otherwise.
+
+    Each key is a counter key, or a function of the view's keyword arguments
+    that returns one.
+    """
+    def decorate(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # the counters say whether the data changed; the query string says which page of it
+            tag = etag(*[k(**kwargs) if callable(k) else k for k in keys]) + _query_tag()
+            if request.if_none_match.contains_weak(tag):
+                resp = make_response("", 304)
+            else:
+                resp = make_response(view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+            resp.set_etag(tag, weak=True)
+            resp.headers["Cache-Control"] = "private, no-cache"  # always revalidate
+            return resp
+        return wrapper
+    return decorate
+
+
+def _on_write(mapper, connection, target):
+    bump(connection, TRACKED[mapper.class_](target))
+
+
+def init_app(app):
+    for model in TRACKED:
+        if not event.contains(model, "after_insert", _on_write):
+            for name in ("after_insert", "after_update", "after_delete"):
+                event.listen(model, name, _on_write)
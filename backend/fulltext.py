@@ -0,0 +1,214 @@
+"""Ranked full-text search over participants and case notes.
+
+SQLite: FTS5 external-content tables (participants_fts, case_notes_fts) kept
+in sync by triggers, so ORM writes and bulk inserts are both indexed.
+Postgres: GIN expression indexes over ``to_tsvector(...)``; the index itself
+tracks writes. Any other backend (or SQLite without FTS5) falls back to LIKE.
+
+    flask search reindex   # backfill / rebuild the index
+"""
+import re
+
+import click
+from sqlalchemy import text
+
+try:
+    from .models import db, Participant, CaseNote
+except ImportError:
+    from models import db, Participant, CaseNote
+
+# ---- SQLite / FTS5 --------------------------------------------------------------
+_FTS_PARTICIPANT_COLS = ("first_name", "last_name", "phone", "email", "address")
+
+def _fts_ddl():
+    cols = ", ".join(_FTS_PARTICIPANT_COLS)
+    new = ", ".join(f"new.{c}" for c in _FTS_PARTICIPANT_COLS)
+    old = ", ".join(f"old.{c}" for c in _FTS_PARTICIPANT_COLS)
+    stmts = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS participants_fts USING fts5({cols}, "
+        "content='participants', content_rowid='id', prefix='2 3')",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS case_notes_fts USING fts5(content, "
+        "content='case_notes', content_rowid='id', prefix='2 3')",
+    ]
+    for table, fts, c, n, o in (("participants", "participants_fts", cols, new, old),
+                                ("case_notes", "case_notes_fts", "content", "new.content", "old.content")):
+        ins = f"INSERT INTO {fts}(rowid, {c}) VALUES (new.id, {n});"
+        dele = f"INSERT INTO {fts}({fts}, rowid, {c}) VALUES ('delete', old.id, {o});"
+        stmts += [
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {ins} END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {dele} END",
+            # only when indexed text changes: merge re-parents notes by participant_id alone
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {c} ON {table} BEGIN {dele} {ins} END",
+        ]
+    return stmts
+
+# ---- Postgres / tsvector --------------------------------------------------------
+# queries must repeat these expressions verbatim for the GIN indexes to be used
+PG_PARTICIPANT_DOC = ("to_tsvector('simple', coalesce(first_name,'') || ' ' || coalesce(last_name,'') "
+                      "|| ' ' || coalesce(phone,'') || ' ' || coalesce(email,'') || ' ' || coalesce(address,''))")
+PG_NOTE_DOC = "to_tsvector('english', coalesce(content,''))"
+
+def _pg_ddl():
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_participants_fts ON participants USING GIN ({PG_PARTICIPANT_DOC})",
+        f"CREATE INDEX IF NOT EXISTS ix_case_notes_fts ON case_notes USING GIN ({PG_NOTE_DOC})",
+    ]
+
+# ---- schema ---------------------------------------------------------------------
+_modes = {}
+
+def _probe():
+    name = db.engine.dialect.name
+    if name == "sqlite":
+        conn = db.engine.raw_connection()
+        try:
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp._fts5_probe USING fts5(x)")
+            return "fts5"
+        except Exception:
+            return "like"
+        finally:
+            conn.close()
+    return "tsvector" if name == "postgresql" else "like"
+
+def _mode():
+    """"fts5", "tsvector" or "like" for the current engine (probed once)."""
+    key = str(db.engine.url)
+    if key not in _modes:
+        _modes[key] = _probe()
+    return _modes[key]
+
+def ensure_schema():
+    """Create the index structures if missing; backfill when they are new."""
+    mode = _mode()
+    if mode == "fts5":
+        fresh = not db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'participants_fts'")).first()
+        for fts in ("participants_fts", "case_notes_fts"):
+            sql = db.session.execute(text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :n"),
+                                     {"n": f"{fts}_au"}).scalar()
+            if sql and "UPDATE OF" not in sql:  # created before it was limited to the indexed columns
+                db.session.execute(text(f"DROP TRIGGER {fts}_au"))
+        for stmt in _fts_ddl():
+            db.session.execute(text(stmt))
+        db.session.commit()
+        if fresh:
+            reindex()
+    elif mode == "tsvector":
+        for stmt in _pg_ddl():
+            db.session.execute(text(stmt))
+        db.session.commit()
+    return mode
+
+def reindex():
+    mode = _mode()
+    if mode == "fts5":
+        db.session.execute(text("INSERT INTO participants_fts(participants_fts) VALUES ('rebuild')"))
+        db.session.execute(text("INSERT INTO case_notes_fts(case_notes_fts) VALUES ('rebuild')"))
+    elif mode == "tsvector":
+        db.session.execute(text("REINDEX INDEX ix_participants_fts"))
+        db.session.execute(text("REINDEX INDEX ix_case_notes_fts"))
+    db.session.commit()
+    return mode
+
+# ---- querying -------------------------------------------------------------------
+def _terms(q):
+    return re.findall(r"\w+", (q or "").lower())[:8]
+
+# Participants: every match is ranked on both backends (even a common surname
+# matches a few thousand rows at most). Case notes: a common word can match most
+# of the table, and scoring all of it takes hundreds of ms, so both backends rank
+# only the newest NOTE_WINDOW matches by id and older notes need a narrower query.
+NOTE_WINDOW = 1000
+
+_PARTICIPANT_TYPES = {"dob": db.Date()}
+_NOTE_TYPES = {"created_at": db.DateTime()}
+
+def _sqlite_search(terms, limit):
+    match = " ".join(f'"{t}"*' for t in terms)
+    # ORDER BY rank lets FTS5 keep only the top :n while it scores, before the join
+    people = text("""
+        SELECT p.id, p.first_name, p.last_name, p.dob, p.phone, p.email, p.address, -top.rank AS score
+        FROM (SELECT rowid, rank FROM participants_fts
+              WHERE participants_fts MATCH :q AND rank MATCH 'bm25(10.0, 10.0, 4.0, 4.0, 1.0)'
+              ORDER BY rank LIMIT :n) top
+        JOIN participants p ON p.id = top.rowid
+        ORDER BY top.rank
+    """).columns(**_PARTICIPANT_TYPES)
+    notes = text("""
+        SELECT n.id, n.participant_id, snippet(case_notes_fts, 0, '[', ']', '…', 16) AS snippet,
+               n.created_at, -bm25(case_notes_fts) AS score
+        FROM case_notes_fts JOIN case_notes n ON n.id = case_notes_fts.rowid
+        WHERE case_notes_fts MATCH :q AND case_notes_fts.rowid >= (
+            SELECT coalesce(min(rowid), 0) FROM (SELECT rowid FROM case_notes_fts
+            WHERE case_notes_fts MATCH :q ORDER BY rowid DESC LIMIT :w))
+        ORDER BY score DESC LIMIT :n
+    """).columns(**_NOTE_TYPES)
+    params = {"q": match, "n": limit, "w": NOTE_WINDOW}
+    return db.session.execute(people, params).all(), db.session.execute(notes, params).all()
+
+def _pg_search(terms, limit):
+    tsq = " & ".join(f"{t}:*" for t in terms)
+    people = text(f"""
+        SELECT id, first_name, last_name, dob, phone, email, address,
+               ts_rank({PG_PARTICIPANT_DOC}, q) AS score
+        FROM participants, to_tsquery('simple', :q) q
+        WHERE {PG_PARTICIPANT_DOC} @@ q ORDER BY score DESC LIMIT :n
+    """).columns(**_PARTICIPANT_TYPES)
+    notes = text(f"""
+        SELECT id, participant_id, ts_headline('english', content, q) AS snippet, created_at, score
+        FROM (SELECT n.id, n.participant_id, n.content, n.created_at, q,
+                     ts_rank({PG_NOTE_DOC}, q) AS score
+              FROM (SELECT id FROM case_notes, to_tsquery('english', :q) q
+                    WHERE {PG_NOTE_DOC} @@ q ORDER BY id DESC LIMIT :w) newest
+              JOIN case_notes n ON n.id = newest.id, to_tsquery('english', :q) q
+              ORDER BY score DESC LIMIT :n) top
+        ORDER BY score DESC
+    """).columns(**_NOTE_TYPES)
+    params = {"q": tsq, "n": limit, "w": NOTE_WINDOW}
+    return db.session.execute(people, params).all(), db.session.execute(notes, params).all()
+
+def _like_search(terms, limit):
+    pq = db.session.query(Participant.id, Participant.first_name, Participant.last_name, Participant.dob,
+                          Participant.phone, Participant.email, Participant.address, db.literal(1.0))
+    nq = db.session.query(CaseNote.id, CaseNote.participant_id, db.func.substr(CaseNote.content, 1, 200),
+                          CaseNote.created_at, db.literal(1.0))
+    for t in terms:
+        like = f"%{t}%"
+        pq = pq.filter(db.or_(*[getattr(Participant, c).ilike(like) for c in _FTS_PARTICIPANT_COLS]))
+        nq = nq.filter(CaseNote.content.ilike(like))
+    return pq.limit(limit).all(), nq.order_by(CaseNote.id.desc()).limit(limit).all()
+
+def search(q, limit=20):
+    """``{"participants": [...], "case_notes": [...]}``, best matches first."""
+    terms = _terms(q)
+    if not terms:
+        return {"participants": [], "case_notes": []}
+    run = {"fts5": _sqlite_search, "tsvector": _pg_search}.get(_mode(), _like_search)
+    people, notes = run(terms, limit)
+    return {
+        "participants": [{
+            "id": pid, "first_name": fn, "last_name": ln, "dob": dob.isoformat() if dob else None,
+            "phone": phone, "email": email, "address": addr, "score": round(float(score), 6),
+        } for (pid, fn, ln, dob, phone, email, addr, score) in people],
+        "case_notes": [{
+            "id": nid, "participant_id": pid, "snippet": snippet,
+            "created_at": created.isoformat() if created else None, "score": round(float(score), 6),
+        } for (nid, pid, snippet, created, score) in notes],
+    }
+
+# ---- wiring --------------------------------------------------------------------
+def init_app(app):
+    with app.app_context():
+        try:
+            ensure_schema()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("full-text index setup failed")
+
+    @app.cli.group("search")
+    def search_cli():
+        """Full-text search index."""
+
+    @search_cli.command("reindex")
+    def reindex_cmd():
+        click.echo(f"reindexed ({reindex()})")
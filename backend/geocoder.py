@@ -0,0 +1,229 @@
+"""Cached, coalesced access to the upstream geocoder (Nominatim by default).
+
+Lookups go: in-process LRU (per worker) -> geocode_cache table (shared by all
+workers) -> one upstream request per distinct query, however many threads ask
+for it at once. Upstream calls reuse a pooled ``requests.Session``.
+
+Upstream calls run on a small dedicated executor, never on the request thread.
+Callers wait at most ``WAIT_SECONDS`` for them, the executor's backlog is capped,
+and a circuit breaker stops calling upstream after repeated failures, so a slow
+geocoder cannot tie up the web workers. In all of those cases ``lookup`` raises
+``GeocoderUnavailable`` and the route falls back to what it has locally.
+"""
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, timedelta
+from time import monotonic
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+try:
+    from .models import db, GeocodeCache
+except ImportError:
+    from models import db, GeocodeCache
+
+DEFAULT_URL = "https://nominatim.openstreetmap.org/search"
+TTL_SECONDS = 7 * 24 * 3600
+MEMORY_SIZE = 2048
+TIMEOUT = 8            # upstream request timeout, on the executor thread
+WAIT_SECONDS = 2.0     # how long a web request waits for the executor
+MAX_CONCURRENCY = 4    # concurrent upstream calls per worker
+MAX_QUEUE = 32         # queued + running upstream calls before we shed load
+BREAKER_FAILURES = 5   # consecutive failures that open the breaker
+BREAKER_RESET = 30.0   # seconds before a half-open trial call
+
+
+class GeocoderUnavailable(Exception):
+    """Upstream is not being called right now (breaker open, backlog full, too slow)."""
+
+
+class CircuitBreaker:
+    """closed -> open after *failures* in a row -> half_open after *reset* seconds."""
+
+    def __init__(self, failures, reset):
+        self.failures, self.reset = failures, reset
+        self.state, self._count, self._opened = "closed", 0, 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and monotonic() - self._opened >= self.reset:
+                self.state = "half_open"
+                return True  # let one trial call through
+            return self.state == "closed"
+
+    def success(self):
+        with self._lock:
+            self.state, self._count = "closed", 0
+
+    def failure(self):
+        with self._lock:
+            self._count += 1
+            if self.state == "half_open" or self._count >= self.failures:
+                self.state, self._opened = "open", monotonic()
+
+
+class TTLCache:
+    """Thread-safe LRU whose entries also expire after *ttl* seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_memory = TTLCache(MEMORY_SIZE, TTL_SECONDS)
+_inflight = {}
+_inflight_lock = threading.Lock()
+_stats = {"memory_hits": 0, "db_hits": 0, "coalesced": 0, "upstream": 0, "errors": 0,
+          "timeouts": 0, "rejected": 0, "short_circuited": 0}
+_pending = 0
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="geocoder")
+_breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET)
+
+_session = requests.Session()
+_session.headers["User-Agent"] = "memorial-app/1.0"
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+
+def normalize(q):
+    return " ".join((q or "").lower().replace(",", " ").split())[:255]
+
+
+def stats():
+    return {**_stats, "queue_depth": _pending, "inflight": len(_inflight),
+            "breaker_state": _breaker.state}
+
+
+def _bump(name):
+    _stats[name] += 1  # good enough for counters; GIL keeps it from tearing
+
+
+def _fetch(url, key):
+    r = _session.get(url, params={"format": "json", "q": key, "addressdetails": 1, "limit": 5},
+                     timeout=TIMEOUT)
+    r.raise_for_status()
+    return [{"label": d.get("display_name"), "lat": d.get("lat"), "lon": d.get("lon")}
+            for d in r.json()]
+
+
+def _job(app, url, key):
+    """Runs on the executor: call upstream, feed the breaker, fill both cache tiers."""
+    global _pending
+    try:
+        if _breaker.state == "open":
+            raise GeocoderUnavailable("circuit open")  # opened while this call was queued
+        _bump("upstream")
+        try:
+            result = _fetch(url, key)
+        except Exception:
+            _bump("errors")
+            _breaker.failure()
+            raise
+        _breaker.success()
+        _memory.set(key, result)
+        with app.app_context():
+            _to_db(key, result)
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+            _pending -= 1
+
+
+def _from_db(key):
+    row = db.session.get(GeocodeCache, key)
+    if row and row.fetched_at > datetime.utcnow() - timedelta(seconds=TTL_SECONDS):
+        return json.loads(row.payload)
+    return None
+
+
+def _to_db(key, result):
+    try:
+        db.session.merge(GeocodeCache(query=key, payload=json.dumps(result),
+                                      fetched_at=datetime.utcnow()))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()  # another worker stored it first; the memory tier still has it
+
+
+def cached(q):
+    """Return a cached result for *q* without going upstream, or None."""
+    key = normalize(q)
+    result = _memory.get(key)
+    if result is not None:
+        _bump("memory_hits")
+        return result
+    result = _from_db(key)
+    if result is not None:
+        _bump("db_hits")
+        _memory.set(key, result)
+    return result
+
+
+def lookup(q):
+    """Geocode *q*.
+
+    Raises ``requests`` exceptions when the upstream call fails and
+    ``GeocoderUnavailable`` when it is skipped or takes longer than ``WAIT_SECONDS``
+    (the call keeps running and fills the cache for next time).
+    """
+    global _pending
+    result = cached(q)
+    if result is not None:
+        return result
+    key = normalize(q)
+    with _inflight_lock:
+        fut = _inflight.get(key)
+        if fut is not None:
+            _bump("coalesced")
+        elif _pending >= MAX_QUEUE:  # before allow(), which may hand out the one half-open trial
+            _bump("rejected")
+            raise GeocoderUnavailable("geocoder backlog full")
+        elif not _breaker.allow():
+            _bump("short_circuited")
+            raise GeocoderUnavailable("circuit open")
+        else:
+            _pending += 1
+            url = current_app.config.get("GEOCODER_URL") or DEFAULT_URL
+            fut = _inflight[key] = _executor.submit(
+                _job, current_app._get_current_object(), url, key)
+    try:
+        return fut.result(timeout=WAIT_SECONDS)
+    except FutureTimeout:
+        _bump("timeouts")
+        raise GeocoderUnavailable("geocoder too slow") from None
+
+
+def fallback(q):
+    """Best local answer for *q* when upstream is unavailable."""
+    return cached(q) or []
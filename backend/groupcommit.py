@@ -0,0 +1,153 @@
+"""Group commit for small, hot inserts (case notes, services).
+
+With ``GROUP_COMMIT=1`` request threads hand their row to one writer thread
+per worker process instead of committing themselves. The writer collects
+rows for up to ``GROUP_COMMIT_MS`` milliseconds or ``GROUP_COMMIT_MAX`` rows,
+inserts them in one transaction, and hands each caller its own id. Dozens of
+simultaneous writers then cost one lock acquisition and one fsync instead of
+dozens, which is what SQLite's single-writer lock needs.
+
+If a batch fails, its rows are retried one transaction each, so one bad row
+only fails its own request. Anything else going wrong in the writer (no
+connection, say) fails the rows it holds and the loop carries on; if the
+thread dies anyway, the next ``submit`` starts another. A request waits at
+most ``GROUP_COMMIT_TIMEOUT_S`` for its row and then answers 503, taking the
+row back out of the queue if the writer has not picked it up yet. With the
+mode off, ``insert`` is a plain ORM add + commit on the request's session.
+
+Rows are inserted with Core statements, so use this only for models without
+ORM insert hooks (CaseNote and Service have none; the full-text triggers and
+the rollup watermark work at the database level).
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from flask import abort, current_app, jsonify, make_response
+
+try:
+    from .models import db
+except ImportError:
+    from models import db
+
+DEFAULT_MS = 5
+DEFAULT_MAX = 100
+DEFAULT_TIMEOUT = 10.0
+
+
+class GroupCommitter:
+    def __init__(self, app, window_ms=DEFAULT_MS, max_rows=DEFAULT_MAX, timeout=DEFAULT_TIMEOUT):
+        self.app = app
+        self.window = window_ms / 1000.0
+        self.max_rows = max_rows
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {"rows": 0, "batches": 0, "retried": 0, "failed": 0, "timeouts": 0, "restarts": 0}
+
+    def submit(self, model, values):
+        """Queue one row; returns a Future resolving to its id."""
+        fut = Future()
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    if self._thread is not None:
+                        self.stats["restarts"] += 1
+                    self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                    self._thread.start()
+        self._queue.put((model.__table__, values, fut))
+        return fut
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_rows:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=left))
+            except queue.Empty:
+                break
+        # rows whose request gave up waiting were cancelled; the rest can no longer be
+        return [item for item in batch if item[2].set_running_or_notify_cancel()]
+
+    def _run(self):
+        conn, batch = None, []
+        while True:
+            try:
+                batch = self._collect()
+                if not batch:
+                    continue
+                if conn is None or conn.invalidated or conn.closed:
+                    # a connection of its own: the pool may be exhausted by requests waiting on us
+                    with self.app.app_context():
+                        conn = db.engine.connect()
+                try:
+                    with conn.begin():
+                        ids = [conn.execute(t.insert().values(v)).inserted_primary_key[0]
+                               for t, v, _ in batch]
+                except Exception:
+                    self.stats["retried"] += len(batch)
+                    conn = self._one_by_one(conn, batch)
+                else:
+                    for (_, _, fut), pid in zip(batch, ids):
+                        fut.set_result(pid)
+                self.stats["batches"] += 1
+                self.stats["rows"] += len(batch)
+            except Exception as e:
+                self.app.logger.exception("group commit writer failed")
+                for _, _, fut in batch:
+                    if not fut.done():
+                        self.stats["failed"] += 1
+                        fut.set_exception(e)
+                if conn is not None:
+                    conn.close()
+                conn = None
+                time.sleep(self.window)  # don't spin if the database is down
+            batch = []
+
+    def _one_by_one(self, conn, batch):
+        for table, values, fut in batch:
+            try:
+                if conn.invalidated or conn.closed:
+                    conn = conn.engine.connect()
+                with conn.begin():
+                    fut.set_result(conn.execute(table.insert().values(values)).inserted_primary_key[0])
+            except Exception as e:
+                self.stats["failed"] += 1
+                fut.set_exception(e)
+        return conn
+
+
+def insert(model, **values):
+    """Insert one *model* row and return its id, group-committed when enabled."""
+    gc = current_app.extensions.get("group_commit")
+    if gc is None:
+        obj = model(**values)
+        db.session.add(obj)
+        db.session.commit()
+        return obj.id
+    db.session.commit()  # end the request's own transaction and free its connection while we wait
+    fut = gc.submit(model, values)
+    try:
+        return fut.result(timeout=gc.timeout)
+    except FutureTimeout:
+        # still queued: take it back out. Already being written: that is quick, give it once more.
+        if not fut.cancel():
+            try:
+                return fut.result(timeout=gc.timeout)
+            except FutureTimeout:
+                pass
+    gc.stats["timeouts"] += 1
+    abort(make_response(jsonify({"msg": "write queue timed out, try again"}), 503))
+
+
+def init_app(app):
+    if app.config.get("GROUP_COMMIT"):
+        app.extensions["group_commit"] = GroupCommitter(
+            app, float(app.config.get("GROUP_COMMIT_MS", DEFAULT_MS)),
+            int(app.config.get("GROUP_COMMIT_MAX", DEFAULT_MAX)),
+            float(app.config.get("GROUP_COMMIT_TIMEOUT_S", DEFAULT_TIMEOUT)))
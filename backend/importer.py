@@ -0,0 +1,320 @@
+"""Bulk import of participants, services and case notes from CSV or JSONL.
+
+Rows are streamed, validated and inserted in batches of ``BATCH``. Each batch
+is one multi-row ``INSERT`` (``COPY`` for child rows on Postgres) and one
+commit, so a large file never becomes one huge transaction or one round trip
+per row. Rows that fail validation are skipped and reported with their line
+number; they never stop the run.
+
+Participant rows may carry a ``key`` (the id in the old system). Service and
+case-note rows point at their participant with ``participant_key`` (resolved
+against keys seen earlier in the same run) or ``participant_id`` (an existing
+participant). In JSONL a participant row may also nest its ``services`` and
+``case_notes`` lists directly.
+
+    flask import --participants people.csv --services services.csv \\
+                 --case-notes notes.jsonl --rejects rejected.jsonl
+"""
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime
+
+import click
+
+try:
+    from .models import db, Participant, Service, CaseNote, ParticipantKey
+    from .duplicates import blocking_keys
+    from . import address_index
+except ImportError:
+    from models import db, Participant, Service, CaseNote, ParticipantKey
+    from duplicates import blocking_keys
+    import address_index
+
+BATCH = 2000
+KINDS = ("participants", "services", "case_notes")
+MODELS = {"participants": Participant, "services": Service, "case_notes": CaseNote}
+
+
+class Rejected(ValueError):
+    """A row that cannot be imported; the message says why."""
+
+
+# ---- reading -------------------------------------------------------------------
+def read_rows(fh, fmt):
+    """Yield ``(line number, dict)`` from a CSV or JSONL text stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(fh)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for n, line in enumerate(fh, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = {"_raw": line.rstrip("\n"), "_error": "invalid JSON"}
+        yield n, row if isinstance(row, dict) else {"_raw": line.rstrip("\n"), "_error": "not an object"}
+
+
+def guess_format(name, content_type=""):
+    name, content_type = (name or "").lower(), (content_type or "").lower()
+    if name.endswith((".jsonl", ".ndjson", ".json")) or "json" in content_type:
+        return "jsonl"
+    return "csv"
+
+
+# ---- validation ----------------------------------------------------------------
+def _text(row, field, limit=None):
+    v = row.get(field)
+    if v is None:
+        return None
+    v = str(v).strip()
+    if limit and len(v) > limit:
+        raise Rejected(f"{field} longer than {limit} characters")
+    return v or None
+
+
+def _date(row, field):
+    v = _text(row, field)
+    if not v:
+        return None
+    for parse in (date.fromisoformat, lambda s: datetime.strptime(s, "%m/%d/%Y").date()):
+        try:
+            return parse(v[:10])
+        except ValueError:
+            pass
+    raise Rejected(f"{field} is not a date: {v!r}")
+
+
+def _datetime(row, field):
+    v = _text(row, field)
+    if not v:
+        return None
+    try:
+        return datetime.fromisoformat(v.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        d = _date(row, field)
+        return datetime(d.year, d.month, d.day)
+
+
+def _int(row, field):
+    v = _text(row, field)
+    if not v:
+        return None
+    try:
+        return int(v)
+    except ValueError:
+        raise Rejected(f"{field} is not an integer: {v!r}") from None
+
+
+def _participant(row):
+    first, last = _text(row, "first_name", 120), _text(row, "last_name", 120)
+    if not first or not last:
+        raise Rejected("first_name and last_name required")
+    email = _text(row, "email", 255)
+    if email and "@" not in email:
+        raise Rejected(f"email is not an address: {email!r}")
+    return {"first_name": first, "last_name": last, "dob": _date(row, "dob"),
+            "race": _text(row, "race", 64), "address": _text(row, "address", 255),
+            "email": email, "phone": _text(row, "phone", 64),
+            "created_at": _datetime(row, "created_at") or datetime.utcnow()}
+
+
+def _service(row):
+    service_type = _text(row, "service_type", 120)
+    if not service_type:
+        raise Rejected("service_type required")
+    return {"service_type": service_type, "note": _text(row, "note"),
+            "staff_id": _int(row, "staff_id"),
+            "provided_at": _datetime(row, "provided_at") or datetime.utcnow()}
+
+
+def _case_note(row):
+    content = _text(row, "content")
+    if not content:
+        raise Rejected("content required")
+    return {"content": content, "staff_id": _int(row, "staff_id"),
+            "created_at": _datetime(row, "created_at") or datetime.utcnow()}
+
+
+CLEAN = {"participants": _participant, "services": _service, "case_notes": _case_note}
+
+
+# ---- writing -------------------------------------------------------------------
+def _copy(conn, table, rows):
+    """Postgres COPY FROM STDIN for *rows* (dicts with the same keys)."""
+    cols = list(rows[0])
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    for r in rows:
+        w.writerow([r"\N" if r[c] is None else r[c] for c in cols])
+    buf.seek(0)
+    cur = conn.connection.dbapi_connection.cursor()
+    try:
+        cur.copy_expert(f"COPY {table.name} ({', '.join(cols)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+    finally:
+        cur.close()
+
+
+def insert_rows(table, rows):
+    """Insert *rows* (dicts with the same keys) without reading ids back: COPY on Postgres."""
+    if not rows:
+        return
+    conn = db.session.connection()
+    if conn.dialect.name == "postgresql":
+        _copy(conn, table, rows)
+    else:
+        conn.execute(table.insert(), rows)
+
+
+def insert_ids(table, values):
+    """Insert *values* and return their new ids in the same order."""
+    if db.session.connection().dialect.name != "sqlite":
+        return db.session.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True),
+                                  values).scalars().all()
+    # SQLite returns the rows of a multi-row INSERT ... RETURNING in no set order
+    # (SQLAlchemy would fall back to one statement per row to sort them). Rows are
+    # inserted in VALUES order, though, each at max(rowid) + 1, under a write lock
+    # no one else can take: so the ids, sorted, line up with *values*.
+    return sorted(db.session.execute(table.insert().returning(table.c.id), values).scalars().all())
+
+
+class Importer:
+    """One import run. Feed it rows with ``add``; call ``finish`` at the end."""
+
+    def __init__(self, batch=BATCH, progress=None, rejects=None):
+        self.batch = batch
+        self.progress = progress        # callable(counts) after every batch
+        self.rejects = rejects          # callable(reject dict) per rejected row
+        self.keys = {}                  # participant key from the file -> new id
+        self.counts = {k: 0 for k in KINDS}
+        self.counts["rejected"] = 0
+        self._pending = {k: [] for k in KINDS}
+
+    def reject(self, source, line, row, error):
+        self.counts["rejected"] += 1
+        if self.rejects:
+            self.rejects({"file": source, "line": line, "error": error, "row": row})
+
+    def add(self, kind, source, line, row):
+        """Validate one row of *kind* and queue it; flushes when a batch is full."""
+        try:
+            if "_error" in row:
+                raise Rejected(row["_error"])
+            clean = CLEAN[kind](row)
+            if kind == "participants":
+                nested = [(k, c) for k in ("services", "case_notes") if isinstance(row.get(k), list)
+                          for c in row[k]]
+                pending = (clean, _text(row, "key"), nested, source, line)
+            else:
+                pending = (clean, _text(row, "participant_key"), _int(row, "participant_id"),
+                           source, line, row)
+        except Rejected as e:
+            self.reject(source, line, row, str(e))
+            return
+        self._pending[kind].append(pending)
+        if len(self._pending[kind]) >= self.batch:
+            self.flush(kind)
+
+    def flush(self, kind):
+        rows, self._pending[kind] = self._pending[kind], []
+        if not rows:
+            return
+        if kind == "participants":
+            self._insert_participants(rows)
+        else:
+            self._insert_children(kind, rows)
+        db.session.commit()
+        if self.progress:
+            self.progress(dict(self.counts))
+
+    def finish(self):
+        for kind in KINDS:
+            self.flush(kind)
+        return dict(self.counts)
+
+    def _insert_participants(self, rows):
+        table = Participant.__table__
+        values = [r[0] for r in rows]
+        ids = insert_ids(table, values)
+        keys, children = [], []
+        for pid, (clean, key, nested, source, line) in zip(ids, rows):
+            if key:
+                self.keys[key] = pid
+            keys += [{"key": k, "participant_id": pid} for k in blocking_keys(
+                clean["first_name"], clean["last_name"], clean["dob"], clean["phone"], clean["email"])]
+            children += [(kind, source, line, {**c, "participant_id": pid} if isinstance(c, dict)
+                          else {"_error": f"{kind} entry is not an object"}) for kind, c in nested]
+        if keys:
+            db.session.execute(ParticipantKey.__table__.insert(), keys)
+        for clean in values:  # Core inserts skip the mapper events that feed the index
+            address_index.queue(db.session, address_index.people, clean.get("address"), 1)
+        self.counts["participants"] += len(ids)
+        for child in children:
+            self.add(*child)
+
+    def _insert_children(self, kind, rows):
+        wanted = {pid for _, key, pid, *_ in rows if not key and pid}
+        existing = set(db.session.execute(
+            db.select(Participant.id).where(Participant.id.in_(wanted))).scalars()) if wanted else set()
+        values = []
+        for clean, key, pid, source, line, row in rows:
+            if key:
+                pid = self.keys.get(key)
+                if pid is None:
+                    self.reject(source, line, row, f"unknown participant_key {key!r}")
+                    continue
+            elif pid not in existing:
+                self.reject(source, line, row, "participant_key or an existing participant_id required")
+                continue
+            values.append({"participant_id": pid, **clean})
+        if not values:
+            return
+        insert_rows(MODELS[kind].__table__, values)
+        self.counts[kind] += len(values)
+
+
+def run(files, batch=BATCH, progress=None, rejects=None):
+    """Import ``{kind: (name, text stream, format)}``; participants go first."""
+    imp = Importer(batch, progress, rejects)
+    try:
+        for kind in KINDS:
+            if kind not in files:
+                continue
+            name, fh, fmt = files[kind]
+            for line, row in read_rows(fh, fmt):
+                imp.add(kind, name, line, row)
+            imp.flush(kind)
+        return imp.finish()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+# ---- wiring --------------------------------------------------------------------
+def init_app(app):
+    @app.cli.command("import")
+    @click.option("--participants", type=click.File("r", encoding="utf-8-sig"))
+    @click.option("--services", type=click.File("r", encoding="utf-8-sig"))
+    @click.option("--case-notes", "case_notes", type=click.File("r", encoding="utf-8-sig"))
+    @click.option("--rejects", type=click.File("w"), help="write rejected rows here (JSONL)")
+    @click.option("--batch", default=BATCH, show_default=True)
+    def import_cmd(participants, services, case_notes, rejects, batch):
+        """Bulk-import participants and their history from CSV/JSONL files."""
+        given = {"participants": participants, "services": services, "case_notes": case_notes}
+        files = {k: (fh.name, fh, guess_format(fh.name)) for k, fh in given.items() if fh}
+        if not files:
+            raise click.UsageError("give at least one of --participants, --services, --case-notes")
+
+        def progress(c):
+            click.echo(" ".join(f"{k}={v}" for k, v in c.items()), err=True)
+
+        def reject(r):
+            rejects.write(json.dumps(r, default=str) + "\n")
+
+        counts = run(files, batch, progress, reject if rejects else None)
+        json.dump(counts, sys.stdout)
+        click.echo()
@@ -0,0 +1,109 @@
+"""JSON provider for API responses, backed by orjson when it is installed.
+
+Both providers here serialize ``date`` / ``datetime`` as ISO 8601 (what
+``.isoformat()`` gives), so routes can return model values as-is. With the
+optional ``orjson`` package responses are encoded straight to bytes in C;
+without it the stdlib encoder is used. Either way the bytes are the same as
+Flask's default provider produces for the same payload after isoformatting:
+sorted keys, ASCII-only, compact separators.
+
+orjson differs from the stdlib in a few corners: non-ASCII is escaped here
+after the fact, and payloads it cannot reproduce exactly (floats outside
+1e-4..1e16, non-string keys, integers beyond 64 bits) fall back to the stdlib
+encoder. NaN and Infinity are the exception: orjson writes ``null`` where the
+stdlib wrote invalid JSON.
+
+Set ``FAST_JSON=0`` to force the stdlib encoder.
+"""
+import codecs
+import dataclasses
+import decimal
+import re
+import uuid
+from datetime import date
+from json.encoder import encode_basestring_ascii
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json only
+    orjson = None
+
+COMPACT = (",", ":")
+# a number token orjson writes differently from float.__repr__ (1e16, 0.00001);
+# _EXPONENT and "0.0000" are cheap pre-checks, the full pattern scans slowly
+_ODD_FLOAT = re.compile(rb"[:,\[]-?(?:0\.0000|[0-9.]+e)")
+_EXPONENT = re.compile(rb"e[0-9-]")
+
+
+def _default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _escape(err):
+    """Codec error handler: escape a run of non-ASCII exactly as ensure_ascii does."""
+    return encode_basestring_ascii(err.object[err.start:err.end])[1:-1], err.end
+
+
+codecs.register_error("json_ascii", _escape)
+
+
+class IsoJSONProvider(DefaultJSONProvider):
+    """Flask's provider with ISO 8601 dates instead of HTTP dates."""
+
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(IsoJSONProvider):
+    def _orjson(self, obj):
+        """Compact, sorted, ASCII-only bytes for *obj*, or None to use the stdlib."""
+        try:
+            out = orjson.dumps(obj, default=_default, option=orjson.OPT_SORT_KEYS)
+        except TypeError:  # non-str keys, huge ints, or a real error the stdlib will report
+            return None
+        if (b"0.0000" in out or _EXPONENT.search(out)) and _ODD_FLOAT.search(out):
+            return None
+        # non-ASCII and DEL only occur inside strings; escape them as ensure_ascii does
+        if not out.isascii():
+            out = out.decode().encode("ascii", "json_ascii")
+        if b"\x7f" in out:
+            out = out.replace(b"\x7f", b"\\u007f")
+        return out
+
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) <= {"separators"} and kwargs.get("separators") == COMPACT:
+            out = self._orjson(obj)
+            if out is not None:
+                return out.decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass  # NaN, huge ints, or bad input: let the stdlib decide
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        compact = self.compact if self.compact is not None else not self._app.debug
+        out = self._orjson(self._prepare_response_obj(args, kwargs)) if compact else None
+        if out is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(out + b"\n", mimetype=self.mimetype)
+
+
+def init_app(app):
+    if orjson is not None and app.config.get("FAST_JSON", True):
+        app.json = OrjsonProvider(app)
+    else:
+        app.json = IsoJSONProvider(app)
@@ -0,0 +1,189 @@
+"""Set-based participant merge and cascade delete.
+
+Both work table by table with one ``UPDATE``/``DELETE ... WHERE participant_id``
+statement each, inside a single transaction, so the cost does not depend on
+how many notes, services, etc. a participant has. Child tables are every table
+with a foreign key to ``participants.id``; new ones are picked up automatically.
+
+Core statements bypass the ORM flush hooks, so the side tables those hooks
+maintain are handled here: daily rollups are discounted for deleted rows,
+``participant_keys`` is rewritten, the ETag counters are bumped and the
+address index is told what went. The full-text tables follow via triggers.
+
+    flask participants merge SURVIVOR LOSER [LOSER ...]
+    flask participants delete ID [ID ...]
+"""
+import click
+
+try:
+    from .models import db, Participant, ParticipantKey
+    from . import address_index, rollups, etags
+    from .duplicates import blocking_keys
+except ImportError:
+    from models import db, Participant, ParticipantKey
+    import address_index, rollups, etags
+    from duplicates import blocking_keys
+
+# survivor fields that a merge fills in from the losers when they are blank
+FILL_FIELDS = ("dob", "race", "address", "email", "phone")
+FORGET = 3  # most statements rollups.forget runs: the watermarks, the grouped counts, the upsert
+BUMP = 2    # most statements etags.bump runs per key: one upsert on SQLite and Postgres, update + insert elsewhere
+
+
+class MergeError(ValueError):
+    """The merge request itself is invalid (unknown ids, merging into itself)."""
+
+
+def _child_tables():
+    """(table, participant_id column) for every table that points at participants."""
+    parent = Participant.__table__
+    out = []
+    for table in db.metadata.sorted_tables:
+        if table is parent or table is ParticipantKey.__table__:
+            continue
+        for fk in table.foreign_keys:
+            if fk.column is parent.c.id:
+                out.append((table, fk.parent))
+    return out
+
+
+def _metric_for(table):
+    for metric, (model, _, _) in rollups.SOURCES.items():
+        if model.__table__ is table:
+            return metric
+    return None
+
+
+def _write_keys(conn, pid):
+    keys_t = ParticipantKey.__table__
+    conn.execute(keys_t.delete().where(keys_t.c.participant_id == pid))
+    row = conn.execute(db.select(Participant.first_name, Participant.last_name, Participant.dob,
+                                 Participant.phone, Participant.email)
+                       .where(Participant.id == pid)).first()
+    keys = blocking_keys(*row) if row else ()
+    if keys:
+        conn.execute(keys_t.insert(), [{"key": k, "participant_id": pid} for k in keys])
+
+
+def _delete(conn, ids):
+    """Delete participants *ids* and everything that hangs off them. Returns counts per table."""
+    counts = {}
+    for table, col in _child_tables():
+        metric = _metric_for(table)
+        if metric:
+            rollups.forget(conn, metric, col.in_(ids))
+        counts[table.name] = conn.execute(table.delete().where(col.in_(ids))).rowcount
+    keys_t = ParticipantKey.__table__
+    conn.execute(keys_t.delete().where(keys_t.c.participant_id.in_(ids)))
+    parent = Participant.__table__
+    rollups.forget(conn, "participants", parent.c.id.in_(ids))
+    gone = conn.execute(parent.delete().where(parent.c.id.in_(ids)).returning(parent.c.address)).scalars().all()
+    counts[parent.name] = len(gone)
+    for address in gone:
+        address_index.queue(db.session, address_index.people, address, -1)
+    etags.bump(conn, *[f"participants:{i}" for i in ids])
+    return counts
+
+
+def merge(survivor_id, loser_ids):
+    """Fold *loser_ids* into *survivor_id* and delete them.
+
+    Child rows are re-parented, blank survivor fields are filled from the
+    losers (first non-empty value, in the order given), and the losers are
+    removed. Returns ``{table: rows moved}``. Raises ``MergeError``.
+    """
+    loser_ids = list(dict.fromkeys(loser_ids))
+    if not loser_ids:
+        raise MergeError("nothing to merge")
+    if survivor_id in loser_ids:
+        raise MergeError("cannot merge a participant into itself")
+    parent = Participant.__table__
+    fields = [parent.c[f] for f in FILL_FIELDS]
+    try:
+        conn = db.session.connection()
+        rows = {r.id: r for r in conn.execute(
+            db.select(parent.c.id, *fields).where(parent.c.id.in_([survivor_id, *loser_ids])))}
+        missing = [i for i in [survivor_id, *loser_ids] if i not in rows]
+        if missing:
+            raise MergeError(f"unknown participant ids: {missing}")
+        fill = {}
+        for f in FILL_FIELDS:
+            if getattr(rows[survivor_id], f) in (None, ""):
+                fill[f] = next((getattr(rows[i], f) for i in loser_ids
+                                if getattr(rows[i], f) not in (None, "")), None)
+        fill = {f: v for f, v in fill.items() if v is not None}
+        moved = {}
+        for table, col in _child_tables():
+            moved[table.name] = conn.execute(
+                table.update().where(col.in_(loser_ids)).values({col.name: survivor_id})).rowcount
+        if fill:
+            conn.execute(parent.update().where(parent.c.id == survivor_id).values(fill))
+            etags.bump(conn, f"participants:{survivor_id}")
+            address_index.queue(db.session, address_index.people, fill.get("address"), 1)
+        _delete(conn, loser_ids)
+        _write_keys(conn, survivor_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire_all()
+    return moved
+
+
+def delete_statements(ids=1):
+    """Most statements ``_delete`` runs for *ids* participants, for the routes' query budgets.
+
+    One delete per child table, plus ``rollups.forget`` for the ones that feed
+    a rollup; then the blocking keys, the participants' rollup and rows, and
+    the ETag counter of each.
+    """
+    tables = sum(1 + (FORGET if _metric_for(table) else 0) for table, _ in _child_tables())
+    return tables + 1 + FORGET + 1 + BUMP * ids
+
+
+def merge_statements(losers=1):
+    """Most statements ``merge`` runs for *losers* participants folded into one.
+
+    Reading the rows, one update per child table, filling in the survivor
+    (and its ETag counter), deleting the losers and rewriting its blocking keys.
+    """
+    return 1 + len(_child_tables()) + 1 + BUMP + delete_statements(losers) + 3
+
+
+def delete(ids):
+    """Delete participants *ids* with all their child rows. Returns ``{table: rows deleted}``."""
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+    try:
+        counts = _delete(db.session.connection(), ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire_all()
+    return counts
+
+
+# ---- wiring --------------------------------------------------------------------
+def init_app(app):
+    @app.cli.group("participants")
+    def participants_cli():
+        """Bulk participant maintenance."""
+
+    @participants_cli.command("merge")
+    @click.argument("survivor", type=int)
+    @click.argument("losers", type=int, nargs=-1, required=True)
+    def merge_cmd(survivor, losers):
+        try:
+            moved = merge(survivor, losers)
+        except MergeError as e:
+            raise click.ClickException(str(e))
+        for table, n in moved.items():
+            click.echo(f"{table}: {n} moved")
+
+    @participants_cli.command("delete")
+    @click.argument("ids", type=int, nargs=-1, required=True)
+    def delete_cmd(ids):
+        for table, n in delete(ids).items():
+            click.echo(f"{table}: {n} deleted")
@@ -0,0 +1,315 @@
+"""Per-request timing: a Server-Timing header and Prometheus metrics.
+
+Every request records its SQL statement count and time (SQLAlchemy cursor
+events), the time spent serializing JSON (the app's JSON provider) and its
+total time. The numbers go back to the caller as
+
+    Server-Timing: db;desc="4 queries";dur=3.1, ser;dur=0.4, total;dur=9.8
+
+and into per-endpoint counters and histograms served by ``GET /api/metrics``
+in the Prometheus text format, together with the geocoder and group-commit
+counters. Streamed responses (the report exports) run their queries while the
+body is sent, so they are recorded when it is done and carry no Server-Timing.
+
+Gunicorn workers each keep their own numbers, and each writes a snapshot to
+``METRICS_DIR`` once a second while it has new data. The endpoint sums the
+snapshots of every worker under the same master, including workers that have
+exited, so counters never go backwards while the master runs. Gauges are only taken from
+live workers. Snapshots left by an earlier master are deleted.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import Response, current_app, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    from . import geocoder
+    from .budgets import query_budget
+except ImportError:
+    import geocoder
+    from budgets import query_budget
+
+TIMING_KEY = "mis.timing"
+FLUSH_INTERVAL = 1.0
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = {
+    # name: (help, buckets, timing field)
+    "mis_request_duration_seconds": ("Total time per request.", DURATION_BUCKETS, "total"),
+    "mis_db_duration_seconds": ("Time in SQL statements per request.", DURATION_BUCKETS, "db"),
+    "mis_db_statements": ("SQL statements per request.", STATEMENT_BUCKETS, "queries"),
+    "mis_serialization_duration_seconds": ("Time serializing JSON per request.", DURATION_BUCKETS, "ser"),
+}
+HELP = {
+    "mis_http_requests_total": ("counter", "Requests handled, by endpoint, method and status."),
+    "mis_geocoder_events_total": ("counter", "Geocoder cache hits, upstream calls and failures."),
+    "mis_group_commit_total": ("counter", "Group-commit rows, batches, retries and failures."),
+    "mis_slow_queries_total": ("counter", "Statements over SLOWLOG_MS: logged, dropped, explained."),
+    "mis_geocoder_queue_depth": ("gauge", "Geocoder lookups waiting for a worker thread."),
+    "mis_geocoder_inflight": ("gauge", "Distinct geocoder lookups in progress."),
+    "mis_geocoder_breaker_open": ("gauge", "1 while a worker's geocoder circuit breaker is not closed."),
+}
+
+
+# ---- recording -------------------------------------------------------------------
+def _timing():
+    return request.environ.get(TIMING_KEY) if has_request_context() else None
+
+
+# the start time lives on the statement's execution context, not the connection:
+# a statement that fails never reaches after_cursor_execute, and must not leave
+# a stale start behind for the next one on that pooled connection
+def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.mis_query_start = time.perf_counter()
+
+
+def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "mis_query_start", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    t = _timing()
+    if t is not None:
+        t["queries"] += 1
+        t["db"] += elapsed
+
+
+def _timed(fn):
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            t = _timing()
+            if t is not None:
+                t["ser"] += time.perf_counter() - t0
+    return wrapper
+
+
+class Registry:
+    """One worker's counters and histograms."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}  # "endpoint\tmethod\tstatus" -> count
+        self.hist = {}      # "metric\tendpoint\tmethod" -> [per-bucket counts..., +Inf, sum]
+
+    def observe(self, endpoint, method, status, timing):
+        with self.lock:
+            key = f"{endpoint}\t{method}\t{status}"
+            self.requests[key] = self.requests.get(key, 0) + 1
+            for name, (_, buckets, field) in HISTOGRAMS.items():
+                value = timing[field]
+                h = self.hist.setdefault(f"{name}\t{endpoint}\t{method}", [0] * (len(buckets) + 2))
+                h[next((i for i, b in enumerate(buckets) if value <= b), len(buckets))] += 1
+                h[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {"requests": dict(self.requests), "hist": {k: list(v) for k, v in self.hist.items()}}
+
+
+def _counters_and_gauges(app):
+    counters, gauges = {}, {}
+    stats = geocoder.stats()
+    for name, value in stats.items():
+        if name in ("queue_depth", "inflight", "breaker_state"):
+            continue
+        counters[f'mis_geocoder_events_total{{event="{name}"}}'] = value
+    gauges["mis_geocoder_queue_depth"] = stats["queue_depth"]
+    gauges["mis_geocoder_inflight"] = stats["inflight"]
+    gauges[f'mis_geocoder_breaker_open{{worker="{os.getpid()}"}}'] = int(stats["breaker_state"] != "closed")
+    gc = app.extensions.get("group_commit")
+    if gc is not None:
+        for name, value in gc.stats.items():
+            counters[f'mis_group_commit_total{{event="{name}"}}'] = value
+    slow = app.extensions.get("slowlog")
+    if slow is not None:
+        for name, value in slow.stats.items():
+            counters[f'mis_slow_queries_total{{event="{name}"}}'] = value
+    return counters, gauges
+
+
+# ---- sharing between workers ---------------------------------------------------------
+class Store:
+    """Snapshots in *directory*, one ``<master pid>-<worker pid>.json`` per worker.
+
+    A daemon thread in each worker rewrites its file once a second while there
+    is something new, so an idle worker's last requests are not left out.
+    """
+
+    def __init__(self, app, directory):
+        self.app = app
+        self.dir = directory
+        self.registry = Registry()
+        self.dirty = False
+        self._thread_pid = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, pid=None):
+        return os.path.join(self.dir, f"{os.getppid()}-{pid or os.getpid()}.json")
+
+    def touch(self):
+        """Note new data; start this process's flusher (threads do not survive a fork)."""
+        self.dirty = True
+        if self._thread_pid != os.getpid():
+            with self._lock:
+                if self._thread_pid != os.getpid():
+                    self._thread_pid = os.getpid()
+                    threading.Thread(target=self._run, name="metrics-flush", daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            if self.dirty:
+                self.flush()
+
+    def flush(self):
+        self.dirty = False
+        counters, gauges = _counters_and_gauges(self.app)
+        data = {**self.registry.snapshot(), "counters": counters, "gauges": gauges}
+        tmp = self._path() + f".{threading.get_ident()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(data, fh)
+        os.replace(tmp, self._path())
+
+    def collect(self):
+        """Snapshots of every worker of this master: ``[(live, data), ...]``."""
+        self.flush()
+        master, out = os.getppid(), []
+        for name in os.listdir(self.dir):
+            if not name.endswith(".json"):
+                continue
+            ppid, pid = (int(x) for x in name[:-5].split("-"))
+            path = os.path.join(self.dir, name)
+            if ppid != master:
+                if not _alive(ppid):
+                    _unlink(path)
+                continue
+            try:
+                with open(path) as fh:
+                    out.append((_alive(pid), json.load(fh)))
+            except (OSError, ValueError):
+                continue
+        return out
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+# ---- exposition ----------------------------------------------------------------------
+def _label(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(snapshots):
+    requests, hist, counters, gauges = {}, {}, {}, {}
+    for live, data in snapshots:
+        for k, v in data["requests"].items():
+            requests[k] = requests.get(k, 0) + v
+        for k, v in data["hist"].items():
+            h = hist.setdefault(k, [0] * len(v))
+            for i, x in enumerate(v):
+                h[i] += x
+        for k, v in data["counters"].items():
+            counters[k] = counters.get(k, 0) + v
+        if live:
+            for k, v in data["gauges"].items():
+                gauges[k] = gauges.get(k, 0) + v
+
+    lines = ["# HELP mis_http_requests_total " + HELP["mis_http_requests_total"][1],
+             "# TYPE mis_http_requests_total counter"]
+    for k in sorted(requests):
+        endpoint, method, status = k.split("\t")
+        lines.append(f'mis_http_requests_total{{endpoint="{_label(endpoint)}",method="{method}",'
+                     f'status="{status}"}} {requests[k]}')
+    for name, (help_text, buckets, _) in HISTOGRAMS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for k in sorted(k for k in hist if k.startswith(name + "\t")):
+            _, endpoint, method = k.split("\t")
+            labels = f'endpoint="{_label(endpoint)}",method="{method}"'
+            h, total = hist[k], 0
+            for bound, n in zip(list(buckets) + ["+Inf"], h[:-1]):
+                total += n
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+            lines += [f"{name}_sum{{{labels}}} {round(h[-1], 6)}", f"{name}_count{{{labels}}} {total}"]
+    for series in (counters, gauges):
+        seen = set()
+        for k in sorted(series):
+            name = k.split("{")[0]
+            if name not in seen and name in HELP:
+                seen.add(name)
+                lines += [f"# HELP {name} {HELP[name][1]}", f"# TYPE {name} {HELP[name][0]}"]
+            lines.append(f"{k} {series[k]}")
+    return "\n".join(lines) + "\n"
+
+
+# ---- wiring --------------------------------------------------------------------------
+def _server_timing(t):
+    return (f'db;desc="{t["queries"]} queries";dur={t["db"] * 1000:.1f}, '
+            f'ser;dur={t["ser"] * 1000:.1f}, total;dur={t["total"] * 1000:.1f}')
+
+
+def init_app(app):
+    directory = app.config.get("METRICS_DIR") or os.path.join(tempfile.gettempdir(), "mis-metrics")
+    store = app.extensions["metrics"] = Store(app, directory)
+    atexit.register(lambda: store.dirty and store.flush())
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor):
+        event.listen(Engine, "before_cursor_execute", _before_cursor)
+        event.listen(Engine, "after_cursor_execute", _after_cursor)
+    app.json.response = _timed(app.json.response)
+    app.json.dumps = _timed(app.json.dumps)
+
+    @app.before_request
+    def _start_timing():
+        request.environ[TIMING_KEY] = {"start": time.perf_counter(), "queries": 0, "db": 0.0, "ser": 0.0}
+
+    def _observe(endpoint, method, status, t):
+        t["total"] = time.perf_counter() - t["start"]
+        store.registry.observe(endpoint, method, status, t)
+        store.touch()
+
+    @app.after_request
+    def _finish_timing(resp):
+        t = request.environ.get(TIMING_KEY)
+        if t is None:
+            return resp
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        if resp.is_streamed:
+            # the body runs its queries as it is sent, after this hook and its headers;
+            # count them once it is used up, and send no Server-Timing rather than a partial one
+            resp.call_on_close(lambda method=request.method: _observe(endpoint, method, resp.status_code, t))
+            return resp
+        _observe(endpoint, request.method, resp.status_code, t)
+        resp.headers["Server-Timing"] = _server_timing(t)
+        return resp
+
+    @app.get("/api/metrics")
+    @query_budget(0)
+    def prometheus_metrics():
+        return Response(render(current_app.extensions["metrics"].collect()),
+                        mimetype="text/plain; version=0.0.4")
@@ -21,7 +21,8 @@ class Participant(db.Model):
     address    = db.Column(db.String(255))
     email      = db.Column(db.String(255))
     phone      = db.Column(db.String(64))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # a seek key (pagination.py)
+    __table_args__ = (db.Index("ix_participants_created_at_id", "created_at", "id"),)
 
 class CaseNote(db.Model):
     __tablename__ = "case_notes"
@@ -29,7 +30,8 @@ class CaseNote(db.Model):
     participant_id = db.Column(db.Integer, db.ForeignKey("participants.id"), nullable=False, index=True)
     content = db.Column(db.Text)
     staff_id = db.Column(db.Integer)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    __table_args__ = (db.Index("ix_case_notes_participant_created_id", "participant_id", "created_at", "id"),)
 
 class Service(db.Model):
     __tablename__ = "services"
@@ -38,7 +40,8 @@ class Service(db.Model):
     service_type = db.Column(db.String(120))
     note = db.Column(db.Text)
     staff_id = db.Column(db.Integer)
-    provided_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    provided_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    __table_args__ = (db.Index("ix_services_participant_provided_id", "participant_id", "provided_at", "id"),)
 
 class Employer(db.Model):
     __tablename__ = "employers"
@@ -67,7 +70,8 @@ class Referral(db.Model):
     staff_id = db.Column(db.Integer)
     status = db.Column(db.String(64), default="referred")
     note = db.Column(db.Text)
-    referred_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    referred_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    __table_args__ = (db.Index("ix_referrals_participant_referred_id", "participant_id", "referred_at", "id"),)
 
 # Optional tables some routes reference
 class Assessment(db.Model):
@@ -103,3 +107,49 @@ class Milestone(db.Model):
     participant_id = db.Column(db.Integer, db.ForeignKey("participants.id"), index=True, nullable=False)
     name = db.Column(db.String(255))
     achieved_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+# Per-day counters behind /api/reports/summary (maintained by rollups.py)
+class DailyRollup(db.Model):
+    __tablename__ = "daily_rollups"
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(32), primary_key=True)
+    dimension = db.Column(db.String(120), primary_key=True, default="")
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class RollupWatermark(db.Model):
+    __tablename__ = "rollup_watermarks"
+    metric = db.Column(db.String(32), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+
+# Shared geocoder results, keyed on the normalized query (see geocoder.py)
+class GeocodeCache(db.Model):
+    __tablename__ = "geocode_cache"
+    query = db.Column(db.String(255), primary_key=True)
+    payload = db.Column(db.Text, nullable=False)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+# Blocking keys for duplicate detection (see duplicates.py)
+class ParticipantKey(db.Model):
+    __tablename__ = "participant_keys"
+    key = db.Column(db.String(160), primary_key=True)
+    participant_id = db.Column(db.Integer, db.ForeignKey("participants.id"), primary_key=True, index=True)
+
+# Change counters behind weak ETags (see etags.py): "employers", "participants:17", ...
+class EntityVersion(db.Model):
+    __tablename__ = "entity_versions"
+    key = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# Statements slower than SLOWLOG_MS, one row per normalized statement (see slowlog.py)
+class SlowQuery(db.Model):
+    __tablename__ = "slow_queries"
+    fingerprint = db.Column(db.String(16), primary_key=True)
+    statement = db.Column(db.Text, nullable=False)
+    calls = db.Column(db.Integer, nullable=False, default=0)
+    total_ms = db.Column(db.Float, nullable=False, default=0)
+    max_ms = db.Column(db.Float, nullable=False, default=0)
+    endpoint = db.Column(db.String(255))  # of the slowest call
+    params = db.Column(db.String(255))    # parameter types only, never values
+    plan = db.Column(db.Text)
+    planned_at = db.Column(db.DateTime)
+    last_seen = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
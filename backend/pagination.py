@@ -0,0 +1,119 @@
+import base64
+import json
+from datetime import date, datetime
+
+from flask import request, jsonify, abort, make_response
+from sqlalchemy import inspect, text, tuple_
+from sqlalchemy.engine import Row
+
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+# what backfill_keys gives rows saved before the seek keys were NOT NULL
+UNKNOWN_TIME = datetime(1970, 1, 1)
+
+# ---- opaque cursor tokens ------------------------------------------------------
+def _dump(v):
+    if isinstance(v, datetime):
+        return {"dt": v.isoformat()}
+    if isinstance(v, date):
+        return {"d": v.isoformat()}
+    return v
+
+def _load(v):
+    if isinstance(v, dict):
+        if "dt" in v:
+            return datetime.fromisoformat(v["dt"])
+        if "d" in v:
+            return date.fromisoformat(v["d"])
+        raise ValueError("bad cursor value")
+    return v
+
+def encode_cursor(values):
+    raw = json.dumps([_dump(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _fits(value, column):
+    """Whether *value* can be compared with *column*: a datetime for a DateTime, an int for an Integer."""
+    kind = column.type.python_type
+    if kind is datetime or kind is date:
+        return type(value) is kind
+    if kind is int:
+        return type(value) is int  # not bool
+    return isinstance(value, kind)
+
+def decode_cursor(token, columns):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = [_load(v) for v in json.loads(raw)]
+    except Exception:
+        values = None
+    if (not isinstance(values, list) or len(values) != len(columns)
+            or not all(_fits(v, c) for v, c in zip(values, columns))):
+        abort(make_response(jsonify({"msg": "invalid cursor"}), 400))
+    return values
+
+def request_limit(default):
+    raw = request.args.get("limit")
+    if raw is None:
+        return default
+    try:
+        n = int(raw)
+    except ValueError:
+        abort(make_response(jsonify({"msg": "limit must be an integer"}), 400))
+    return max(1, min(n, MAX_LIMIT))
+
+# ---- keyset pagination ---------------------------------------------------------
+def keyset_page(query, columns, default_limit=DEFAULT_LIMIT):
+    """Seek-paginate *query* newest-first on *columns* (a unique key, e.g. (created_at, id)).
+
+    Reads ``?after=<cursor>&limit=`` from the request and returns ``(rows, next_cursor)``.
+    The seek is a row-value comparison, so every page is an index range scan no matter
+    how deep the client has paged.
+    """
+    return seek_page(query, columns, request_limit(default_limit), request.args.get("after"))
+
+def seek_page(query, columns, limit, after=None):
+    """``keyset_page`` with an explicit *limit* and *after* cursor instead of the request's."""
+    if after:
+        values = decode_cursor(after, columns)
+        query = query.filter(tuple_(*columns) < tuple_(*values))
+    rows = query.order_by(*[c.desc() for c in columns]).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if isinstance(last, Row) and columns[0].key not in last._fields:
+            last = last[0]  # (entity, extra columns...) rows: the key lives on the entity
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return rows, next_cursor
+
+def backfill_keys(db, columns):
+    """Give rows with a NULL seek key ``UNKNOWN_TIME`` and make the columns NOT NULL where possible.
+
+    A NULL key makes the row-value comparison NULL, so its row would drop out of every
+    page after the first. models.py declares the keys NOT NULL, which ``create_all``
+    only applies to new tables; this brings older databases in line. SQLite cannot add
+    the constraint to an existing column, but every insert path sets the key.
+    """
+    postgres = db.engine.dialect.name == "postgresql"
+    for column in columns:
+        table = column.table
+        db.session.execute(table.update().where(column.is_(None)).values({column.key: UNKNOWN_TIME}))
+        if postgres:
+            nullable = {c["name"]: c["nullable"] for c in inspect(db.engine).get_columns(table.name)}
+            if nullable.get(column.name):
+                db.session.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {column.name} SET NOT NULL"))
+    db.session.commit()
+
+def page_response(items, next_cursor):
+    """Plain JSON array for legacy callers; ``{items, next_cursor}`` once a client pages.
+
+    The cursor is also sent as ``X-Next-Cursor`` so array consumers can follow it.
+    """
+    if "after" in request.args or "limit" in request.args:
+        resp = jsonify({"items": items, "next_cursor": next_cursor})
+    else:
+        resp = jsonify(items)
+    if next_cursor:
+        resp.headers["X-Next-Cursor"] = next_cursor
+    return resp, 200
@@ -0,0 +1,51 @@
+"""Set-based loading of related rows for list endpoints.
+
+The models carry plain foreign-key columns rather than relationships, so
+endpoints that show a related name (a referral's employer or provider, say)
+must not look each one up per row. ``join_names`` adds the names through outer
+joins in the list query itself; ``load_by_id`` fetches a batch of rows with a
+single ``IN`` query when a join does not fit.
+"""
+from sqlalchemy.orm import aliased
+
+try:
+    from .models import Referral, Employer, Provider
+except ImportError:
+    from models import Referral, Employer, Provider
+
+
+def join_names(query, *specs):
+    """Outer-join *query* to each ``(fk_column, Model, label)`` and add ``Model.name``.
+
+    Result rows become ``(entity, name_1, name_2, ...)``; a missing or dangling
+    foreign key gives ``None``.
+    """
+    for fk, model, label in specs:
+        alias = aliased(model)
+        query = query.outerjoin(alias, alias.id == fk).add_columns(alias.name.label(label))
+    return query
+
+
+def load_by_id(model, ids, columns=None):
+    """``{id: row}`` for every id in *ids*, in one query; only *columns* if given."""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    query = model.query.with_entities(*columns) if columns else model.query
+    return {r.id: r for r in query.filter(model.id.in_(ids))}
+
+
+def with_org_names(query):
+    """Referral query -> rows of ``(Referral, employer_name, provider_name)``."""
+    return join_names(query,
+                      (Referral.employer_id, Employer, "employer_name"),
+                      (Referral.provider_id, Provider, "provider_name"))
+
+
+def org_fields(r, employer_name, provider_name):
+    """The ``kind`` / ``org_id`` / ``org_name`` the referral lists report."""
+    kind = "employer" if r.employer_id else "provider" if r.provider_id else None
+    name = employer_name if r.employer_id else None
+    if r.provider_id:
+        name = provider_name if provider_name is not None else name
+    return {"kind": kind, "org_id": r.employer_id or r.provider_id, "org_name": name}
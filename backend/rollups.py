@@ -0,0 +1,302 @@
+"""Daily count rollups for the reports summary.
+
+Inserts are folded in by ``catch_up()``, which aggregates every source row above a
+per-metric id watermark and advances the watermark in the same transaction.
+Changes to rows already below the watermark (referral status edits, deletes)
+are applied by a ``before_flush`` hook so the counters stay exact.
+
+The watermark only moves up to a max id that was seen at least
+ROLLUP_SETTLE_S seconds earlier. On Postgres ids come from a sequence and
+transactions commit in any order, so a row with a lower id can become visible
+after a higher one; folding straight up to the current max would skip it for
+good. Waiting lets every transaction that already held a lower id finish.
+SQLite has one writer at a time, so its ids commit in order and it needs no wait.
+
+Each serving worker runs ``catch_up()`` every ROLLUP_INTERVAL_S seconds in
+a background thread (0 turns it off; then run the CLI from cron). The summary
+endpoint only reads the rollups, so it can trail new rows by that much.
+
+    flask rollup catchup   # fold new rows in
+    flask rollup check     # compare rollups with raw counts
+    flask rollup rebuild   # drop and recompute everything
+"""
+import os
+import threading
+import time
+from datetime import date, datetime
+
+import click
+from flask import current_app
+from sqlalchemy import event
+
+try:
+    from .models import db, Participant, CaseNote, Service, Referral, DailyRollup, RollupWatermark
+except ImportError:
+    from models import db, Participant, CaseNote, Service, Referral, DailyRollup, RollupWatermark
+
+# metric -> (model, timestamp column, dimension column or None)
+SOURCES = {
+    "participants": (Participant, Participant.created_at, None),
+    "case_notes": (CaseNote, CaseNote.created_at, None),
+    "services": (Service, Service.provided_at, Service.service_type),
+    "referrals": (Referral, Referral.referred_at, Referral.status),
+}
+
+def _as_date(v):
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, str):
+        return date.fromisoformat(v[:10])
+    return v
+
+def _upsert(conn, deltas):
+    """Add ``{(day, metric, dimension): n}`` onto daily_rollups."""
+    if not deltas:
+        return
+    table = DailyRollup.__table__
+    values = [{"day": d, "metric": m, "dimension": dim, "count": n}
+              for (d, m, dim), n in deltas.items() if n]
+    if not values:
+        return
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.metric, table.c.dimension],
+            set_={"count": table.c.count + stmt.excluded["count"]})
+        conn.execute(stmt, values)
+        return
+    for v in values:
+        res = conn.execute(table.update()
+                           .where((table.c.day == v["day"]) & (table.c.metric == v["metric"])
+                                  & (table.c.dimension == v["dimension"]))
+                           .values(count=table.c.count + v["count"]))
+        if not res.rowcount:
+            conn.execute(table.insert(), [v])
+
+def _watermarks(conn):
+    t = RollupWatermark.__table__
+    return dict(conn.execute(db.select(t.c.metric, t.c.last_id)).all())
+
+def _grouped(model, ts, dim, lo, hi):
+    cols = [db.func.date(ts)] + ([db.func.coalesce(dim, "")] if dim is not None else [])
+    q = (db.select(*cols, db.func.count())
+         .where(model.id > lo, model.id <= hi, ts.isnot(None))
+         .group_by(*cols))
+    return q
+
+# ---- catch-up job ---------------------------------------------------------------
+_seen = {}  # metric -> [(monotonic time, max id then)], oldest first
+_seen_lock = threading.Lock()
+
+def settle_seconds():
+    value = current_app.config.get("ROLLUP_SETTLE_S")
+    if value is None:
+        return 0.0 if db.engine.dialect.name == "sqlite" else 30.0
+    return value
+
+def _settled_highs(settle):
+    """Note each metric's max id now; return, per metric, the highest one seen *settle* seconds ago."""
+    now = time.monotonic()
+    highs = {metric: db.session.query(db.func.max(model.id)).scalar() or 0
+             for metric, (model, _, _) in SOURCES.items()}
+    out = {}
+    with _seen_lock:
+        for metric, hi in highs.items():
+            seen = _seen.setdefault(metric, [])
+            seen.append((now, hi))
+            ready = [i for i, (t, _) in enumerate(seen) if now - t >= settle]
+            if ready:
+                out[metric] = seen[ready[-1]][1]
+                del seen[:ready[-1]]  # keep the newest settled one for the next call
+    return out
+
+def catch_up(wait=False):
+    """Fold every settled source row above its watermark into daily_rollups. Returns rows added.
+
+    Rows newer than the settle time are left for a later call. With *wait*, it sleeps
+    the settle time out first, so one call folds in everything written before it.
+    """
+    settle = settle_seconds()
+    if wait and settle:
+        _settled_highs(settle)
+        db.session.rollback()  # end the read transaction so the next one sees new commits
+        time.sleep(settle)
+    highs = _settled_highs(settle)
+    added = 0
+    wm_table = RollupWatermark.__table__
+    for metric, (model, ts, dim) in SOURCES.items():
+        if metric not in highs:
+            continue
+        conn = db.session.connection()
+        last = _watermarks(conn).get(metric)
+        hi = highs[metric]
+        if last is not None and hi <= last:
+            continue
+        # claim (last, hi]; a concurrent worker that got there first makes this a no-op
+        if last is None:
+            try:
+                with db.session.begin_nested():
+                    conn.execute(wm_table.insert(), [{"metric": metric, "last_id": hi}])
+            except Exception:
+                db.session.rollback()
+                continue
+            last = 0
+        else:
+            res = conn.execute(wm_table.update()
+                               .where((wm_table.c.metric == metric) & (wm_table.c.last_id == last))
+                               .values(last_id=hi))
+            if res.rowcount != 1:
+                db.session.rollback()
+                continue
+        deltas = {}
+        for row in conn.execute(_grouped(model, ts, dim, last, hi)):
+            day, n = row[0], row[-1]
+            dimension = row[1] if dim is not None else ""
+            deltas[(_as_date(day), metric, dimension)] = n
+            added += n
+        _upsert(conn, deltas)
+        db.session.commit()
+    return added
+
+def totals(start_day, end_day):
+    """``{metric: {dimension: count}}`` summed over [start_day, end_day]."""
+    rows = (db.session.query(DailyRollup.metric, DailyRollup.dimension, db.func.sum(DailyRollup.count))
+            .filter(DailyRollup.day >= start_day, DailyRollup.day <= end_day)
+            .group_by(DailyRollup.metric, DailyRollup.dimension).all())
+    out = {m: {} for m in SOURCES}
+    for metric, dimension, n in rows:
+        if n:
+            out.setdefault(metric, {})[dimension] = int(n)
+    return out
+
+# ---- consistency checker --------------------------------------------------------
+def check():
+    """Compare rollups with raw counts up to each watermark. Returns a list of mismatches."""
+    conn = db.session.connection()
+    marks = _watermarks(conn)
+    have = {}
+    for day, metric, dimension, n in db.session.query(
+            DailyRollup.day, DailyRollup.metric, DailyRollup.dimension, DailyRollup.count):
+        if n:
+            have[(_as_date(day), metric, dimension)] = n
+    want = {}
+    for metric, (model, ts, dim) in SOURCES.items():
+        for row in conn.execute(_grouped(model, ts, dim, 0, marks.get(metric, 0))):
+            want[(_as_date(row[0]), metric, row[1] if dim is not None else "")] = row[-1]
+    return [{"day": k[0].isoformat(), "metric": k[1], "dimension": k[2],
+             "rollup": have.get(k, 0), "raw": want.get(k, 0)}
+            for k in sorted(set(have) | set(want)) if have.get(k, 0) != want.get(k, 0)]
+
+def rebuild():
+    db.session.execute(DailyRollup.__table__.delete())
+    db.session.execute(RollupWatermark.__table__.delete())
+    db.session.commit()
+    return catch_up(wait=True)
+
+def forget(conn, metric, *criteria):
+    """Take source rows matching *criteria* back out of the rollups.
+
+    Call before deleting them with a Core statement, which the flush hook below
+    never sees. Rows above the watermark were never counted and are left alone.
+    """
+    model, ts, dim = SOURCES[metric]
+    hi = _watermarks(conn).get(metric, 0)
+    if not hi:
+        return
+    deltas = {}
+    for row in conn.execute(_grouped(model, ts, dim, 0, hi).where(*criteria)):
+        k = (_as_date(row[0]), metric, row[1] if dim is not None else "")
+        deltas[k] = deltas.get(k, 0) - row[-1]
+    _upsert(conn, deltas)
+
+# ---- keep already-rolled-up rows exact on edit/delete ---------------------------
+def _before_flush(session, flush_context, instances):
+    tracked = [(o, m) for o in list(session.dirty) + list(session.deleted)
+               for m, (model, _, _) in SOURCES.items() if type(o) is model]
+    if not tracked:
+        return
+    conn = session.connection()
+    marks = _watermarks(conn)
+    deltas = {}
+    for obj, metric in tracked:
+        if obj.id is None or obj.id > marks.get(metric, 0):
+            continue  # catch_up() will count it as it is
+        _, ts, dim = SOURCES[metric]
+        hist_ts = db.inspect(obj).attrs[ts.key].load_history()
+        old_ts = (hist_ts.deleted or hist_ts.unchanged or [None])[0]
+        old_dim = new_dim = ""
+        if dim is not None:
+            hist = db.inspect(obj).attrs[dim.key].load_history()
+            old_dim = (hist.deleted or hist.unchanged or [None])[0] or ""
+            new_dim = getattr(obj, dim.key) or ""
+        new_ts = getattr(obj, ts.key)
+        if old_ts is not None:
+            k = (_as_date(old_ts), metric, old_dim)
+            deltas[k] = deltas.get(k, 0) - 1
+        if obj not in session.deleted and new_ts is not None:
+            k = (_as_date(new_ts), metric, new_dim)
+            deltas[k] = deltas.get(k, 0) + 1
+    _upsert(conn, {k: n for k, n in deltas.items() if n})
+
+# ---- periodic catch-up in each serving worker ------------------------------------
+_job_pid = None
+_job_lock = threading.Lock()
+
+def _start_job(app):
+    """Start this process's catch-up thread, once per (possibly forked) worker."""
+    global _job_pid
+    if _job_pid == os.getpid():
+        return
+    with _job_lock:
+        if _job_pid == os.getpid():
+            return
+        _job_pid = os.getpid()
+        threading.Thread(target=_run_job, args=(app,), name="rollups", daemon=True).start()
+
+def _run_job(app):
+    interval = app.config["ROLLUP_INTERVAL_S"]
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                catch_up()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("rollup catch-up failed")
+            finally:
+                db.session.remove()
+
+# ---- wiring --------------------------------------------------------------------
+def init_app(app):
+    if not event.contains(db.session, "before_flush", _before_flush):
+        event.listen(db.session, "before_flush", _before_flush)
+
+    if app.config.get("ROLLUP_INTERVAL_S"):
+        # started by the first request, so CLI commands and the gunicorn master never run it
+        app.before_request(lambda: _start_job(app))
+
+    @app.cli.group("rollup")
+    def rollup_cli():
+        """Maintain the daily report rollups."""
+
+    @rollup_cli.command("catchup")
+    def catchup_cmd():
+        click.echo(f"folded {catch_up(wait=True)} rows")
+
+    @rollup_cli.command("check")
+    def check_cmd():
+        bad = check()
+        for m in bad:
+            click.echo(f"{m['day']} {m['metric']} {m['dimension']!r}: rollup={m['rollup']} raw={m['raw']}")
+        click.echo("ok" if not bad else f"{len(bad)} mismatches")
+        if bad:
+            raise SystemExit(1)
+
+    @rollup_cli.command("rebuild")
+    def rebuild_cmd():
+        click.echo(f"rebuilt from {rebuild()} rows")
@@ -2,9 +2,15 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token
 from datetime import timedelta
 
+try:
+    from ..budgets import query_budget
+except ImportError:
+    from budgets import query_budget
+
 bp_auth = Blueprint("auth", __name__)
 
 @bp_auth.route("/login", methods=["POST", "OPTIONS"])
+@query_budget(0)
 def login():
     # Allow CORS preflight
     if request.method == "OPTIONS":
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from werkzeug.test import EnvironBuilder
+
+try:
+    from ..models import db
+    from ..budgets import query_budget
+except ImportError:
+    from models import db
+    from budgets import query_budget
+
+bp_batch = Blueprint("batch", __name__)
+
+MAX_REQUESTS = 25
+PARALLEL_GETS = 4
+# sub-requests carry the caller's credentials, nothing else from the outer request
+FORWARD_HEADERS = ("Authorization", "Cookie", "Accept", "Accept-Language")
+
+_pool = ThreadPoolExecutor(max_workers=PARALLEL_GETS, thread_name_prefix="batch")
+
+
+def _environ(sub):
+    headers = {h: request.headers[h] for h in FORWARD_HEADERS if h in request.headers}
+    kw = {"json": sub["body"]} if sub.get("body") is not None else {}
+    return EnvironBuilder(path=sub["path"], method=sub["method"], headers=headers,
+                          environ_base={"REMOTE_ADDR": request.remote_addr}, **kw).get_environ()
+
+
+def _result(resp):
+    body = resp.get_json(silent=True) if resp.is_json else resp.get_data(as_text=True)
+    out = {"status": resp.status_code, "body": body}
+    if "X-Next-Cursor" in resp.headers:
+        out["headers"] = {"X-Next-Cursor": resp.headers["X-Next-Cursor"]}
+    resp.close()
+    return out
+
+
+def _dispatch(app, environ):
+    """Run one sub-request through the URL map. Nested in the batch's request, it
+    shares the app context and so the DB session; on a pool thread it gets its own."""
+    with app.request_context(environ):
+        try:
+            return _result(app.full_dispatch_request())
+        except Exception:
+            app.logger.exception("batch sub-request failed: %s", environ.get("PATH_INFO"))
+            db.session.rollback()
+            return {"status": 500, "body": {"msg": "internal error"}}
+
+
+def _validate(subs):
+    if not isinstance(subs, list) or not subs:
+        return "requests must be a non-empty list"
+    if len(subs) > MAX_REQUESTS:
+        return f"at most {MAX_REQUESTS} requests per batch"
+    for i, sub in enumerate(subs):
+        if not isinstance(sub, dict) or not isinstance(sub.get("path"), str):
+            return f"requests[{i}] needs a path"
+        sub["method"] = str(sub.get("method") or "GET").upper()
+        if not sub["path"].startswith("/api/") or sub["path"].split("?")[0].rstrip("/") == "/api/batch":
+            return f"requests[{i}]: path must be an /api/ endpoint other than /api/batch"
+    return None
+
+
+@bp_batch.post("/batch")
+@query_budget(None)  # each sub-request has its own
+@jwt_required(optional=True)
+def batch():
+    """Run ``requests: [{method, path, body}]`` and return their responses in order.
+
+    With ``parallel: true`` each run of consecutive GETs executes concurrently;
+    anything else runs in order, so a later request sees an earlier one's writes.
+    """
+    d = request.get_json(silent=True)
+    subs, parallel = (d, False) if isinstance(d, list) else ((d or {}).get("requests"), bool((d or {}).get("parallel")))
+    err = _validate(subs)
+    if err:
+        return jsonify({"msg": err}), 400
+    app = current_app._get_current_object()
+    results, i = [], 0
+    while i < len(subs):
+        j = i + 1
+        if parallel and subs[i]["method"] == "GET":
+            while j < len(subs) and subs[j]["method"] == "GET":
+                j += 1
+        if j - i > 1:
+            environs = [_environ(s) for s in subs[i:j]]  # built here: they read the outer request
+            results += list(_pool.map(lambda env: _dispatch(app, env), environs))
+        else:
+            results.append(_dispatch(app, _environ(subs[i])))
+        i = j
+    return jsonify(results), 200
@@ -1,9 +1,20 @@
 import requests
 from flask import Blueprint, request, jsonify
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+try:
+    from .. import geocoder, address_index
+    from ..budgets import query_budget
+except ImportError:
+    import geocoder
+    import address_index
+    from budgets import query_budget
 
 bp_geo = Blueprint("geo", __name__)
 
 @bp_geo.route("/addresses", methods=["GET","OPTIONS"])
+@query_budget(3)  # a geocoder miss: cache read, then the cache write (select + insert)
+@jwt_required(optional=True)
 def addresses():
     if request.method == "OPTIONS":
         return ("", 204)
@@ -11,18 +22,24 @@ def addresses():
     if not q:
         return jsonify([])
 
+    # addresses already on file answer most keystrokes without a network call;
+    # participants' home addresses only to signed-in staff
+    local = address_index.search(q, include_people=get_jwt_identity() is not None)
+    if local:
+        return jsonify([{"label": a, "lat": None, "lon": None} for a in local])
+
     try:
-        r = requests.get(
-            "https://nominatim.openstreetmap.org/search",
-            params={"format":"json","q":q,"addressdetails":1,"limit":5},
-            headers={"User-Agent":"memorial-app/1.0"},
-            timeout=8
-        )
-        r.raise_for_status()
-        data = r.json()
-        out = [{"label":d.get("display_name"), "lat":d.get("lat"), "lon":d.get("lon")} for d in data]
-        return jsonify(out)
+        return jsonify(geocoder.lookup(q))
+    except geocoder.GeocoderUnavailable as e:
+        resp = jsonify(geocoder.fallback(q))
+        resp.headers["X-Geocoder-Fallback"] = str(e)
+        return resp
     except requests.HTTPError as e:
         return jsonify({"error":"geocode_http", "status": e.response.status_code}), 502
     except Exception as e:
         return jsonify({"error":"geocode_failed", "detail": str(e)}), 502
+
+@bp_geo.get("/addresses/metrics")
+@query_budget(0)
+def addresses_metrics():
+    return jsonify(geocoder.stats())
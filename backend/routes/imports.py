@@ -0,0 +1,37 @@
+import io
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+
+try:
+    from .. import importer
+    from ..budgets import query_budget
+except ImportError:
+    import importer
+    from budgets import query_budget
+
+bp_import = Blueprint("import", __name__)
+
+MAX_REJECTS = 100  # rejected rows echoed back; the counts cover the rest
+
+@bp_import.post("/import")
+@query_budget(6)  # per batch: participants and their keys; services and notes, an id check and an insert each
+@jwt_required(optional=True)
+def bulk_import():
+    """multipart/form-data with any of the files ``participants``, ``services``, ``case_notes``."""
+    files = {}
+    for kind in importer.KINDS:
+        f = request.files.get(kind)
+        if f:
+            fh = io.TextIOWrapper(f.stream, encoding="utf-8-sig", newline="")
+            files[kind] = (f.filename or kind, fh, importer.guess_format(f.filename, f.mimetype))
+    if not files:
+        return jsonify({"msg": "upload participants, services and/or case_notes files"}), 400
+    rejects = []
+
+    def reject(r):
+        if len(rejects) < MAX_REJECTS:
+            rejects.append(r)
+
+    counts = importer.run(files, rejects=reject)
+    return jsonify({**counts, "rejects": rejects}), 200
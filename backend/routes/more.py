@@ -1,87 +1,181 @@
-from flask import Blueprint, request, jsonify
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify, abort
 from flask_jwt_extended import jwt_required
 
 try:
     from ..models import db, Participant, CaseNote, Service, Referral, Employer, Provider
 except ImportError:
     from models import db, Participant, CaseNote, Service, Referral, Employer, Provider
+try:
+    from ..pagination import keyset_page, seek_page, page_response, request_limit
+    from ..related import with_org_names, org_fields, load_by_id
+    from ..schemas import PARTICIPANT, CASE_NOTE, SERVICE, REFERRAL, EMPLOYER, PROVIDER
+    from .. import groupcommit, etags
+    from ..importer import insert_ids
+    from ..budgets import query_budget
+except ImportError:
+    from pagination import keyset_page, seek_page, page_response, request_limit
+    from related import with_org_names, org_fields, load_by_id
+    from schemas import PARTICIPANT, CASE_NOTE, SERVICE, REFERRAL, EMPLOYER, PROVIDER
+    import groupcommit, etags
+    from importer import insert_ids
+    from budgets import query_budget
 
 bp_more = Blueprint("more", __name__)
 
+def _require_participant(pid):
+    """404 unless participant *pid* exists; checks the key without loading the row."""
+    if db.session.query(Participant.id).filter(Participant.id == pid).first() is None:
+        abort(404)
+
+def _referral_rows(rows):
+    """REFERRAL rows with employer_name / provider_name appended (see with_org_names)."""
+    return [{**REFERRAL.to_dict(r), **org_fields(r, r.employer_name, r.provider_name)} for r in rows]
+
+# ---------- participants/<pid>/profile ----------
+PROFILE_LIMIT = 20
+
+@bp_more.get("/participants/<int:pid>/profile")
+@query_budget(6)  # the participant, its notes, services and referrals, then their employers and providers
+@jwt_required(optional=True)
+def participant_profile(pid):
+    """Everything the detail page shows, in a fixed number of queries.
+
+    Notes, services and referrals are the newest ``?limit=`` (default 20) each;
+    their ``next_cursor`` continues on the matching list endpoint with ``?after=``.
+    Only the employers and providers those referrals point at are included.
+    """
+    p = PARTICIPANT.query().filter(Participant.id == pid).first_or_404()
+    limit = request_limit(PROFILE_LIMIT)
+    notes, notes_next = seek_page(CASE_NOTE.query().filter(CaseNote.participant_id == pid),
+                                  (CaseNote.created_at, CaseNote.id), limit)
+    services, services_next = seek_page(SERVICE.query().filter(Service.participant_id == pid),
+                                        (Service.provided_at, Service.id), limit)
+    referrals, referrals_next = seek_page(with_org_names(REFERRAL.query().filter(Referral.participant_id == pid)),
+                                          (Referral.referred_at, Referral.id), limit)
+    employers = load_by_id(Employer, [r.employer_id for r in referrals], EMPLOYER.columns)
+    providers = load_by_id(Provider, [r.provider_id for r in referrals], PROVIDER.columns)
+    return jsonify({
+        "participant": PARTICIPANT.to_dict(p),
+        "notes": {"items": CASE_NOTE.to_dicts(notes), "next_cursor": notes_next},
+        "services": {"items": SERVICE.to_dicts(services), "next_cursor": services_next},
+        "referrals": {"items": _referral_rows(referrals), "next_cursor": referrals_next},
+        "employers": EMPLOYER.to_dicts(employers.values()),
+        "providers": PROVIDER.to_dicts(providers.values()),
+    }), 200
+
 # ---------- participants/<pid>/notes ----------
 @bp_more.get("/participants/<int:pid>/notes")
+@query_budget(2)  # the participant exists, then one page
 @jwt_required(optional=True)
 def list_notes(pid):
-    Participant.query.get_or_404(pid)
-    rows = (CaseNote.query
-            .filter_by(participant_id=pid)
-            .order_by(CaseNote.created_at.desc())
-            .limit(200).all())
-    return jsonify([{
-        "id": n.id, "participant_id": n.participant_id, "content": n.content,
-        "staff_id": n.staff_id, "created_at": n.created_at.isoformat() if n.created_at else None
-    } for n in rows]), 200
+    _require_participant(pid)
+    rows, cursor = keyset_page(CASE_NOTE.query().filter(CaseNote.participant_id == pid),
+                               (CaseNote.created_at, CaseNote.id))
+    return page_response(CASE_NOTE.to_dicts(rows), cursor)
 
 @bp_more.post("/participants/<int:pid>/notes")
+@query_budget(3)  # the participant exists, insert, reload
 @jwt_required(optional=True)
 def create_note(pid):
-    Participant.query.get_or_404(pid)
+    _require_participant(pid)
     d = request.get_json() or {}
     content = (d.get("content") or "").strip()
     if not content:
         return jsonify({"msg": "content required"}), 400
-    note = CaseNote(participant_id=pid, content=content, staff_id=d.get("staff_id"))
-    db.session.add(note); db.session.commit()
-    return jsonify({"id": note.id}), 201
+    nid = groupcommit.insert(CaseNote, participant_id=pid, content=content, staff_id=d.get("staff_id"))
+    return jsonify({"id": nid}), 201
 
 # ---------- participants/<pid>/services ----------
 @bp_more.get("/participants/<int:pid>/services")
+@query_budget(2)  # the participant exists, then one page
 @jwt_required(optional=True)
 def list_services(pid):
-    Participant.query.get_or_404(pid)
-    rows = (Service.query
-            .filter_by(participant_id=pid)
-            .order_by(Service.provided_at.desc())
-            .limit(200).all())
-    return jsonify([{
-        "id": s.id, "participant_id": s.participant_id, "service_type": s.service_type,
-        "note": s.note, "staff_id": s.staff_id,
-        "provided_at": s.provided_at.isoformat() if s.provided_at else None
-    } for s in rows]), 200
+    _require_participant(pid)
+    rows, cursor = keyset_page(SERVICE.query().filter(Service.participant_id == pid),
+                               (Service.provided_at, Service.id))
+    return page_response(SERVICE.to_dicts(rows), cursor)
 
 @bp_more.post("/participants/<int:pid>/services")
+@query_budget(3)  # the participant exists, insert, reload
 @jwt_required(optional=True)
 def create_service(pid):
-    Participant.query.get_or_404(pid)
+    _require_participant(pid)
     d = request.get_json() or {}
     stype = (d.get("service_type") or "").strip()
     if not stype:
         return jsonify({"msg": "service_type required"}), 400
-    s = Service(participant_id=pid, service_type=stype,
-                note=d.get("note"), staff_id=d.get("staff_id"))
-    db.session.add(s); db.session.commit()
-    return jsonify({"id": s.id}), 201
+    sid = groupcommit.insert(Service, participant_id=pid, service_type=stype,
+                             note=d.get("note"), staff_id=d.get("staff_id"))
+    return jsonify({"id": sid}), 201
+
+SERVICE_BATCH_MAX = 500
+
+@bp_more.post("/services/batch")
+@query_budget(2)  # the participant ids, then one multi-row insert
+@jwt_required(optional=True)
+def create_services_batch():
+    """Record services for many participants at once.
+
+    Either shared fields plus ``participant_ids``, or ``services``: a list of
+    per-participant records (shared top-level fields fill in what they omit).
+    Valid items are inserted together; ``results`` lines up with the input.
+    """
+    d = request.get_json() or {}
+    items = d.get("services")
+    if items is None:
+        items = [{"participant_id": pid} for pid in d.get("participant_ids") or []]
+    if not isinstance(items, list) or not items:
+        return jsonify({"msg": "participant_ids or services required"}), 400
+    if len(items) > SERVICE_BATCH_MAX:
+        return jsonify({"msg": f"at most {SERVICE_BATCH_MAX} services per batch"}), 400
+    shared = {k: d[k] for k in ("service_type", "note", "staff_id", "provided_at") if d.get(k) is not None}
+    wanted = {i.get("participant_id") for i in items
+              if isinstance(i, dict) and isinstance(i.get("participant_id"), int)}
+    known = set(db.session.scalars(db.select(Participant.id).where(Participant.id.in_(wanted))))
+    results, values, slots = [], [], []
+    for item in items:
+        rec = {**shared, **item} if isinstance(item, dict) else {}
+        pid = rec.get("participant_id")
+        stype = (rec.get("service_type") or "").strip()
+        try:
+            provided = datetime.fromisoformat(rec["provided_at"]) if rec.get("provided_at") else datetime.utcnow()
+        except (TypeError, ValueError):
+            provided = None
+        if not isinstance(pid, int) or pid not in known:
+            results.append({"participant_id": pid, "error": "participant not found"})
+        elif not stype:
+            results.append({"participant_id": pid, "error": "service_type required"})
+        elif provided is None:
+            results.append({"participant_id": pid, "error": "provided_at must be an ISO datetime"})
+        else:
+            slots.append(len(results))
+            results.append({"participant_id": pid})
+            values.append({"participant_id": pid, "service_type": stype, "note": rec.get("note"),
+                           "staff_id": rec.get("staff_id"), "provided_at": provided})
+    if values:
+        for slot, sid in zip(slots, insert_ids(Service.__table__, values)):
+            results[slot]["id"] = sid
+        db.session.commit()
+    status = 201 if len(values) == len(results) else (200 if values else 400)
+    return jsonify({"created": len(values), "failed": len(results) - len(values), "results": results}), status
 
 # ---------- participants/<pid>/referrals ----------
 @bp_more.get("/participants/<int:pid>/referrals")
+@query_budget(2)  # the participant exists, then one page
 @jwt_required(optional=True)
 def list_referrals(pid):
-    Participant.query.get_or_404(pid)
-    rows = (Referral.query
-            .filter_by(participant_id=pid)
-            .order_by(Referral.referred_at.desc())
-            .limit(200).all())
-    return jsonify([{
-        "id": r.id, "participant_id": r.participant_id, "employer_id": r.employer_id,
-        "provider_id": r.provider_id, "staff_id": r.staff_id,
-        "status": r.status, "note": r.note,
-        "referred_at": r.referred_at.isoformat() if r.referred_at else None
-    } for r in rows]), 200
+    _require_participant(pid)
+    rows, cursor = keyset_page(with_org_names(REFERRAL.query().filter(Referral.participant_id == pid)),
+                               (Referral.referred_at, Referral.id))
+    return page_response(_referral_rows(rows), cursor)
 
 @bp_more.post("/participants/<int:pid>/referrals")
+@query_budget(3)  # the participant exists, insert, reload
 @jwt_required(optional=True)
 def create_referral(pid):
-    Participant.query.get_or_404(pid)
+    _require_participant(pid)
     d = request.get_json() or {}
     ref = Referral(participant_id=pid,
                    employer_id=d.get("employer_id"),
@@ -94,15 +188,15 @@ def create_referral(pid):
 
 # ---------- employers ----------
 @bp_more.get("/employers")
+@query_budget(2)  # ETag counter, then the list
 @jwt_required(optional=True)
+@etags.conditional("employers")
 def list_employers():
-    rows = Employer.query.order_by(Employer.id.desc()).limit(200).all()
-    return jsonify([{
-        "id": e.id, "name": e.name, "contact_name": e.contact_name,
-        "phone": e.phone, "email": e.email, "address": e.address
-    } for e in rows]), 200
+    rows, cursor = keyset_page(EMPLOYER.query(), (Employer.id,))
+    return page_response(EMPLOYER.to_dicts(rows), cursor)
 
 @bp_more.post("/employers")
+@query_budget(4)  # insert, ETag counter (up to 2), reload
 @jwt_required(optional=True)
 def create_employer():
     d = request.get_json() or {}
@@ -116,15 +210,15 @@ def create_employer():
 
 # ---------- providers ----------
 @bp_more.get("/providers")
+@query_budget(2)  # ETag counter, then the list
 @jwt_required(optional=True)
+@etags.conditional("providers")
 def list_providers():
-    rows = Provider.query.order_by(Provider.id.desc()).limit(200).all()
-    return jsonify([{
-        "id": p.id, "name": p.name, "contact_name": p.contact_name,
-        "phone": p.phone, "email": p.email, "address": p.address
-    } for p in rows]), 200
+    rows, cursor = keyset_page(PROVIDER.query(), (Provider.id,))
+    return page_response(PROVIDER.to_dicts(rows), cursor)
 
 @bp_more.post("/providers")
+@query_budget(4)  # insert, ETag counter (up to 2), reload
 @jwt_required(optional=True)
 def create_provider():
     d = request.get_json() or {}
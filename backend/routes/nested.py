@@ -2,17 +2,33 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import get_jwt, jwt_required
 
 try:
-    from ..models import db, CaseNote, Service, Assessment, Employment, Education, Milestone, Referral, Employer, Provider
+    from ..models import db, CaseNote, Service, Assessment, Employment, Education, Milestone, Referral
 except ImportError:
-    from models import db, CaseNote, Service, Assessment, Employment, Education, Milestone, Referral, Employer, Provider
+    from models import db, CaseNote, Service, Assessment, Employment, Education, Milestone, Referral
+try:
+    from ..pagination import keyset_page, page_response
+    from ..related import with_org_names, org_fields
+    from ..schemas import CASE_NOTE, SERVICE, REFERRAL
+    from ..budgets import query_budget
+except ImportError:
+    from pagination import keyset_page, page_response
+    from related import with_org_names, org_fields
+    from schemas import CASE_NOTE, SERVICE, REFERRAL
+    from budgets import query_budget
 
 bp_nested = Blueprint('nested', __name__, url_prefix='/api/v1/participants/<int:pid>')
 
+# the v1 lists return fewer fields than /api/participants/<pid>/...
+CASE_NOTE_V1 = CASE_NOTE.pick('id', 'content', 'staff_id', 'created_at')
+SERVICE_V1 = SERVICE.pick('id', 'service_type', 'note', 'staff_id', 'provided_at')
+REFERRAL_V1 = REFERRAL.pick('id', 'status', 'note', 'referred_at')
+
 @bp_nested.get('/casenotes')
+@query_budget(1)  # one keyset page
 @jwt_required()
 def list_casenotes(pid):
-    rows = CaseNote.query.filter_by(participant_id=pid).order_by(CaseNote.created_at.desc()).limit(200).all()
-    return jsonify([{'id': r.id, 'content': r.content, 'staff_id': r.staff_id, 'created_at': r.created_at.isoformat()} for r in rows])
+    rows, cursor = keyset_page(CASE_NOTE_V1.query().filter(CaseNote.participant_id == pid), (CaseNote.created_at, CaseNote.id))
+    return page_response(CASE_NOTE_V1.to_dicts(rows), cursor)
 
 @bp_nested.post('/casenotes')
 @jwt_required()
@@ -23,10 +39,11 @@ def add_casenote(pid):
     db.session.add(note); db.session.commit(); return jsonify({'id': note.id}), 201
 
 @bp_nested.get('/services')
+@query_budget(1)  # one keyset page
 @jwt_required()
 def list_services(pid):
-    rows = Service.query.filter_by(participant_id=pid).order_by(Service.provided_at.desc()).limit(200).all()
-    return jsonify([{'id': r.id, 'service_type': r.service_type, 'note': r.note, 'staff_id': r.staff_id, 'provided_at': r.provided_at.isoformat()} for r in rows])
+    rows, cursor = keyset_page(SERVICE_V1.query().filter(Service.participant_id == pid), (Service.provided_at, Service.id))
+    return page_response(SERVICE_V1.to_dicts(rows), cursor)
 
 @bp_nested.post('/services')
 @jwt_required()
@@ -67,23 +84,12 @@ def add_milestone(pid):
     db.session.add(m); db.session.commit(); return jsonify({'id': m.id}), 201
 
 @bp_nested.get('/referrals')
+@query_budget(1)  # one keyset page, organization names joined in
 @jwt_required()
 def list_referrals(pid):
-    rows = Referral.query.filter_by(participant_id=pid).order_by(Referral.referred_at.desc()).all()
-    out = []
-    for r in rows:
-        name = None
-        kind = None
-        if r.employer_id:
-            e = Employer.query.get(r.employer_id)
-            name = e.name if e else None
-            kind = 'employer'
-        if r.provider_id:
-            p = Provider.query.get(r.provider_id)
-            name = p.name if p else name
-            kind = 'provider' if kind is None else kind
-        out.append({'id': r.id, 'kind': kind, 'org_id': r.employer_id or r.provider_id, 'org_name': name, 'status': r.status, 'note': r.note, 'referred_at': r.referred_at.isoformat()})
-    return jsonify(out)
+    rows, cursor = keyset_page(with_org_names(REFERRAL_V1.query().filter(Referral.participant_id == pid)), (Referral.referred_at, Referral.id))
+    out = [{**REFERRAL_V1.to_dict(r), **org_fields(r, r.employer_name, r.provider_name)} for r in rows]
+    return page_response(out, cursor)
 
 @bp_nested.post('/referrals')
 @jwt_required()
@@ -4,20 +4,25 @@ try:
     from ..models import db, Participant
 except ImportError:
     from models import db, Participant
+try:
+    from ..pagination import keyset_page, page_response
+    from ..schemas import PARTICIPANT
+    from ..budgets import query_budget
+    from .. import duplicates, merge, etags
+except ImportError:
+    from pagination import keyset_page, page_response
+    from schemas import PARTICIPANT
+    from budgets import query_budget
+    import duplicates, merge, etags
 bp = Blueprint("participants", __name__)
-def _row(p):
-    return {
-        "id": p.id, "first_name": p.first_name, "last_name": p.last_name,
-        "dob": p.dob.isoformat() if p.dob else None, "race": p.race,
-        "address": p.address, "email": p.email, "phone": p.phone,
-        "created_at": p.created_at.isoformat() if p.created_at else None
-    }
 @bp.get("/participants")
+@query_budget(1)  # one keyset page
 @jwt_required(optional=True)
 def list_participants():
-    items = Participant.query.order_by(Participant.id.desc()).limit(200).all()
-    return jsonify([_row(p) for p in items]), 200
+    items, cursor = keyset_page(PARTICIPANT.query(), (Participant.created_at, Participant.id))
+    return page_response(PARTICIPANT.to_dicts(items), cursor)
 @bp.post("/participants")
+@query_budget(7)  # insert, blocking keys (2), ETag counter (up to 2), reload, duplicate search
 @jwt_required(optional=True)
 def create_participant():
     d = request.get_json() or {}
@@ -29,15 +34,31 @@ def create_participant():
                     race=d.get("race"), address=d.get("address"),
                     email=d.get("email"), phone=d.get("phone"))
     db.session.add(p); db.session.commit()
-    return jsonify({"id": p.id}), 201
+    # intake still succeeds; staff get likely duplicates back to review
+    return jsonify({"id": p.id, "possible_duplicates": duplicates.candidates_for(p)}), 201
 @bp.get("/participants/<int:pid>")
+@query_budget(2)  # ETag counter, then the row
 @jwt_required(optional=True)
+@etags.conditional(lambda pid: f"participants:{pid}")
 def get_participant(pid):
+    from flask import abort
+    row = PARTICIPANT.query().filter(Participant.id == pid).first()
+    if not row: abort(404)
+    return jsonify(PARTICIPANT.to_dict(row)), 200
+@bp.get("/participants/<int:pid>/duplicates")
+@query_budget(2)  # the participant, then one candidate query
+@jwt_required(optional=True)
+def participant_duplicates(pid):
     from flask import abort
     p = Participant.query.get(pid)
     if not p: abort(404)
-    return jsonify(_row(p)), 200
+    try:
+        min_score = float(request.args.get("min_score", duplicates.MIN_SCORE))
+    except ValueError:
+        return jsonify({"msg":"min_score must be a number"}), 400
+    return jsonify(duplicates.candidates_for(p, min_score)), 200
 @bp.put("/participants/<int:pid>")
+@query_budget(8)  # load, rollup watermarks, update, blocking keys (2), ETag counter (up to 2), reload
 @jwt_required(optional=True)
 def update_participant(pid):
     from flask import abort
@@ -55,12 +76,35 @@ def update_participant(pid):
     for k in ("dob","race","address","email","phone"):
         if k in d: setattr(p, k, d[k])
     db.session.commit()
-    return jsonify(_row(p)), 200
+    return jsonify(PARTICIPANT.from_obj(p)), 200
 @bp.delete("/participants/<int:pid>")
+@query_budget(lambda: 1 + merge.delete_statements())  # the lookup, then the cascade
 @jwt_required(optional=True)
 def delete_participant(pid):
     from flask import abort
     p = Participant.query.get(pid)
     if not p: abort(404)
-    db.session.delete(p); db.session.commit()
+    merge.delete([pid])  # takes notes, services, referrals, ... with it
     return ("", 204)
+@bp.post("/participants/bulk-delete")
+@query_budget(lambda: merge.delete_statements(1))  # one id, as bench.budgets sends; each more adds merge.BUMP
+@jwt_required(optional=True)
+def bulk_delete_participants():
+    d = request.get_json() or {}
+    ids = d.get("ids")
+    if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+        return jsonify({"msg":"ids must be a list of participant ids"}), 400
+    return jsonify({"deleted": merge.delete(ids)}), 200
+@bp.post("/participants/<int:pid>/merge")
+@query_budget(lambda: merge.merge_statements(1))  # one loser, as bench.budgets sends
+@jwt_required(optional=True)
+def merge_participants(pid):
+    d = request.get_json() or {}
+    ids = d.get("merge_ids")
+    if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+        return jsonify({"msg":"merge_ids must be a list of participant ids"}), 400
+    try:
+        moved = merge.merge(pid, ids)
+    except merge.MergeError as e:
+        return jsonify({"msg": str(e)}), 400
+    return jsonify({"id": pid, "moved": moved}), 200
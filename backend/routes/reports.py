@@ -1,12 +1,18 @@
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, current_app, stream_with_context
 from datetime import datetime, timedelta
 import csv
 from io import StringIO
 
 try:
-    from ..models import db, Participant, CaseNote, Service, Referral, Employer, Provider
+    from ..models import db, Participant, Service, Employer, Provider
+    from ..schemas import PARTICIPANT
+    from .. import rollups
+    from ..budgets import query_budget
 except ImportError:
-    from models import db, Participant, CaseNote, Service, Referral, Employer, Provider
+    from models import db, Participant, Service, Employer, Provider
+    from schemas import PARTICIPANT
+    import rollups
+    from budgets import query_budget
 
 bp_reports = Blueprint("reports", __name__)
 
@@ -29,33 +35,51 @@ def _range():
     end = datetime(date_to.year, date_to.month, date_to.day, 23, 59, 59)
     return start, end
 
+EXPORT_BATCH = 1000  # rows per DB fetch and per response chunk
+
 def _csv_response(filename, rows, headers):
-    sio = StringIO()
-    writer = csv.writer(sio)
-    writer.writerow(headers)
-    for r in rows:
-        writer.writerow(r)
-    out = sio.getvalue()
-    return Response(out, mimetype="text/csv",
+    """Stream *rows* (any iterable) as CSV, flushing every EXPORT_BATCH rows."""
+    def generate():
+        sio = StringIO()
+        writer = csv.writer(sio)
+        writer.writerow(headers)
+        for i, r in enumerate(rows, 1):
+            writer.writerow(r)
+            if i % EXPORT_BATCH == 0:
+                yield sio.getvalue()
+                sio.seek(0); sio.truncate(0)
+        yield sio.getvalue()
+    return Response(stream_with_context(generate()), mimetype="text/csv",
                     headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
+def _wants_ndjson():
+    return (request.args.get("format") == "ndjson"
+            or "application/x-ndjson" in (request.headers.get("Accept") or ""))
+
+def _json_response(rows):
+    """Stream *rows* as a JSON array (same bytes as jsonify) or as NDJSON."""
+    ndjson = _wants_ndjson()
+    dumps = current_app.json.dumps
+    def generate():
+        buf = [] if ndjson else ["["]
+        for i, r in enumerate(rows):
+            if ndjson:
+                buf.append(dumps(r, separators=(",", ":")) + "\n")
+            else:
+                buf.append(("," if i else "") + dumps(r, separators=(",", ":")))
+            if len(buf) >= EXPORT_BATCH:
+                yield "".join(buf)
+                buf = []
+        if not ndjson:
+            buf.append("]\n")
+        yield "".join(buf)
+    return Response(stream_with_context(generate()),
+                    mimetype="application/x-ndjson" if ndjson else "application/json")
+
 # ---- summary (multiple paths supported) -------------------------------------
 def _summary_payload(start, end):
-    def between(col):
-        return (col >= start) & (col <= end)
-
-    # counts with defensive defaults
-    p_count = db.session.query(db.func.count(Participant.id)) \
-        .filter(between(Participant.created_at)).scalar() or 0
-
-    notes_count = db.session.query(db.func.count(CaseNote.id)) \
-        .filter(between(CaseNote.created_at)).scalar() or 0
-
-    svc_count = db.session.query(db.func.count(Service.id)) \
-        .filter(between(Service.provided_at)).scalar() or 0
-
-    ref_count = db.session.query(db.func.count(Referral.id)) \
-        .filter(between(Referral.referred_at)).scalar() or 0
+    # the per-day rollups, as of the workers' last catch-up (see rollups.py)
+    counts = rollups.totals(start.date(), end.date())
 
     emp_count = db.session.query(db.func.count(Employer.id)).scalar() or 0
     prov_count = db.session.query(db.func.count(Provider.id)).scalar() or 0
@@ -63,18 +87,21 @@ def _summary_payload(start, end):
     return {
         "range": {"from": start.date().isoformat(), "to": end.date().isoformat()},
         "totals": {
-            "participants": p_count,
-            "case_notes": notes_count,
-            "services": svc_count,
-            "referrals": ref_count,
+            "participants": sum(counts["participants"].values()),
+            "case_notes": sum(counts["case_notes"].values()),
+            "services": sum(counts["services"].values()),
+            "referrals": sum(counts["referrals"].values()),
             "employers": emp_count,
             "providers": prov_count,
         },
+        "services_by_type": counts["services"],
+        "referrals_by_status": counts["referrals"],
     }
 
 @bp_reports.route("/report", methods=["GET", "OPTIONS"])
 @bp_reports.route("/reports", methods=["GET", "OPTIONS"])
 @bp_reports.route("/reports/summary", methods=["GET", "OPTIONS"])
+@query_budget(3)  # rollup totals, employer and provider counts
 def summary():
     if request.method == "OPTIONS":
         return ("", 204)
@@ -85,104 +112,83 @@ def summary():
         return jsonify({"error": "summary_failed", "detail": str(e)}), 400
 
 # ---- participants: JSON + CSV ------------------------------------------------
+def _participants_query(start, end):
+    return (PARTICIPANT.query()
+        .filter((Participant.created_at >= start) & (Participant.created_at <= end))
+        .order_by(Participant.created_at.desc())
+        .yield_per(EXPORT_BATCH))
+
 @bp_reports.route("/reports/participants", methods=["GET", "OPTIONS"])
+@query_budget(1)  # one streamed query
 def participants_json():
     if request.method == "OPTIONS":
         return ("", 204)
     start, end = _range()
-    q = (db.session.query(
-            Participant.id, Participant.first_name, Participant.last_name,
-            Participant.dob, Participant.race, Participant.address,
-            Participant.email, Participant.phone, Participant.created_at
-        )
-        .filter((Participant.created_at >= start) & (Participant.created_at <= end))
-        .order_by(Participant.created_at.desc()))
-    rows = []
-    for (pid, fn, ln, dob, race, addr, email, phone, created) in q.all():
-        rows.append({
+    q = _participants_query(start, end)
+    rows = ({
             "id": pid,
             "first_name": fn or "",
             "last_name": ln or "",
-            "dob": dob.isoformat() if dob else None,
+            "dob": dob,
             "race": race or "",
             "address": addr or "",
             "email": email or "",
             "phone": phone or "",
-            "created_at": created.isoformat() if created else None,
-        })
-    return jsonify(rows)
+            "created_at": created,
+        } for (pid, fn, ln, dob, race, addr, email, phone, created) in q)
+    return _json_response(rows)
 
 @bp_reports.route("/reports/participants.csv", methods=["GET", "OPTIONS"])
+@query_budget(1)  # one streamed query
 def participants_csv():
     if request.method == "OPTIONS":
         return ("", 204)
     start, end = _range()
-    q = (db.session.query(
-            Participant.id, Participant.first_name, Participant.last_name,
-            Participant.dob, Participant.race, Participant.address,
-            Participant.email, Participant.phone, Participant.created_at
-        )
-        .filter((Participant.created_at >= start) & (Participant.created_at <= end))
-        .order_by(Participant.created_at.desc()))
-    rows = []
-    for (pid, fn, ln, dob, race, addr, email, phone, created) in q.all():
-        rows.append([
-            pid, fn or "", ln or "",
-            dob.isoformat() if dob else "",
-            race or "", addr or "", email or "", phone or "",
-            created.isoformat() if created else "",
-        ])
-    return _csv_response("participants.csv",
-                         rows,
-                         ["id","first_name","last_name","dob","race","address","email","phone","created_at"])
+    q = _participants_query(start, end)
+    return _csv_response("participants.csv", map(PARTICIPANT.to_csv, q), PARTICIPANT.fields)
 
 # ---- services: JSON + CSV (joined with participant name) ---------------------
-@bp_reports.route("/reports/services", methods=["GET", "OPTIONS"])
-def services_json():
-    if request.method == "OPTIONS":
-        return ("", 204)
-    start, end = _range()
-    q = (db.session.query(
+def _services_query(start, end):
+    return (db.session.query(
             Service.id, Service.participant_id, Service.service_type,
             Service.note, Service.staff_id, Service.provided_at,
             Participant.first_name, Participant.last_name
         )
         .join(Participant, Participant.id == Service.participant_id)
         .filter((Service.provided_at >= start) & (Service.provided_at <= end))
-        .order_by(Service.provided_at.desc()))
-    out = []
-    for (sid, pid, stype, note, staff_id, provided_at, fn, ln) in q.all():
-        out.append({
+        .order_by(Service.provided_at.desc())
+        .yield_per(EXPORT_BATCH))
+
+@bp_reports.route("/reports/services", methods=["GET", "OPTIONS"])
+@query_budget(1)  # one streamed query
+def services_json():
+    if request.method == "OPTIONS":
+        return ("", 204)
+    start, end = _range()
+    q = _services_query(start, end)
+    out = ({
             "id": sid,
             "participant_id": pid,
             "service_type": stype or "",
             "note": (note or "").strip(),
             "staff_id": staff_id,
-            "provided_at": provided_at.isoformat() if provided_at else None,
+            "provided_at": provided_at,
             "participant_name": f"{(fn or '').strip()} {(ln or '').strip()}".strip(),
-        })
-    return jsonify(out)
+        } for (sid, pid, stype, note, staff_id, provided_at, fn, ln) in q)
+    return _json_response(out)
 
 @bp_reports.route("/reports/services.csv", methods=["GET", "OPTIONS"])
+@query_budget(1)  # one streamed query
 def services_csv():
     if request.method == "OPTIONS":
         return ("", 204)
     start, end = _range()
-    q = (db.session.query(
-            Service.id, Service.participant_id, Service.service_type,
-            Service.note, Service.staff_id, Service.provided_at,
-            Participant.first_name, Participant.last_name
-        )
-        .join(Participant, Participant.id == Service.participant_id)
-        .filter((Service.provided_at >= start) & (Service.provided_at <= end))
-        .order_by(Service.provided_at.desc()))
-    rows = []
-    for (sid, pid, stype, note, staff_id, provided_at, fn, ln) in q.all():
-        rows.append([
+    q = _services_query(start, end)
+    rows = ([
             sid, pid, stype or "", (note or "").replace("\n"," ").strip(),
             staff_id or "", provided_at.isoformat() if provided_at else "",
             f"{(fn or '').strip()} {(ln or '').strip()}".strip()
-        ])
+        ] for (sid, pid, stype, note, staff_id, provided_at, fn, ln) in q)
     return _csv_response("services.csv",
                          rows,
                          ["id","participant_id","service_type","note","staff_id","provided_at","participant_name"])
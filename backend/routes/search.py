@@ -0,0 +1,22 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+
+try:
+    from .. import fulltext
+    from ..budgets import query_budget
+except ImportError:
+    import fulltext
+    from budgets import query_budget
+
+bp_search = Blueprint("search", __name__)
+
+@bp_search.get("/search")
+@query_budget(2)  # participants, then case notes
+@jwt_required(optional=True)
+def search():
+    q = (request.args.get("q") or "").strip()
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 100))
+    except ValueError:
+        return jsonify({"msg": "limit must be an integer"}), 400
+    return jsonify(fulltext.search(q, limit)), 200
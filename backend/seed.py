@@ -0,0 +1,284 @@
+"""Synthetic participants and their history, for load tests and benchmarks.
+
+    flask seed --participants 50000 [--seed 1] [--until 2025-06-30] [--services 20]
+
+Participants get names, birth dates, races, addresses and contact details
+from fixed lists, and an activity level drawn from a long-tailed distribution,
+so most have a handful of services and a few have hundreds, as in real case
+loads. Case notes, referrals, assessments, jobs, schooling and milestones
+follow the same activity level. Services and notes fall on weekdays in
+business hours, mostly in the morning sign-in rush. Employers and providers
+are created first, and a few popular ones get most of the referrals.
+
+The same ``--seed``, ``--until`` and counts always produce the same rows. Rows go in
+``--batch`` participants at a time: one multi-row insert per table (``COPY``
+on Postgres) and one commit, as ``flask import`` does. The blocking keys,
+rollups, address index and ETag counters that ORM writes keep up to date are
+brought up to date here too.
+"""
+import json
+import random
+import sys
+from bisect import bisect
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate
+
+import click
+
+try:
+    from .models import (db, Participant, CaseNote, Service, Referral, Employer, Provider,
+                         Assessment, Employment, Education, Milestone, ParticipantKey)
+    from .duplicates import blocking_keys
+    from .importer import insert_ids, insert_rows
+    from . import address_index, etags, rollups
+except ImportError:
+    from models import (db, Participant, CaseNote, Service, Referral, Employer, Provider,
+                        Assessment, Employment, Education, Milestone, ParticipantKey)
+    from duplicates import blocking_keys
+    from importer import insert_ids, insert_rows
+    import address_index, etags, rollups
+
+BATCH = 2000
+UNTIL = date(2025, 6, 30)  # default last day of activity; fixed, so a seed means the same rows any day
+YEARS = 3          # participants enrolled over this many years before --until
+SERVICES = 20.0    # mean services per participant
+NOTES = 0.6        # case notes per service
+REFERRALS = 2.0    # mean referrals per participant
+EMPLOYERS = 200
+PROVIDERS = 60
+STAFF = 25
+
+FIRST_NAMES = ("Maria", "Jose", "James", "Michael", "Jennifer", "David", "Linda", "Robert", "Juan",
+               "Patricia", "John", "Elizabeth", "Luis", "Ana", "Carlos", "Sarah", "Daniel", "Jessica",
+               "Anthony", "Ashley", "Christopher", "Guadalupe", "Angela", "Kevin", "Michelle", "Brian",
+               "Rosa", "Tiffany", "Marcus", "Andrea", "Jesus", "Vanessa", "Thomas", "Monica", "Eric",
+               "Kimberly", "Miguel", "Stephanie", "Terrell", "Nancy", "Kou", "Mai", "Sokha", "Nhia")
+LAST_NAMES = ("Garcia", "Hernandez", "Smith", "Martinez", "Lopez", "Johnson", "Gonzalez", "Williams",
+              "Rodriguez", "Brown", "Perez", "Jones", "Sanchez", "Davis", "Ramirez", "Miller",
+              "Torres", "Wilson", "Flores", "Anderson", "Rivera", "Taylor", "Gomez", "Thomas",
+              "Diaz", "Moore", "Reyes", "Jackson", "Cruz", "White", "Morales", "Harris", "Ortiz",
+              "Martin", "Gutierrez", "Thompson", "Chavez", "Lee", "Vang", "Nguyen", "Xiong", "Singh",
+              "Khan", "Lor", "Tran", "Washington", "Mendoza", "Castillo", "Ruiz", "Alvarez")
+# the intake form's options (frontend ParticipantList.jsx), with rough shares
+RACES = (("White", 34), ("Black or African American", 18), ("Asian", 16), ("Multiracial", 9),
+         ("American Indian or Alaska Native", 2), ("Native Hawaiian or Other Pacific Islander", 1),
+         ("Other", 10), ("Prefer not to say", 6), (None, 4))
+STREETS = ("Main St", "Pacific Ave", "El Dorado St", "March Ln", "Hammer Ln", "Wilson Way",
+           "Charter Way", "Airport Way", "Center St", "Weber Ave", "Harding Way", "Fremont St",
+           "California St", "Lincoln St", "Oak St", "Park St", "Miner Ave", "Channel St")
+ZIPS = ("95202", "95203", "95204", "95205", "95206", "95207", "95209", "95210", "95212", "95215")
+# the detail page's options (frontend ParticipantDetail.jsx)
+SERVICE_TYPES = (("group", 45), ("one_on_one", 30), ("counseling", 15), ("telephone", 10))
+REFERRAL_STATUSES = (("referred", 35), ("contacted", 25), ("accepted", 15), ("declined", 10), ("completed", 15))
+# sign-ins cluster in the first hours of the day
+HOURS = ((8, 14), (9, 22), (10, 18), (11, 12), (12, 6), (13, 10), (14, 9), (15, 6), (16, 3))
+NOTES_TEXT = ("Checked in for {s}.", "Followed up by phone about {s}.", "Reviewed resume and job leads.",
+              "Completed intake paperwork.", "Discussed transportation barriers.",
+              "Referred to {s} workshop.", "Mock interview; good progress.", "Left voicemail, no answer.",
+              "Helped with online application.", "Needs ID documents before next visit.")
+ORG_WORDS = ("Valley", "Delta", "Central", "Harbor", "Golden", "Pacific", "River", "Summit", "Oak",
+             "Capital", "Unity", "Pioneer", "Sierra", "Crossroads", "Bridge")
+EMPLOYER_KINDS = ("Logistics", "Foods", "Health", "Construction", "Retail", "Warehouse", "Auto",
+                  "Staffing", "Hospitality", "Manufacturing")
+PROVIDER_KINDS = ("Adult School", "Community College", "Family Services", "Housing Center",
+                  "Legal Aid", "Recovery Center", "Training Institute", "Clinic")
+POSITIONS = ("warehouse associate", "forklift operator", "cashier", "line cook", "caregiver",
+             "janitor", "delivery driver", "office assistant", "security officer", "laborer")
+PROGRAMS = (("GED", 40), ("ESL", 20), ("forklift certification", 15), ("CNA", 10), ("welding", 8),
+            ("associate degree", 7))
+EDUCATION_STATUSES = (("enrolled", 45), ("completed", 35), ("withdrawn", 20))
+ASSESSMENTS = (("intake", 1.0), ("progress", 0.5), ("exit", 0.3))          # kind, share who have one
+MILESTONES = (("enrolled", 1.0), ("resume completed", 0.7), ("first interview", 0.5),
+              ("hired", 0.3), ("90 days employed", 0.2))                  # each needs the one before
+
+
+class Weighted:
+    """``pick(rnd)`` from ``((value, weight), ...)``, with the cumulative weights computed once."""
+
+    def __init__(self, pairs):
+        pairs = list(pairs)
+        self.values = [v for v, _ in pairs]
+        self.cum = list(accumulate(w for _, w in pairs))
+
+    def pick(self, rnd):
+        return self.values[bisect(self.cum, rnd.random() * self.cum[-1])]
+
+
+_RACES, _SERVICE_TYPES, _STATUSES, _PROGRAMS, _EDUCATION, _HOURS = map(
+    Weighted, (RACES, SERVICE_TYPES, REFERRAL_STATUSES, PROGRAMS, EDUCATION_STATUSES, HOURS))
+
+
+def _count(rnd, mean, activity):
+    """A whole number averaging *mean* x *activity*, rounded at random so small means survive."""
+    return int(mean * activity + rnd.random())
+
+
+def _when(rnd, start, until):
+    """A weekday business-hours moment between *start* and *until*, inclusive."""
+    day = (start + (until - start) * rnd.random()).date()
+    if day.weekday() >= 5:
+        day += timedelta(days=rnd.randrange(5) - day.weekday())  # a weekday of the same week
+    # the weekday or the hour can land outside the range near its ends
+    return min(max(datetime.combine(day, time(_HOURS.pick(rnd), rnd.randrange(60))), start), until)
+
+
+class Generator:
+    def __init__(self, seed=1, until=UNTIL, services=SERVICES, notes=NOTES, referrals=REFERRALS,
+                 employers=EMPLOYERS, providers=PROVIDERS, staff=STAFF):
+        self.seed = seed
+        self.rnd = random.Random(seed)
+        self.until = datetime.combine(until, time(17))
+        self.since = self.until - timedelta(days=365 * YEARS)
+        self.services, self.notes, self.referrals = services, notes, referrals
+        self.n_employers, self.n_providers, self.staff = employers, providers, staff
+
+    # ---- reference data --------------------------------------------------------------
+    def orgs(self, n, kinds):
+        rnd = self.rnd
+        return [{"name": f"{rnd.choice(ORG_WORDS)} {rnd.choice(kinds)} {i}",
+                 "contact_name": f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+                 "phone": f"209-{rnd.randrange(200, 999)}-{rnd.randrange(10000):04d}",
+                 "email": f"jobs{i}@example.org",
+                 "address": f"{rnd.randrange(100, 9999)} {rnd.choice(STREETS)}, Stockton, CA {rnd.choice(ZIPS)}"}
+                for i in range(1, n + 1)]
+
+    def set_orgs(self, employers, providers):
+        """Ids and names to refer to; popularity falls off as 1 / rank."""
+        self.employers, self.providers = employers, providers
+        self._employer = Weighted((e, 1.0 / rank) for rank, e in enumerate(employers, 1))
+        self._provider = Weighted((p, 1.0 / rank) for rank, p in enumerate(providers, 1))
+
+    # ---- participants ---------------------------------------------------------------------
+    def participants(self, first, n, total):
+        """Rows for participants *first* .. *first* + *n* - 1 of *total*, enrolled in that order."""
+        rnd, span = self.rnd, self.until - self.since
+        rows = []
+        for i in range(first, first + n):
+            fn, ln = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+            rows.append({
+                "first_name": fn, "last_name": ln,
+                "dob": date(self.until.year - rnd.randrange(18, 70), rnd.randrange(1, 13), rnd.randrange(1, 29)),
+                "race": _RACES.pick(rnd),
+                "address": f"{rnd.randrange(100, 9999)} {rnd.choice(STREETS)}, Stockton, CA {rnd.choice(ZIPS)}"
+                           if rnd.random() < 0.9 else None,
+                "email": f"{fn}.{ln}{i}@example.org".lower() if rnd.random() < 0.7 else None,
+                "phone": f"209{rnd.randrange(10**7):07d}" if rnd.random() < 0.85 else None,
+                "created_at": _when(rnd, self.since + span * (i / total), self.since + span * ((i + 1) / total)),
+            })
+        return rows
+
+    def history(self, i, pid, p):
+        """``{table: [rows]}`` for participant number *i*, inserted as *pid* with row *p*."""
+        # its own stream, so the rows do not depend on how participants are batched
+        rnd, start, until = random.Random(self.seed * 10**9 + i), p["created_at"], self.until
+        activity = rnd.lognormvariate(-0.5, 1.0)  # mean 1, long right tail
+        staff = rnd.randrange(1, self.staff + 1)  # a case manager, with others filling in
+        who = lambda: staff if rnd.random() < 0.8 else rnd.randrange(1, self.staff + 1)
+        services = [{"participant_id": pid, "service_type": _SERVICE_TYPES.pick(rnd), "note": None,
+                     "staff_id": who(), "provided_at": _when(rnd, start, until)}
+                    for _ in range(_count(rnd, self.services, activity))]
+        notes = [{"participant_id": pid, "staff_id": who(), "created_at": _when(rnd, start, until),
+                  "content": rnd.choice(NOTES_TEXT).format(s=_SERVICE_TYPES.pick(rnd).replace("_", " "))}
+                 for _ in range(_count(rnd, self.services * self.notes, activity))]
+        referrals = []
+        for _ in range(_count(rnd, self.referrals, activity ** 0.5)):
+            employer = rnd.random() < 0.6
+            referrals.append({"participant_id": pid, "staff_id": who(), "status": _STATUSES.pick(rnd),
+                              "employer_id": self._employer.pick(rnd)[0] if employer else None,
+                              "provider_id": None if employer else self._provider.pick(rnd)[0],
+                              "note": None, "referred_at": _when(rnd, start, until)})
+        assessments = [{"participant_id": pid, "kind": kind, "score": round(min(100, max(0, rnd.gauss(62, 15))), 1),
+                        "created_at": _when(rnd, start, until)}
+                       for kind, share in ASSESSMENTS if rnd.random() < share]
+        milestones = []
+        for name, share in MILESTONES:
+            prev = MILESTONES[len(milestones) - 1][1] if milestones else 1.0
+            if rnd.random() >= share / prev:
+                break
+            milestones.append({"participant_id": pid, "name": name, "achieved_at": _when(rnd, start, until)})
+        hired = any(m["name"] == "hired" for m in milestones)
+        employment = []
+        if hired or rnd.random() < 0.1:
+            began = _when(rnd, start, until).date()
+            employment.append({"participant_id": pid, "employer": self._employer.pick(rnd)[1],
+                               "position": rnd.choice(POSITIONS), "start_date": began,
+                               "end_date": began + timedelta(days=rnd.randrange(30, 700)) if rnd.random() < 0.4 else None})
+        education = []
+        if rnd.random() < 0.25:
+            began = _when(rnd, start, until).date()
+            status = _EDUCATION.pick(rnd)
+            education.append({"participant_id": pid, "school": self._provider.pick(rnd)[1],
+                              "program": _PROGRAMS.pick(rnd), "status": status, "start_date": began,
+                              "end_date": None if status == "enrolled" else began + timedelta(days=rnd.randrange(60, 400))})
+        return {"services": services, "case_notes": notes, "referrals": referrals,
+                "assessments": assessments, "employment": employment, "education": education,
+                "milestones": milestones}
+
+
+# ---- writing -------------------------------------------------------------------
+CHILDREN = {"services": Service, "case_notes": CaseNote, "referrals": Referral, "assessments": Assessment,
+            "employment": Employment, "education": Education, "milestones": Milestone}
+
+
+def run(participants, batch=BATCH, progress=None, **options):
+    """Add *participants* participants and their history; returns row counts per table."""
+    gen = Generator(**options)
+    counts = {"employers": gen.n_employers, "providers": gen.n_providers, "participants": 0,
+              **{k: 0 for k in CHILDREN}}
+    try:
+        employers = gen.orgs(gen.n_employers, EMPLOYER_KINDS)
+        providers = gen.orgs(gen.n_providers, PROVIDER_KINDS)
+        gen.set_orgs(list(zip(insert_ids(Employer.__table__, employers), (e["name"] for e in employers))),
+                     list(zip(insert_ids(Provider.__table__, providers), (p["name"] for p in providers))))
+        etags.bump(db.session.connection(), "employers", "providers")  # Core inserts skip the mapper events
+        db.session.commit()
+
+        for first in range(0, participants, batch):
+            rows = gen.participants(first, min(batch, participants - first), participants)
+            ids = insert_ids(Participant.__table__, rows)
+            keys, children = [], {k: [] for k in CHILDREN}
+            for i, pid, p in zip(range(first, first + len(ids)), ids, rows):
+                keys += [{"key": k, "participant_id": pid}
+                         for k in blocking_keys(p["first_name"], p["last_name"], p["dob"], p["phone"], p["email"])]
+                for kind, child_rows in gen.history(i, pid, p).items():
+                    children[kind] += child_rows
+            insert_rows(ParticipantKey.__table__, keys)
+            for kind, model in CHILDREN.items():
+                insert_rows(model.__table__, children[kind])
+                counts[kind] += len(children[kind])
+            db.session.commit()
+            counts["participants"] += len(ids)
+            if progress:
+                progress(dict(counts))
+    except Exception:
+        db.session.rollback()
+        raise
+    rollups.catch_up(wait=True)
+    if address_index.ready():
+        address_index.rebuild()
+    return counts
+
+
+# ---- wiring --------------------------------------------------------------------
+def init_app(app):
+    @app.cli.command("seed")
+    @click.option("--participants", default=1000, show_default=True)
+    @click.option("--seed", "seed_", default=1, show_default=True, help="Same seed, same rows.")
+    @click.option("--until", type=click.DateTime(["%Y-%m-%d"]), default=UNTIL.isoformat(),
+                  show_default=True, help="Last day of activity.")
+    @click.option("--services", default=SERVICES, show_default=True, help="Mean services per participant.")
+    @click.option("--notes", default=NOTES, show_default=True, help="Case notes per service.")
+    @click.option("--referrals", default=REFERRALS, show_default=True, help="Mean referrals per participant.")
+    @click.option("--employers", default=EMPLOYERS, show_default=True)
+    @click.option("--providers", default=PROVIDERS, show_default=True)
+    @click.option("--batch", default=BATCH, show_default=True, help="Participants per transaction.")
+    def seed_cmd(participants, seed_, until, services, notes, referrals, employers, providers, batch):
+        """Generate synthetic participants with services, notes, referrals and outcomes."""
+        def progress(c):
+            click.echo(" ".join(f"{k}={v}" for k, v in c.items()), err=True)
+
+        counts = run(participants, batch, progress, seed=seed_, until=until.date(),
+                     services=services, notes=notes, referrals=referrals,
+                     employers=employers, providers=providers)
+        json.dump(counts, sys.stdout)
+        click.echo()
@@ -0,0 +1,248 @@
+"""Slow-query log: every statement over ``SLOWLOG_MS`` milliseconds is logged
+and counted in ``slow_queries`` under its normalized SQL, with the endpoint
+and parameter types of the slowest call and, sampled and rate-limited, the
+query plan (``EXPLAIN QUERY PLAN`` on SQLite, ``EXPLAIN (FORMAT JSON)`` on
+PostgreSQL).
+
+Timing happens in SQLAlchemy cursor events on the request's thread; the
+bookkeeping and the EXPLAIN run on one writer thread per worker with its own
+connection, so a slow query does not get slower for being logged. Parameter
+values are never stored, only their types, because they hold participant data.
+
+    flask slowlog               top statements by total time
+    flask slowlog --plans       ... with their last captured plan
+    flask slowlog --reset       forget everything recorded so far
+"""
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+import click
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+try:
+    from .models import db, SlowQuery
+except ImportError:
+    from models import db, SlowQuery
+
+DEFAULT_MS = 250
+EXPLAIN_SAMPLE = 0.2      # share of slow calls that may capture a plan...
+EXPLAIN_INTERVAL = 300    # ...at most once per statement in this many seconds...
+EXPLAIN_PER_MINUTE = 10   # ...and this many per worker per minute overall
+QUEUE_SIZE = 1000
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|(?<!:):\w+|\$\d+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(statement):
+    """SQL with literals and placeholders as ``?`` and IN lists folded to ``(...)``."""
+    s = _STRING.sub("?", statement)
+    s = _PLACEHOLDER.sub("?", s)
+    s = _NUMBER.sub("?", s)
+    s = _IN_LIST.sub("(...)", s)
+    return _SPACE.sub(" ", s).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def param_shape(parameters, executemany=False):
+    """``"int, str, NoneType"`` for one parameter set; ``"500 x (...)"`` for executemany."""
+    if executemany:
+        rows = list(parameters or ())
+        return f"{len(rows)} x ({param_shape(rows[0]) if rows else ''})"
+    if isinstance(parameters, dict):
+        values = parameters.values()
+    else:
+        values = parameters or ()
+    return ", ".join(type(v).__name__ for v in values)[:255]
+
+
+def _endpoint():
+    if has_request_context():
+        rule = request.url_rule.rule if request.url_rule else request.path
+        return f"{request.method} {rule}"[:255]
+    return threading.current_thread().name
+
+
+class SlowLog:
+    def __init__(self, app, engine, threshold_ms, sample=EXPLAIN_SAMPLE):
+        self.app = app
+        self.engine = engine
+        self.threshold = threshold_ms / 1000.0
+        self.sample = sample
+        self.logger = app.logger
+        self._queue = queue.Queue(QUEUE_SIZE)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._explained = {}      # fingerprint -> monotonic time of its last plan
+        self._budget = []         # monotonic times of plans in the last minute
+        self.stats = {"logged": 0, "dropped": 0, "explained": 0}
+
+    # ---- request thread --------------------------------------------------------------
+    def before(self, conn, cursor, statement, parameters, context, executemany):
+        # on the execution context: a failed statement never gets here to clear it
+        if context is not None:
+            context.slowlog_start = time.perf_counter()
+
+    def after(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "slowlog_start", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold or threading.current_thread() is self._thread:
+            return
+        normalized = normalize(statement)
+        ev = {"fingerprint": fingerprint(normalized), "statement": normalized, "raw": statement,
+              "parameters": parameters, "executemany": executemany, "ms": elapsed * 1000.0,
+              "endpoint": _endpoint(), "params": param_shape(parameters, executemany)}
+        self.logger.warning("slow query %.1f ms [%s] %s (%s) %s", ev["ms"], ev["fingerprint"],
+                            ev["endpoint"], ev["params"], normalized[:500])
+        self._start()
+        try:
+            self._queue.put_nowait(ev)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def _start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():  # first slow query in this (possibly forked) worker
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="slowlog", daemon=True)
+                self._thread.start()
+
+    # ---- writer thread ---------------------------------------------------------------
+    def _run(self):
+        conn = None
+        while True:
+            ev = self._queue.get()
+            try:
+                if conn is None or conn.closed or conn.invalidated:
+                    conn = self.engine.connect()
+                    with conn.begin():  # statements can be slow before create_all has run
+                        SlowQuery.__table__.create(conn, checkfirst=True)
+                plan = self._explain(conn, ev) if self._may_explain(ev) else None
+                self._record(conn, ev, plan)
+                self.stats["logged"] += 1
+            except Exception:
+                self.logger.exception("slow-query log write failed")
+                if conn is not None:
+                    conn.close()
+                conn = None
+
+    def _may_explain(self, ev):
+        if ev["executemany"] or not ev["raw"].lstrip().upper().startswith(("SELECT", "WITH")):
+            return False
+        if random.random() >= self.sample:
+            return False
+        now = time.monotonic()
+        if now - self._explained.get(ev["fingerprint"], -EXPLAIN_INTERVAL) < EXPLAIN_INTERVAL:
+            return False
+        self._budget = [t for t in self._budget if now - t < 60]
+        if len(self._budget) >= EXPLAIN_PER_MINUTE:
+            return False
+        self._budget.append(now)
+        self._explained[ev["fingerprint"]] = now
+        return True
+
+    def _explain(self, conn, ev):
+        sqlite = conn.dialect.name == "sqlite"
+        prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN (FORMAT JSON) "
+        tx = conn.begin()
+        try:
+            rows = conn.exec_driver_sql(prefix + ev["raw"], ev["parameters"]).fetchall()
+        except Exception as e:
+            return f"EXPLAIN failed: {e.__class__.__name__}: {e}"[:2000]
+        finally:
+            tx.rollback()
+        self.stats["explained"] += 1
+        if not sqlite:
+            plan = rows[0][0]
+            return plan if isinstance(plan, str) else json.dumps(plan, indent=1)
+        depth, lines = {0: -1}, []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node] + detail)
+        return "\n".join(lines)
+
+    def _record(self, conn, ev, plan):
+        t = SlowQuery.__table__
+        now = datetime.utcnow()
+        mine = t.c.fingerprint == ev["fingerprint"]
+        for attempt in (1, 2):
+            try:
+                with conn.begin():
+                    res = conn.execute(t.update().where(mine).values(
+                        calls=t.c.calls + 1, total_ms=t.c.total_ms + ev["ms"], last_seen=now))
+                    if res.rowcount == 0:
+                        conn.execute(t.insert().values(
+                            fingerprint=ev["fingerprint"], statement=ev["statement"], calls=1,
+                            total_ms=ev["ms"], max_ms=0, last_seen=now))
+                    conn.execute(t.update().where(mine & (t.c.max_ms < ev["ms"])).values(
+                        max_ms=ev["ms"], endpoint=ev["endpoint"], params=ev["params"]))
+                    if plan is not None:
+                        conn.execute(t.update().where(mine).values(plan=plan, planned_at=now))
+                return
+            except IntegrityError:  # another worker inserted it first; now the update matches
+                if attempt == 2:
+                    raise
+
+
+# ---- reporting ---------------------------------------------------------------------------
+def top(limit=20):
+    return (SlowQuery.query.order_by(SlowQuery.total_ms.desc()).limit(limit).all())
+
+
+def reset():
+    n = SlowQuery.query.delete()
+    db.session.commit()
+    return n
+
+
+# ---- wiring --------------------------------------------------------------------------------
+def init_app(app):
+    ms = app.config.get("SLOWLOG_MS", DEFAULT_MS)
+    if ms is not None and float(ms) > 0:
+        with app.app_context():
+            engine = db.engine
+        log = app.extensions["slowlog"] = SlowLog(app, engine, float(ms),
+                                                  float(app.config.get("SLOWLOG_EXPLAIN_SAMPLE", EXPLAIN_SAMPLE)))
+        event.listen(engine, "before_cursor_execute", log.before)
+        event.listen(engine, "after_cursor_execute", log.after)
+
+    @app.cli.command("slowlog")
+    @click.option("--limit", default=20, show_default=True, help="How many statements to show.")
+    @click.option("--plans", is_flag=True, help="Show the last captured query plan of each.")
+    @click.option("--reset", "do_reset", is_flag=True, help="Delete everything recorded so far.")
+    def slowlog_cmd(limit, plans, do_reset):
+        """Statements slower than SLOWLOG_MS, by total time spent in them."""
+        if do_reset:
+            click.echo(f"deleted {reset()} statements")
+            return
+        rows = top(limit)
+        if not rows:
+            click.echo("no slow queries recorded")
+            return
+        click.echo(f"{'total ms':>10} {'calls':>6} {'avg ms':>8} {'max ms':>8}  endpoint / statement")
+        for r in rows:
+            click.echo(f"{r.total_ms:10.0f} {r.calls:6d} {r.total_ms / r.calls:8.1f} {r.max_ms:8.1f}  "
+                       f"{r.endpoint or '-'}  [{r.fingerprint}] ({r.params or ''})")
+            click.echo(f"{'':37}{r.statement[:300]}")
+            if plans and r.plan:
+                click.echo("\n".join(f"{'':39}{line}" for line in r.plan.splitlines()))
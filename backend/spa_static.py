@@ -1,27 +1,154 @@
+import hashlib
+import mimetypes
 import os
-from flask import send_from_directory
+import re
+import threading
+import time
+from flask import Response, request, send_file
+
+try:
+    from .budgets import query_budget
+except ImportError:
+    from budgets import query_budget
+
+# written next to each built asset by frontend/scripts/precompress.mjs, best first
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+# Vite writes its build output to assets/ as name-<8-character hash>.ext, and such
+# a URL never changes content; the hash is base64url, so it can contain - and _.
+# Anything else (public/ files, copied to the root as named) is revalidated.
+HASHED = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8}\.[a-z0-9]+$")
+IMMUTABLE_MAX_AGE = 31536000
+RELOAD_INTERVAL = 2.0
+
+
+class Manifest:
+    """The dist directory, scanned once: relative path -> {encoding: absolute file}.
+
+    index.html (every client-side route) is held in memory with its ETag, so a
+    deep link costs a dict lookup and no filesystem access. The scan is redone
+    when index.html's mtime changes, checked at most every *reload_interval*
+    seconds (0 turns the check off; call ``reload()`` instead).
+    """
+
+    def __init__(self, dist_dir, reload_interval=RELOAD_INTERVAL):
+        self.dist_dir = dist_dir
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self.reload()
+
+    def reload(self):
+        files = {}
+        for root, _, names in os.walk(self.dist_dir):
+            for name in names:
+                full = os.path.join(root, name)
+                rel = os.path.relpath(full, self.dist_dir).replace(os.sep, "/")
+                for encoding, suffix in PRECOMPRESSED:
+                    if rel.endswith(suffix):
+                        files.setdefault(rel[:-len(suffix)], {})[encoding] = full
+                        break
+                else:
+                    files.setdefault(rel, {})[None] = full
+        # a .br / .gz without its original is not something we serve
+        self.files = {rel: v for rel, v in files.items() if None in v}
+        index = self.files.get("index.html", {})
+        self.index = {enc: _read(path) for enc, path in index.items()}
+        self.index_etag = hashlib.sha1(self.index[None]).hexdigest()[:16] if index else None
+        self.index_mtime = _mtime(index.get(None))
+        self._checked = time.monotonic()
+
+    def maybe_reload(self):
+        if not self.reload_interval or time.monotonic() - self._checked < self.reload_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._checked < self.reload_interval:
+                return
+            self._checked = time.monotonic()
+            if _mtime(os.path.join(self.dist_dir, "index.html")) != self.index_mtime:
+                self.reload()
+
+    def send_index(self):
+        if not self.index:
+            return {"error": "Frontend not built"}, 404
+        encoding = _negotiate(self.index)
+        resp = Response(self.index[encoding], mimetype="text/html")
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        # a strong ETag names exact bytes, so each encoding gets its own
+        resp.set_etag(f"{self.index_etag}-{encoding}" if encoding else self.index_etag)
+        resp.vary.add("Accept-Encoding")
+        resp.cache_control.no_cache = True  # revalidate, so a new build shows up
+        return resp.make_conditional(request)
+
+    def send(self, path):
+        """Serve dist/*path* (precompressed when accepted), or None if it is not in the build."""
+        variants = self.files.get(path)
+        if variants is None:
+            return None
+        if path == "index.html":
+            return self.send_index()
+        encoding = _negotiate(variants)
+        hashed = HASHED.match(path) is not None
+        # send_file's ETag comes from the file it sends (.br, .gz or the original), so it differs per encoding
+        resp = send_file(variants[encoding], mimetype=mimetypes.guess_type(path)[0] or "application/octet-stream",
+                         conditional=True, max_age=IMMUTABLE_MAX_AGE if hashed else None)
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        resp.vary.add("Accept-Encoding")
+        if hashed:
+            resp.cache_control.immutable = True
+        else:
+            resp.cache_control.no_cache = True  # revalidate against the ETag
+        return resp
+
+
+def _negotiate(variants):
+    accepted = request.accept_encodings
+    for encoding, _ in PRECOMPRESSED:
+        if encoding in variants and accepted[encoding]:
+            return encoding
+    return None
+
+
+def _read(path):
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        return None
+
 
 def register_spa(app):
     # Point to ../frontend/dist (created by Vite build)
-    dist_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "frontend", "dist"))
+    dist_dir = app.config.get("SPA_DIST_DIR") or os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "..", "frontend", "dist"))
     app.static_folder = dist_dir
     app.static_url_path = "/"
+    manifest = app.extensions["spa_manifest"] = Manifest(
+        dist_dir, float(app.config.get("SPA_RELOAD_INTERVAL", RELOAD_INTERVAL)))
 
     @app.get("/")
+    @query_budget(0)
     def spa_index():
-        return send_from_directory(app.static_folder, "index.html")
+        manifest.maybe_reload()
+        return manifest.send_index()
 
     @app.get("/assets/<path:path>")
+    @query_budget(0)
     def spa_assets(path):
-        return send_from_directory(os.path.join(app.static_folder, "assets"), path)
+        manifest.maybe_reload()
+        return manifest.send("assets/" + path) or ({"error": "Not found"}, 404)
 
     # Catch-all for client-side routes. Never hijack /api/*
     @app.route("/", defaults={"path": ""})
     @app.route("/<path:path>")
+    @query_budget(0)
     def spa_catchall(path):
         if path.startswith("api"):
             return {"error": "Not found"}, 404
-        full = os.path.join(app.static_folder, path)
-        if os.path.isfile(full):
-            return send_from_directory(app.static_folder, path)
-        return send_from_directory(app.static_folder, "index.html")
+        manifest.maybe_reload()
+        return manifest.send(path) or manifest.send_index()
@@ -0,0 +1,33 @@
+// Write .br and .gz siblings for every compressible file in dist/, so the
+// Flask server (backend/spa_static.py) can serve them without compressing
+// per request. Runs after `vite build`; uses only Node's built-in zlib.
+import { readdirSync, readFileSync, statSync, writeFileSync } from 'node:fs'
+import { join } from 'node:path'
+import { brotliCompressSync, gzipSync, constants } from 'node:zlib'
+
+const DIST = new URL('../dist/', import.meta.url).pathname
+const COMPRESSIBLE = /\.(js|mjs|css|html|svg|json|txt|map|ico|webmanifest)$/
+const MIN_SIZE = 1024
+
+function* walk(dir){
+  for (const name of readdirSync(dir)) {
+    const path = join(dir, name)
+    if (statSync(path).isDirectory()) yield* walk(path)
+    else yield path
+  }
+}
+
+let files = 0, before = 0, after = 0
+for (const path of walk(DIST)) {
+  if (!COMPRESSIBLE.test(path)) continue
+  const raw = readFileSync(path)
+  if (raw.length < MIN_SIZE) continue
+  const br = brotliCompressSync(raw, { params: {
+    [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+    [constants.BROTLI_PARAM_SIZE_HINT]: raw.length,
+  } })
+  writeFileSync(path + '.br', br)
+  writeFileSync(path + '.gz', gzipSync(raw, { level: 9 }))
+  files += 1; before += raw.length; after += br.length
+}
+console.log(`precompressed ${files} files: ${before} -> ${after} bytes (brotli)`)
@@ -22,6 +22,9 @@ export default function ParticipantDetail({ pid }){
   const [editing, setEditing] = useState(false)
   const [editForm, setEditForm] = useState({ first_name:'', last_name:'', dob:'', race:'', address:'', email:'', phone:'' })
 
+  const [more, setMore] = useState({})   // next_cursor per list, when older rows exist
+  const orgsLoaded = useRef(false)
+
   const mounted = useRef(true)
   useEffect(()=>{ mounted.current = true; return ()=>{ mounted.current = false } }, [])
 
@@ -32,11 +35,13 @@ export default function ParticipantDetail({ pid }){
     setP(null)
 
     try {
-      // 1) MUST succeed: participant record
-      const a = await api.get(`/api/participants/${pid}`)
+      // participant plus the newest notes/services/referrals in one request
+      const a = await api.get(`/api/participants/${pid}/profile`)
       if (!mounted.current) return
-      const pj = a.data
+      const { participant: pj, notes: n, services: s, referrals: r } = a.data
       setP(pj)
+      setNotes(n.items); setServices(s.items); setReferrals(r.items)
+      setMore({ notes: n.next_cursor, services: s.next_cursor, referrals: r.next_cursor })
       setEditForm({
         first_name: pj.first_name || '',
         last_name: pj.last_name || '',
@@ -46,15 +51,6 @@ export default function ParticipantDetail({ pid }){
         email: pj.email || '',
         phone: pj.phone || ''
       })
-
-      // 2) Load related data (non-blocking)
-      Promise.allSettled([
-        api.get(`/api/participants/${pid}/notes`).then(r => mounted.current && setNotes(r.data || [])),
-        api.get(`/api/participants/${pid}/services`).then(r => mounted.current && setServices(r.data || [])),
-        api.get(`/api/participants/${pid}/referrals`).then(r => mounted.current && setReferrals(r.data || [])),
-        api.get(`/api/employers`).then(r => mounted.current && setEmployers(r.data || [])),
-        api.get(`/api/providers`).then(r => mounted.current && setProviders(r.data || [])),
-      ]).catch(()=>{})
     } catch (e) {
       if (!mounted.current) return
       console.error('load participant failed:', e)
@@ -66,6 +62,24 @@ export default function ParticipantDetail({ pid }){
 
   useEffect(()=>{ load() }, [pid])
 
+  // full org lists are only needed once someone starts a referral
+  async function loadOrgs(){
+    if (orgsLoaded.current) return
+    orgsLoaded.current = true
+    Promise.allSettled([
+      api.get(`/api/employers`).then(r => mounted.current && setEmployers(r.data || [])),
+      api.get(`/api/providers`).then(r => mounted.current && setProviders(r.data || [])),
+    ]).catch(()=>{})
+  }
+
+  const SETTERS = { notes: setNotes, services: setServices, referrals: setReferrals }
+  async function loadOlder(kind){
+    const r = await api.get(`/api/participants/${pid}/${kind}`, { params: { after: more[kind], limit: 50 } })
+    if (!mounted.current) return
+    SETTERS[kind](xs => [...xs, ...r.data.items])
+    setMore(m => ({ ...m, [kind]: r.data.next_cursor }))
+  }
+
   async function addCaseNote(){
     const content = noteText.trim()
     if(!content) return
@@ -73,8 +87,9 @@ export default function ParticipantDetail({ pid }){
       await api.post(`/api/participants/${pid}/notes`, { content })
       setNoteText('')
       // refresh only notes to keep UI snappy
-      const r = await api.get(`/api/participants/${pid}/notes`)
-      setNotes(r.data || [])
+      const r = await api.get(`/api/participants/${pid}/notes`, { params: { limit: 20 } })
+      setNotes(r.data.items)
+      setMore(m => ({ ...m, notes: r.data.next_cursor }))
     } catch (e) {
       const msg = e?.response?.data?.msg || e?.response?.data?.error || e.message || 'Save note failed'
       alert(msg)
@@ -85,8 +100,9 @@ export default function ParticipantDetail({ pid }){
     try {
       await api.post(`/api/participants/${pid}/services`, svc)
       setSvc({ service_type:'group', note:'' })
-      const r = await api.get(`/api/participants/${pid}/services`)
-      setServices(r.data || [])
+      const r = await api.get(`/api/participants/${pid}/services`, { params: { limit: 20 } })
+      setServices(r.data.items)
+      setMore(m => ({ ...m, services: r.data.next_cursor }))
     } catch (e) {
       const msg = e?.response?.data?.msg || e?.response?.data?.error || e.message || 'Save service failed'
       alert(msg)
@@ -98,8 +114,9 @@ export default function ParticipantDetail({ pid }){
     try {
       await api.post(`/api/participants/${pid}/referrals`, refForm)
       setRefForm({ kind:'employer', org_id:'', status:'referred', note:'' })
-      const r = await api.get(`/api/participants/${pid}/referrals`)
-      setReferrals(r.data || [])
+      const r = await api.get(`/api/participants/${pid}/referrals`, { params: { limit: 20 } })
+      setReferrals(r.data.items)
+      setMore(m => ({ ...m, referrals: r.data.next_cursor }))
     } catch (e) {
       const msg = e?.response?.data?.msg || e?.response?.data?.error || e.message || 'Save referral failed'
       alert(msg)
@@ -195,6 +212,7 @@ export default function ParticipantDetail({ pid }){
                 }
               </div>
             ))}
+            {more.notes && <button className="text-xs underline text-gray-600" onClick={()=>loadOlder('notes')}>Load older</button>}
           </div>
           <textarea className="w-full border rounded-xl px-3 py-2 min-h-[90px]" placeholder="Add a case note…" value={noteText} onChange={e=>setNoteText(e.target.value)} />
           <div className="flex gap-2 mt-2">
@@ -213,6 +231,7 @@ export default function ParticipantDetail({ pid }){
                 {s.provided_at && <div className="text-xs text-gray-500">{new Date(s.provided_at).toLocaleString()}</div>}
               </div>
             ))}
+            {more.services && <button className="text-xs underline text-gray-600" onClick={()=>loadOlder('services')}>Load older</button>}
           </div>
           <div className="grid gap-2">
             <select className="border rounded-xl px-3 py-2" value={svc.service_type} onChange={e=>setSvc(x=>({...x, service_type:e.target.value}))}>
@@ -236,19 +255,20 @@ export default function ParticipantDetail({ pid }){
                 <div className="text-xs text-gray-500">{r.referred_at && new Date(r.referred_at).toLocaleString()}</div>
               </div>
             ))}
+            {more.referrals && <button className="text-xs underline text-gray-600" onClick={()=>loadOlder('referrals')}>Load older</button>}
           </div>
           <div className="grid gap-2">
-            <select className="border rounded-xl px-3 py-2" value={refForm.kind} onChange={e=>setRefForm(x=>({...x, kind:e.target.value, org_id:''}))}>
+            <select className="border rounded-xl px-3 py-2" value={refForm.kind} onFocus={loadOrgs} onChange={e=>setRefForm(x=>({...x, kind:e.target.value, org_id:''}))}>
               <option value="employer">employer</option>
               <option value="provider">provider</option>
             </select>
             {refForm.kind==='employer' ? (
-              <select className="border rounded-xl px-3 py-2" value={refForm.org_id} onChange={e=>setRefForm(x=>({...x, org_id:Number(e.target.value)||''}))}>
+              <select className="border rounded-xl px-3 py-2" value={refForm.org_id} onFocus={loadOrgs} onChange={e=>setRefForm(x=>({...x, org_id:Number(e.target.value)||''}))}>
                 <option value="">Select employer…</option>
                 {employers.map(o => <option key={o.id} value={o.id}>{o.name}</option>)}
               </select>
             ) : (
-              <select className="border rounded-xl px-3 py-2" value={refForm.org_id} onChange={e=>setRefForm(x=>({...x, org_id:Number(e.target.value)||''}))}>
+              <select className="border rounded-xl px-3 py-2" value={refForm.org_id} onFocus={loadOrgs} onChange={e=>setRefForm(x=>({...x, org_id:Number(e.target.value)||''}))}>
                 <option value="">Select provider…</option>
                 {providers.map(o => <option key={o.id} value={o.id}>{o.name}</option>)}
               </select>